@@ -1,5 +1,7 @@
 from flask import Blueprint
 
+from flask_rpc.latest import RPCRegistry
+
 
 def load_nested_blueprints(bp):
     from .auth import auth
@@ -11,6 +13,25 @@ def load_nested_blueprints(bp):
     bp.register_blueprint(tester)
 
 
+def load_registry(bp):
+    from .auth import login_rpc, authenticated_rpc
+    from .clients import rpc as clients_rpc
+    from .tester import rpc as tester_rpc
+
+    # Serves every function from one route, e.g. "clients.read", "auth.session"
+    RPCRegistry(
+        bp,
+        url_prefix="/all",
+        groups={
+            "auth.login": login_rpc,
+            "auth": authenticated_rpc,
+            "clients": clients_rpc,
+            "tester": tester_rpc,
+        },
+    )
+
+
 rpc = Blueprint("rpc", __name__, url_prefix="/rpc")
 
 load_nested_blueprints(rpc)
+load_registry(rpc)
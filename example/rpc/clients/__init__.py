@@ -1,15 +1,15 @@
 from flask import Blueprint
 
 from flask_rpc.latest import RPC
-from .funcs import create_client, read_client, update_client, delete_client
 
 clients = Blueprint("clients", __name__, url_prefix="/clients")
 
 rpc = RPC(clients)
 
+# Import strings are imported on the first call of each function
 rpc.functions(
-    create=create_client,
-    read=read_client,
-    update=update_client,
-    delete=delete_client,
+    create="example.rpc.clients.funcs:create_client",
+    read="example.rpc.clients.funcs:read_client",
+    update="example.rpc.clients.funcs:update_client",
+    delete="example.rpc.clients.funcs:delete_client",
 )
@@ -0,0 +1,453 @@
+import typing as t
+
+from sqlalchemy import delete, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .latest import RPC, RPCFields, RPCResponse
+from .pagination import RPCKeyset
+
+
+class RPCCrud:
+    """
+    Generates create / read / update / delete RPC functions for a
+    SQLAlchemy model, including bulk versions that run a single statement.
+
+    Rows are returned using RETURNING where the database supports it, on
+    databases that don't (MySQL, SQLite before 3.35) they are read back
+    with a SELECT, and create_many inserts one row at a time.
+
+    Columns are named by their attribute on the model, which can differ from
+    the column name in the table. A write that violates a constraint is
+    rolled back and fails.
+
+    Requires SQLAlchemy 2.0+
+    """
+
+    _model: t.Any
+    _session: t.Union[Session, t.Callable[[], Session]]
+    _pk: t.Any
+    _columns: t.Dict[str, t.Any]
+    _writable: t.FrozenSet[str]
+    _page_size: int
+    _keyset: t.Optional[RPCKeyset]
+    _columnar: bool
+
+    def __init__(
+        self,
+        model: t.Any,
+        session: t.Union[Session, t.Callable[[], Session]],
+        columns: t.Optional[t.List[str]] = None,
+        writable: t.Optional[t.List[str]] = None,
+        page_size: int = 100,
+        keyset: t.Optional[RPCKeyset] = None,
+        columnar: bool = False,
+    ):
+        """
+        :param model: A SQLAlchemy model with a single column primary key
+        :param session: Session, scoped_session (e.g. Flask-SQLAlchemy's db.session)
+        :param columns: Optional List[str], the columns that can be read,
+            defaults to every column
+        :param writable: Optional List[str], the columns that can be set,
+            defaults to every column except the primary key
+        :param page_size: Int, the most rows a bulk function works on per call
+        :param keyset: Optional RPCKeyset, setting this also registers a list
+            function that pages through every row, ordered by primary key
+        :param columnar: Bool, functions that return many rows send them in
+            the columnar shape, see RPCResponse.success
+        """
+        mapper = inspect(model)
+
+        if len(mapper.primary_key) != 1:
+            raise ValueError(f"{model} must have a single column primary key.")
+
+        self._model = model
+        self._session = session
+        # The model attribute, its key is the attribute name, not the column name
+        self._pk = getattr(
+            model, mapper.get_property_by_column(mapper.primary_key[0]).key
+        )
+        self._page_size = page_size
+        self._keyset = keyset
+        self._columnar = columnar
+
+        all_columns = {c.key: getattr(model, c.key) for c in mapper.column_attrs}
+
+        if columns is None:
+            columns = list(all_columns)
+
+        if unknown := set(columns) - set(all_columns):
+            raise ValueError(f"Unknown columns {sorted(unknown)} on {model}.")
+
+        self._columns = {k: all_columns[k] for k in columns}
+
+        if writable is None:
+            writable = [k for k in all_columns if k != self._pk.key]
+
+        if unknown := set(writable) - set(all_columns):
+            raise ValueError(f"Unknown columns {sorted(unknown)} on {model}.")
+
+        self._writable = frozenset(writable)
+
+    def register(self, rpc: RPC, prefix: str = "", **kwargs: t.Any):
+        """
+        Register the CRUD functions on an RPC instance.
+
+        create, read, update, delete, create_many, read_many, update_many
+        and delete_many are registered, with the prefix added to each name.
+        list is also registered if a keyset was set.
+
+        :param rpc: RPC
+        :param prefix: Str, e.g. "clients_"
+        :param kwargs: Passed to rpc.functions, e.g. session_auth__
+        :return: None
+        """
+        functions = {
+            f"{prefix}create": self.create,
+            f"{prefix}read": self.read,
+            f"{prefix}update": self.update,
+            f"{prefix}delete": self.delete,
+            f"{prefix}create_many": self.create_many,
+            f"{prefix}read_many": self.read_many,
+            f"{prefix}update_many": self.update_many,
+            f"{prefix}delete_many": self.delete_many,
+        }
+
+        if self._keyset is not None:
+            functions[f"{prefix}list"] = self.list
+
+        rpc.functions(**kwargs, **functions)
+
+    @property
+    def session(self) -> Session:
+        return self._session() if callable(self._session) else self._session
+
+    def _dialect(self, session: Session):
+        return session.get_bind(self._model).dialect
+
+    def _fields(self, data: t.Any) -> t.Optional[t.List[t.Any]]:
+        """
+        The columns to return, narrowed by an optional "fields" list in data,
+        or the fields of the request envelope.
+        """
+        fields = data.get("fields") if isinstance(data, dict) else None
+
+        if fields is None:
+            if (requested := RPCFields.current()) is not None:
+                if columns := [c for k, c in self._columns.items() if k in requested]:
+                    return columns
+
+            return list(self._columns.values())
+
+        if not isinstance(fields, list) or not all(f in self._columns for f in fields):
+            return None
+
+        return [self._columns[f] for f in fields]
+
+    def _values(self, values: t.Any) -> t.Optional[t.Dict[str, t.Any]]:
+        if not isinstance(values, dict) or not values:
+            return None
+
+        if any(k not in self._writable for k in values):
+            return None
+
+        return values
+
+    def _ids(self, data: t.Any) -> t.Optional[t.List[t.Any]]:
+        ids = data.get("ids") if isinstance(data, dict) else None
+
+        if not isinstance(ids, list) or not ids or len(ids) > self._page_size:
+            return None
+
+        if not all(_is_id(i) for i in ids):
+            return None
+
+        return ids
+
+    def _id(self, data: t.Any) -> t.Optional[t.Dict[str, t.Any]]:
+        """
+        The failed response if data doesn't have a valid primary key.
+        """
+        if not isinstance(data, dict) or not _is_id(data.get(self._pk.key)):
+            return RPCResponse.fail(f"{self._pk.key} is required.", data)
+
+        return None
+
+    @staticmethod
+    def _write(
+        session: Session, write: t.Callable[[], t.Dict[str, t.Any]], data: t.Any
+    ) -> t.Dict[str, t.Any]:
+        """
+        Run a write and commit it, a constraint violation is rolled back and
+        returned as a failed response.
+        """
+        try:
+            response = write()
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            return RPCResponse.fail("Constraint violated.", data)
+
+        return response
+
+    @staticmethod
+    def _rows(result) -> t.List[t.Dict[str, t.Any]]:
+        return [dict(row) for row in result.mappings()]
+
+    def _select(
+        self, session: Session, ids: t.List[t.Any]
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """
+        Read rows back by primary key, in the order of ids, for databases
+        without RETURNING.
+        """
+        result = session.execute(
+            select(*self._columns.values(), self._pk.label("_pk")).where(
+                self._pk.in_(ids)
+            )
+        )
+        rows = {row.pop("_pk"): row for row in self._rows(result)}
+
+        return [rows[i] for i in ids if i in rows]
+
+    def create(self, data: t.Any):
+        if not (values := self._values(data)):
+            return RPCResponse.fail("Invalid data.", data)
+
+        session = self.session
+        statement = insert(self._model).values(values)
+
+        def write():
+            if self._dialect(session).insert_returning:
+                rows = self._rows(
+                    session.execute(statement.returning(*self._columns.values()))
+                )
+            else:
+                result = session.execute(statement)
+                rows = self._select(session, [result.inserted_primary_key[0]])
+
+            return RPCResponse.success(rows[0])
+
+        return self._write(session, write, data)
+
+    def read(self, data: t.Any):
+        if failed := self._id(data):
+            return failed
+
+        if (fields := self._fields(data)) is None:
+            return RPCResponse.fail("Invalid fields.", data)
+
+        result = self.session.execute(
+            select(*fields).where(self._pk == data[self._pk.key])
+        )
+
+        if not (rows := self._rows(result)):
+            return RPCResponse.fail("Not found.", data)
+
+        return RPCResponse.success(rows[0])
+
+    def update(self, data: t.Any):
+        if failed := self._id(data):
+            return failed
+
+        values = {k: v for k, v in data.items() if k != self._pk.key}
+        if not (values := self._values(values)):
+            return RPCResponse.fail("Invalid data.", data)
+
+        session = self.session
+        statement = (
+            update(self._model).where(self._pk == data[self._pk.key]).values(values)
+        )
+
+        def write():
+            if self._dialect(session).update_returning:
+                rows = self._rows(
+                    session.execute(statement.returning(*self._columns.values()))
+                )
+            elif session.execute(statement).rowcount:
+                rows = self._select(session, [data[self._pk.key]])
+            else:
+                rows = []
+
+            if not rows:
+                return RPCResponse.fail("Not found.", data)
+
+            return RPCResponse.success(rows[0])
+
+        return self._write(session, write, data)
+
+    def delete(self, data: t.Any):
+        if failed := self._id(data):
+            return failed
+
+        session = self.session
+
+        def write():
+            result = session.execute(
+                delete(self._model).where(self._pk == data[self._pk.key])
+            )
+
+            if not result.rowcount:
+                return RPCResponse.fail("Not found.", data)
+
+            return RPCResponse.success({self._pk.key: data[self._pk.key]})
+
+        return self._write(session, write, data)
+
+    def list(self, data: t.Any):
+        """
+        data: {"cursor": Optional str, "limit": Optional int, "fields": Optional [...]}
+        """
+        if (fields := self._fields(data)) is None:
+            return RPCResponse.fail("Invalid fields.", None)
+
+        if self._pk.key not in (f.key for f in fields):
+            fields = [*fields, self._pk]
+
+        return self._keyset.page(
+            self.session,
+            select(*fields),
+            self._pk,
+            data=data,
+            columnar=self._columnar,
+        )
+
+    def create_many(self, data: t.Any):
+        """
+        data: a list of rows, inserted using a single bulk insert.
+        """
+        if not isinstance(data, list) or not data or len(data) > self._page_size:
+            return RPCResponse.fail(
+                f"Expected a list of 1 to {self._page_size} rows.", None
+            )
+
+        if not all(self._values(row) for row in data):
+            return RPCResponse.fail("Invalid data.", None)
+
+        session = self.session
+
+        def write():
+            if self._dialect(session).insert_executemany_returning:
+                result = session.execute(
+                    insert(self._model).returning(
+                        *self._columns.values(), sort_by_parameter_order=True
+                    ),
+                    data,
+                )
+                rows = self._rows(result)
+            else:
+                ids = [
+                    session.execute(
+                        insert(self._model).values(row)
+                    ).inserted_primary_key[0]
+                    for row in data
+                ]
+                rows = self._select(session, ids)
+
+            return RPCResponse.success(rows, columnar=self._columnar)
+
+        return self._write(session, write, None)
+
+    def read_many(self, data: t.Any):
+        """
+        data: {"ids": [...], "fields": Optional [...]}, read using one IN query.
+        """
+        if not (ids := self._ids(data)):
+            return RPCResponse.fail(
+                f"Expected ids, a list of 1 to {self._page_size} values.", None
+            )
+
+        if (fields := self._fields(data)) is None:
+            return RPCResponse.fail("Invalid fields.", None)
+
+        result = self.session.execute(
+            select(*fields).where(self._pk.in_(ids)).order_by(self._pk)
+        )
+
+        return RPCResponse.success(self._rows(result), columnar=self._columnar)
+
+    def update_many(self, data: t.Any):
+        """
+        data: {"ids": [...], "values": {...}}, sets the same values on every
+        row in one UPDATE statement, or a list of rows that each include the
+        primary key, updated using a single bulk update. Nothing is updated
+        if any of the rows don't exist.
+        """
+        session = self.session
+
+        if isinstance(data, list):
+            if not data or len(data) > self._page_size:
+                return RPCResponse.fail(
+                    f"Expected a list of 1 to {self._page_size} rows.", None
+                )
+
+            for row in data:
+                if self._id(row):
+                    return RPCResponse.fail(f"{self._pk.key} is required.", None)
+
+                if not self._values(
+                    {k: v for k, v in row.items() if k != self._pk.key}
+                ):
+                    return RPCResponse.fail("Invalid data.", None)
+
+            # In request order, ids of different types aren't sorted
+            ids = list(dict.fromkeys(row[self._pk.key] for row in data))
+            found = set(
+                session.execute(select(self._pk).where(self._pk.in_(ids))).scalars()
+            )
+
+            if missing := [i for i in ids if i not in found]:
+                return RPCResponse.fail("Not found.", {"ids": missing})
+
+            def write():
+                session.execute(update(self._model), data)
+                return RPCResponse.success({"updated": len(ids)})
+
+            return self._write(session, write, None)
+
+        if not (ids := self._ids(data)):
+            return RPCResponse.fail(
+                f"Expected ids, a list of 1 to {self._page_size} values.", None
+            )
+
+        if not (values := self._values(data.get("values"))):
+            return RPCResponse.fail("Invalid data.", None)
+
+        def write():
+            result = session.execute(
+                update(self._model)
+                .where(self._pk.in_(ids))
+                .values(values)
+                .execution_options(synchronize_session=False)
+            )
+            return RPCResponse.success({"updated": result.rowcount})
+
+        return self._write(session, write, None)
+
+    def delete_many(self, data: t.Any):
+        """
+        data: {"ids": [...]}, deleted in one DELETE statement.
+        """
+        if not (ids := self._ids(data)):
+            return RPCResponse.fail(
+                f"Expected ids, a list of 1 to {self._page_size} values.", None
+            )
+
+        session = self.session
+
+        def write():
+            result = session.execute(
+                delete(self._model)
+                .where(self._pk.in_(ids))
+                .execution_options(synchronize_session=False)
+            )
+            return RPCResponse.success({"deleted": result.rowcount})
+
+        return self._write(session, write, None)
+
+
+def _is_id(value: t.Any) -> bool:
+    """
+    Primary keys sent as JSON are strings or numbers.
+    """
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
@@ -1,2 +1,48 @@
+import typing as t
+
+
 class DataException(Exception):
     pass
+
+
+class CallException(Exception):
+    """
+    Raised by the RPC clients when a call returns a failed response.
+    """
+
+    response: t.Dict[str, t.Any]
+
+    def __init__(self, response: t.Dict[str, t.Any]):
+        super().__init__(
+            response.get("message") if isinstance(response, dict) else None
+        )
+        self.response = response
+
+
+class ResponseException(Exception):
+    """
+    Raised by the RPC clients when the server answers with an HTTP error
+    that isn't an RPCResponse, e.g. a proxy's 502 page.
+    """
+
+    status: int
+    content: bytes
+
+    def __init__(self, status: int, content: bytes):
+        super().__init__(f"The server responded with HTTP {status}.")
+        self.status = status
+        self.content = content
+
+
+class SchemaException(DataException):
+    """
+    Raised by Schema.validate, errors holds every problem found.
+    """
+
+    errors: t.List[t.Dict[str, str]]
+
+    def __init__(self, errors: t.List[t.Dict[str, str]]):
+        super().__init__(
+            "; ".join(f"{e['path'] or 'data'} {e['message']}" for e in errors)
+        )
+        self.errors = errors
@@ -1,3 +1,83 @@
-from .version_1_1 import RPC, RPCModel, RPCResponse, RPCRequest, RPCAuthSessionKey
+import typing as t
 
-__all__ = ["RPC", "RPCModel", "RPCResponse", "RPCRequest", "RPCAuthSessionKey"]
+from .version_1_1 import (
+    RPC,
+    RPCResponse,
+    RPCRequest,
+    RPCAuthSessionKey,
+    RPCAuthToken,
+    RPCTokens,
+    RPCAuthContext,
+    RPCAttachment,
+    RPCClient,
+    RPCFields,
+    RPCNotifications,
+    RPCRegistry,
+    RPCTable,
+)
+
+if t.TYPE_CHECKING:
+    from .version_1_1 import (
+        RPCModel,
+        RPCASGI,
+        RPCBalancedClient,
+        RPCCacheBackend,
+        RPCCacheStore,
+        RPCCacheStoreSQLite,
+        RPCEvents,
+        RPCIdempotency,
+        RPCIdempotencyStore,
+        RPCIdempotencyStoreSQLite,
+        RPCJobs,
+        RPCJobStore,
+        RPCJobStoreSQLite,
+        RPCMetrics,
+        RPCProcessPool,
+        RPCSocketServer,
+        RPCSocketClient,
+    )
+
+__all__ = [
+    "RPC",
+    "RPCModel",
+    "RPCResponse",
+    "RPCRequest",
+    "RPCAuthSessionKey",
+    "RPCAuthToken",
+    "RPCTokens",
+    "RPCAuthContext",
+    "RPCAttachment",
+    "RPCASGI",
+    "RPCBalancedClient",
+    "RPCCacheBackend",
+    "RPCCacheStore",
+    "RPCCacheStoreSQLite",
+    "RPCClient",
+    "RPCEvents",
+    "RPCFields",
+    "RPCIdempotency",
+    "RPCIdempotencyStore",
+    "RPCIdempotencyStoreSQLite",
+    "RPCJobs",
+    "RPCJobStore",
+    "RPCJobStoreSQLite",
+    "RPCMetrics",
+    "RPCNotifications",
+    "RPCProcessPool",
+    "RPCRegistry",
+    "RPCSocketServer",
+    "RPCSocketClient",
+    "RPCTable",
+]
+
+
+def __getattr__(name: str) -> t.Any:
+    # Names the version package imports on first use, see version_1_1._LAZY
+    from . import version_1_1
+
+    if name not in version_1_1._LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(version_1_1, name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,271 @@
+import hashlib
+import typing as t
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import Select, inspect, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import UnmappedColumnError
+from sqlalchemy.sql.elements import Label
+
+from .latest import RPCResponse
+
+
+def _dump_value(value: t.Any) -> t.Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _load_value(value: t.Any) -> t.Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+    return value
+
+
+class RPCKeyset:
+    """
+    Keyset (seek) pagination for SQLAlchemy select() statements.
+
+    Instead of an offset, each page starts after the last row of the
+    previous page, so deep pages cost the same as the first. The position
+    is sent to the client as an opaque, signed cursor, which is only valid
+    for the statement and ordering it came from.
+
+    Requires SQLAlchemy 2.0+
+    """
+
+    _secret_key: t.Optional[t.Union[str, bytes]]
+    _page_size: int
+    _max_page_size: int
+
+    def __init__(
+        self,
+        secret_key: t.Optional[t.Union[str, bytes]] = None,
+        page_size: int = 100,
+        max_page_size: int = 1000,
+        salt: str = "flask-rpc.cursor",
+    ):
+        """
+        :param secret_key: Optional, used to sign cursors, defaults to the
+            current app's secret_key
+        :param page_size: Int, rows per page when the request has no limit
+        :param max_page_size: Int, the largest limit a request can ask for
+        :param salt: Str
+        """
+        self._secret_key = secret_key
+        self._page_size = page_size
+        self._max_page_size = max_page_size
+        self._salt = salt
+
+    def _serializer(self) -> URLSafeSerializer:
+        secret_key = self._secret_key or current_app.secret_key
+
+        if not secret_key:
+            raise RuntimeError("RPCKeyset needs a secret_key to sign cursors.")
+
+        return URLSafeSerializer(secret_key, salt=self._salt)
+
+    def encode_cursor(self, values: t.Sequence[t.Any], scope: str = "") -> str:
+        """
+        :param values: The order_by values of the last row
+        :param scope: Str, a cursor is only decoded with the same scope
+        """
+        return self._serializer().dumps([scope, [_dump_value(v) for v in values]])
+
+    def decode_cursor(self, cursor: str, scope: str = "") -> t.Optional[t.List[t.Any]]:
+        try:
+            payload = self._serializer().loads(cursor)
+        except BadSignature:
+            return None
+
+        if (
+            not isinstance(payload, list)
+            or len(payload) != 2
+            or payload[0] != scope
+            or not isinstance(payload[1], list)
+        ):
+            return None
+
+        return [_load_value(v) for v in payload[1]]
+
+    def paginate(
+        self,
+        session: Session,
+        stmt: Select,
+        *order_by: t.Any,
+        data: t.Any = None,
+        descending: bool = False,
+    ) -> t.Union[t.Tuple[t.List[t.Any], t.Optional[str]], t.Dict[str, t.Any]]:
+        """
+        Fetch one page of stmt.
+
+        order_by must end with a unique column (usually the primary key), so
+        every row has a distinct position. The next cursor is read from the
+        last row, so each order_by column must be selected: a mapped column
+        of the selected model, or one of the selected columns, labelled or
+        not.
+
+        data is the request data, "cursor" and "limit" are read from it.
+
+        :param session: Session
+        :param stmt: Select
+        :param order_by: Columns, e.g. Clients.created_at, Clients.client_id
+        :param data: Any, the request data
+        :param descending: Bool
+        :return: (rows, next cursor), or a failed RPCResponse if the cursor
+            or limit is invalid
+        """
+        if not order_by:
+            raise ValueError("At least one order_by column is required.")
+
+        read, scalars = _position_reader(stmt, order_by)
+        scope = _scope(stmt, order_by, descending)
+
+        data = data if isinstance(data, dict) else {}
+        limit = data.get("limit", self._page_size)
+
+        if not isinstance(limit, int) or not 0 < limit <= self._max_page_size:
+            return RPCResponse.fail(
+                f"limit must be between 1 and {self._max_page_size}.", None
+            )
+
+        if cursor := data.get("cursor"):
+            after = (
+                self.decode_cursor(cursor, scope) if isinstance(cursor, str) else None
+            )
+
+            if after is None or len(after) != len(order_by):
+                return RPCResponse.fail("Invalid cursor.", None)
+
+            position = tuple_(*order_by)
+            stmt = stmt.where(
+                position < tuple_(*after) if descending else position > tuple_(*after)
+            )
+
+        if descending:
+            stmt = stmt.order_by(*(c.desc() for c in order_by))
+        else:
+            stmt = stmt.order_by(*order_by)
+
+        stmt = stmt.limit(limit + 1)
+
+        if scalars:
+            rows = session.scalars(stmt).all()
+        else:
+            rows = session.execute(stmt).all()
+
+        if len(rows) <= limit:
+            return list(rows), None
+
+        rows = rows[:limit]
+
+        return list(rows), self.encode_cursor(read(rows[-1]), scope)
+
+    def page(
+        self,
+        session: Session,
+        stmt: Select,
+        *order_by: t.Any,
+        data: t.Any = None,
+        descending: bool = False,
+        serialize: t.Optional[t.Callable[[t.Any], t.Any]] = None,
+        columnar: bool = False,
+    ) -> t.Dict[str, t.Any]:
+        """
+        Fetch one page of stmt and return it as an RPCResponse.page, see .paginate
+
+        :param serialize: Optional Callable, turns each row into JSON
+            serializable data, defaults to a dict of the row's columns
+        :param columnar: Bool, send the items in the columnar shape,
+            see RPCResponse.success
+        :return: RPCResponse
+        """
+        result = self.paginate(
+            session, stmt, *order_by, data=data, descending=descending
+        )
+
+        if isinstance(result, dict):
+            return result
+
+        rows, cursor = result
+
+        if serialize is None:
+            serialize = _row_to_dict
+
+        return RPCResponse.page(
+            [serialize(row) for row in rows], cursor, columnar=columnar
+        )
+
+
+def _position_reader(
+    stmt: Select, order_by: t.Sequence[t.Any]
+) -> t.Tuple[t.Callable[[t.Any], t.List[t.Any]], bool]:
+    """
+    How to read the order_by values from a result row, and whether the
+    statement selects a single model, whose rows are read as scalars.
+    """
+    descriptions = stmt.column_descriptions
+    expressions = [
+        c.__clause_element__() if hasattr(c, "__clause_element__") else c
+        for c in order_by
+    ]
+
+    if len(descriptions) == 1 and descriptions[0]["expr"] is descriptions[0]["entity"]:
+        mapper = inspect(descriptions[0]["entity"])
+        keys = []
+
+        for c, expression in zip(order_by, expressions):
+            try:
+                keys.append(mapper.get_property_by_column(expression).key)
+            except UnmappedColumnError:
+                raise ValueError(
+                    f"order_by {c} must be a column of {mapper.class_.__name__}."
+                ) from None
+
+        return lambda row: [getattr(row, key) for key in keys], True
+
+    selected = list(stmt.selected_columns)
+    indexes = []
+
+    for c, expression in zip(order_by, expressions):
+        for i, column in enumerate(selected):
+            if column.compare(expression) or (
+                isinstance(column, Label) and column.element.compare(expression)
+            ):
+                indexes.append(i)
+                break
+        else:
+            raise ValueError(f"order_by {c} must be one of the selected columns.")
+
+    return lambda row: [row[i] for i in indexes], False
+
+
+def _scope(stmt: Select, order_by: t.Sequence[t.Any], descending: bool) -> str:
+    """
+    A digest of the statement's tables, filters and parameters, and the
+    ordering, so a cursor can't be replayed against another list. The
+    selected columns are left out, so a client can change the fields it
+    reads between pages.
+    """
+    compiled = stmt.with_only_columns(*order_by, maintain_column_froms=True).compile()
+    key = repr((str(compiled), sorted(compiled.params.items()), descending))
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def _row_to_dict(row: t.Any) -> t.Dict[str, t.Any]:
+    if hasattr(row, "_mapping"):
+        return dict(row._mapping)
+
+    return {c.key: getattr(row, c.key) for c in row.__mapper__.column_attrs}
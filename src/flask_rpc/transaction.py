@@ -0,0 +1,178 @@
+import typing as t
+
+from sqlalchemy.orm import Session
+
+from .latest import RPCResponse
+
+ON_FAILURE = ("rollback", "partial")
+
+# Set in session.info while a batch runs, so a batch started by one of its
+# calls runs inside the same transaction.
+_RUNNING = "flask_rpc.transaction"
+
+
+class RPCTransaction:
+    """
+    Runs every call in a batch request inside one database transaction,
+    with a single commit at the end.
+
+    While a batch runs, session.commit() in a function only flushes, so
+    functions written to commit their own work can be batched unchanged.
+    commit and rollback are replaced on the session instance for the length
+    of the batch, and put back however it ends. The session can't join an
+    outer transaction instead, Flask-SQLAlchemy's session always binds to
+    its engine.
+
+    Requires SQLAlchemy 2.0+
+    """
+
+    _session: t.Union[Session, t.Callable[[], Session]]
+    _on_failure: str
+
+    def __init__(
+        self,
+        session: t.Union[Session, t.Callable[[], Session]],
+        on_failure: str = "rollback",
+    ):
+        """
+        on_failure "rollback" makes a batch all or nothing, once a call fails
+        the rest of the batch is skipped, and the whole transaction is rolled
+        back.
+
+        on_failure "partial" runs each call in a savepoint, a failed call is
+        rolled back on its own, and the calls that succeeded are committed.
+        SQLite's default driver doesn't support savepoints correctly, see
+        "Serializable isolation / Savepoints / Transactional DDL" in the
+        SQLAlchemy SQLite docs for the fix.
+
+        A call fails if its response is not ok, or if it calls
+        session.rollback().
+
+        :param session: Session, scoped_session (e.g. Flask-SQLAlchemy's db.session)
+        :param on_failure: Str, "rollback" or "partial"
+        """
+        if on_failure not in ON_FAILURE:
+            raise ValueError(
+                f"Unknown on_failure {on_failure}, use {' or '.join(ON_FAILURE)}."
+            )
+
+        self._session = session
+        self._on_failure = on_failure
+
+    @property
+    def session(self) -> Session:
+        return self._session() if callable(self._session) else self._session
+
+    def run(
+        self, calls: t.List[t.Callable[[], t.Dict[str, t.Any]]]
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """
+        Run the calls of a batch inside one transaction.
+
+        If a call raises, the transaction is rolled back and the
+        exception is raised. A batch run by one of the calls joins this
+        transaction.
+
+        :param calls: List of Callable, each returns an RPCResponse
+        :return: List of RPCResponse
+        """
+        session = self.session
+
+        if session.info.get(_RUNNING):
+            return [call() for call in calls]
+
+        rolled_back = False
+        savepoint = None
+
+        def deferred_rollback():
+            nonlocal rolled_back
+            rolled_back = True
+
+            if savepoint is not None:
+                if session.get_nested_transaction() is savepoint:
+                    savepoint.rollback()
+            else:
+                Session.rollback(session)
+
+        session.info[_RUNNING] = True
+        session.commit = session.flush
+        session.rollback = deferred_rollback
+
+        try:
+            if self._on_failure == "partial":
+                responses = []
+
+                for call in calls:
+                    rolled_back = False
+                    savepoint = session.begin_nested()
+                    response = call()
+
+                    if session.get_nested_transaction() is savepoint:
+                        if rolled_back or not _ok(response):
+                            savepoint.rollback()
+                        else:
+                            savepoint.commit()
+
+                    responses.append(
+                        RPCResponse.fail("Transaction rolled back.")
+                        if rolled_back and _ok(response)
+                        else response
+                    )
+
+                return self._commit(session, responses)
+
+            responses = []
+
+            for call in calls:
+                if rolled_back:
+                    responses.append(RPCResponse.fail("Transaction rolled back."))
+                    continue
+
+                response = call()
+                responses.append(response)
+
+                if not _ok(response):
+                    rolled_back = True
+
+            if rolled_back:
+                Session.rollback(session)
+
+                return [
+                    RPCResponse.fail("Transaction rolled back.")
+                    if _ok(response)
+                    else response
+                    for response in responses
+                ]
+
+            return self._commit(session, responses)
+
+        except BaseException:
+            Session.rollback(session)
+            raise
+
+        finally:
+            del session.commit
+            del session.rollback
+            del session.info[_RUNNING]
+
+    @staticmethod
+    def _commit(
+        session: Session, responses: t.List[t.Dict[str, t.Any]]
+    ) -> t.List[t.Dict[str, t.Any]]:
+        try:
+            Session.commit(session)
+        except Exception:
+            Session.rollback(session)
+
+            return [
+                RPCResponse.fail("Transaction failed to commit.")
+                if _ok(response)
+                else response
+                for response in responses
+            ]
+
+        return responses
+
+
+def _ok(response: t.Any) -> bool:
+    return isinstance(response, dict) and bool(response.get("ok"))
@@ -1,6 +1,9 @@
+import ast
+import functools
+import re
 import typing as t
 
-from .exceptions import DataException
+from .exceptions import DataException, SchemaException
 
 
 class DataBool:
@@ -87,3 +90,425 @@ class DataDict:
     @property
     def raw(self) -> dict:
         return self._data
+
+
+class Field:
+    """
+    The base of the Schema field types.
+    """
+
+    required: bool
+    nullable: bool
+
+    def __init__(self, required: bool = True, nullable: bool = False):
+        """
+        :param required: Bool, only used for Dict keys, the key must be present
+        :param nullable: Bool, None is allowed
+        """
+        self.required = required
+        self.nullable = nullable
+
+    def _emit(self, c: "_Compiler", var: str, path: str):
+        pass
+
+    def _fast(self, c: "_Compiler", var: str) -> t.Optional[str]:
+        """
+        An expression that is true if every item of the list var is valid,
+        used to check a whole list in one pass.
+        """
+        return None
+
+
+class AnyValue(Field):
+    pass
+
+
+class Bool(Field):
+    def _emit(self, c: "_Compiler", var: str, path: str):
+        c.line(f"if {var}.__class__ is not bool:")
+        c.error(path, "must be a bool", 1)
+
+    def _fast(self, c: "_Compiler", var: str) -> t.Optional[str]:
+        return f"set(map(type, {var})) <= {c.const(frozenset({bool}))}"
+
+
+class _Number(Field):
+    _types: t.FrozenSet[type]
+    _message: str
+
+    def __init__(
+        self,
+        min: t.Optional[t.Union[int, float]] = None,
+        max: t.Optional[t.Union[int, float]] = None,
+        required: bool = True,
+        nullable: bool = False,
+    ):
+        """
+        :param min: Optional, the lowest value allowed
+        :param max: Optional, the highest value allowed
+        :param required: Bool
+        :param nullable: Bool
+        """
+        super().__init__(required, nullable)
+
+        if min != min or max != max:
+            raise ValueError("min and max can't be NaN.")
+
+        self.min = min
+        self.max = max
+
+    def _type_check(self, c: "_Compiler", var: str) -> str:
+        if len(self._types) == 1:
+            return f"{var}.__class__ is not {next(iter(self._types)).__name__}"
+
+        return f"{var}.__class__ not in {c.const(self._types)}"
+
+    def _emit(self, c: "_Compiler", var: str, path: str):
+        c.line(f"if {self._type_check(c, var)}:")
+        c.error(path, self._message, 1)
+
+        if self.min is not None:
+            c.line(f"elif {var} < {c.const(self.min)}:")
+            c.error(path, f"must be at least {self.min}", 1)
+
+        if self.max is not None:
+            c.line(f"elif {var} > {c.const(self.max)}:")
+            c.error(path, f"must be at most {self.max}", 1)
+
+    def _fast(self, c: "_Compiler", var: str) -> t.Optional[str]:
+        expression = f"set(map(type, {var})) <= {c.const(self._types)}"
+
+        if self.min is not None:
+            expression += f" and min({var}) >= {c.const(self.min)}"
+
+        if self.max is not None:
+            expression += f" and max({var}) <= {c.const(self.max)}"
+
+        return expression
+
+
+class Int(_Number):
+    _types = frozenset({int})
+    _message = "must be an int"
+
+
+class Float(_Number):
+    _types = frozenset({int, float})
+    _message = "must be a number"
+
+
+class Str(Field):
+    def __init__(
+        self,
+        min_length: t.Optional[int] = None,
+        max_length: t.Optional[int] = None,
+        choices: t.Optional[t.Iterable[str]] = None,
+        pattern: t.Optional[str] = None,
+        required: bool = True,
+        nullable: bool = False,
+    ):
+        """
+        :param min_length: Optional Int
+        :param max_length: Optional Int
+        :param choices: Optional Iterable[str], the only values allowed
+        :param pattern: Optional Str, a regex the whole value must match
+        :param required: Bool
+        :param nullable: Bool
+        """
+        super().__init__(required, nullable)
+        self.min_length = min_length
+        self.max_length = max_length
+        self.choices = frozenset(choices) if choices is not None else None
+        self.pattern = re.compile(pattern) if pattern is not None else None
+
+    def _emit(self, c: "_Compiler", var: str, path: str):
+        c.line(f"if {var}.__class__ is not str:")
+        c.error(path, "must be a str", 1)
+
+        if self.min_length is not None:
+            c.line(f"elif len({var}) < {c.const(self.min_length)}:")
+            c.error(path, f"must be at least {self.min_length} characters", 1)
+
+        if self.max_length is not None:
+            c.line(f"elif len({var}) > {c.const(self.max_length)}:")
+            c.error(path, f"must be at most {self.max_length} characters", 1)
+
+        if self.choices is not None:
+            c.line(f"elif {var} not in {c.const(self.choices)}:")
+            c.error(path, f"must be one of {', '.join(sorted(self.choices))}", 1)
+
+        if self.pattern is not None:
+            c.line(f"elif {c.const(self.pattern)}.fullmatch({var}) is None:")
+            c.error(path, f"must match {self.pattern.pattern}", 1)
+
+    def _fast(self, c: "_Compiler", var: str) -> t.Optional[str]:
+        if self.pattern is not None:
+            return None
+
+        expression = f"set(map(type, {var})) <= {c.const(frozenset({str}))}"
+
+        if self.min_length is not None:
+            expression += f" and min(map(len, {var})) >= {c.const(self.min_length)}"
+
+        if self.max_length is not None:
+            expression += f" and max(map(len, {var})) <= {c.const(self.max_length)}"
+
+        if self.choices is not None:
+            expression += f" and set({var}) <= {c.const(self.choices)}"
+
+        return expression
+
+
+class ListOf(Field):
+    def __init__(
+        self,
+        item: t.Optional[Field] = None,
+        min_length: t.Optional[int] = None,
+        max_length: t.Optional[int] = None,
+        required: bool = True,
+        nullable: bool = False,
+    ):
+        """
+        Lists of Bool, Int, Float or Str are checked in one pass, items are
+        only checked one by one to report the errors.
+
+        :param item: Optional Field, every item must match
+        :param min_length: Optional Int
+        :param max_length: Optional Int
+        :param required: Bool
+        :param nullable: Bool
+        """
+        super().__init__(required, nullable)
+        self.item = item
+        self.min_length = min_length
+        self.max_length = max_length
+
+    def _emit(self, c: "_Compiler", var: str, path: str):
+        c.line(f"if {var}.__class__ is not list:")
+        c.error(path, "must be a list", 1)
+
+        if self.min_length is not None:
+            c.line(f"elif len({var}) < {c.const(self.min_length)}:")
+            c.error(path, f"must have at least {self.min_length} items", 1)
+
+        if self.max_length is not None:
+            c.line(f"elif len({var}) > {c.const(self.max_length)}:")
+            c.error(path, f"must have at most {self.max_length} items", 1)
+
+        if self.item is None or isinstance(self.item, AnyValue):
+            return
+
+        fast = None if self.item.nullable else self.item._fast(c, var)
+
+        c.line("else:" if fast is None else f"elif {var} and not ({fast}):")
+        c.indent += 1
+        index = c.name("i")
+        item = c.name("v")
+        c.line(f"for {index}, {item} in enumerate({var}):")
+        c.line(f"    if len(errors) >= {c.max_errors}:")
+        c.line("        break")
+        c.indent += 1
+        c.emit(self.item, item, f'{path} + "[" + str({index}) + "]"')
+        c.indent -= 2
+
+
+class DictOf(Field):
+    def __init__(
+        self,
+        keys: t.Optional[t.Dict[str, Field]] = None,
+        extra: str = "ignore",
+        required: bool = True,
+        nullable: bool = False,
+    ):
+        """
+        :param keys: Optional Dict[str, Field]
+        :param extra: Str, "ignore" or "forbid" keys not in keys
+        :param required: Bool
+        :param nullable: Bool
+        """
+        super().__init__(required, nullable)
+
+        if extra not in ("ignore", "forbid"):
+            raise ValueError(f"Unknown extra {extra}, use 'ignore' or 'forbid'.")
+
+        self.keys = keys or {}
+        self.extra = extra
+
+    def _emit(self, c: "_Compiler", var: str, path: str):
+        c.line(f"if {var}.__class__ is not dict:")
+        c.error(path, "must be a dict", 1)
+
+        if not self.keys and self.extra == "ignore":
+            return
+
+        c.line("else:")
+        c.indent += 1
+
+        for key, field in self.keys.items():
+            value = c.name("v")
+            key_path = c.join(path, repr(key))
+            c.line(f"{value} = {var}.get({key!r}, MISSING)")
+            c.line(f"if {value} is MISSING:")
+            if field.required:
+                c.error(key_path, "is required", 1)
+            else:
+                c.line("    pass")
+            c.line("else:")
+            c.indent += 1
+            c.emit(field, value, key_path)
+            c.indent -= 1
+
+        if self.extra == "forbid":
+            extra = c.name("extra")
+            c.line(
+                f"for {extra} in sorted({var}.keys() - {c.const(frozenset(self.keys))}, key=str):"
+            )
+            c.error(c.join(path, f"str({extra})"), "is not allowed", 1)
+
+        c.indent -= 1
+
+
+class _Compiler:
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.lines = []
+        self.indent = 1
+        self.constants = {"MISSING": _MISSING}
+        self._names = 0
+
+    def line(self, line: str):
+        self.lines.append("    " * self.indent + line)
+
+    def name(self, prefix: str) -> str:
+        self._names += 1
+        return f"{prefix}{self._names}"
+
+    def const(self, value: t.Any) -> str:
+        name = f"C{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    @staticmethod
+    def join(path: str, key: str) -> str:
+        """
+        The path expression of a key, paths known when compiling are
+        joined now, paths that depend on list indexes are joined when an
+        error is reported.
+        """
+        try:
+            parent = ast.literal_eval(path)
+            name = ast.literal_eval(key)
+        except ValueError:
+            return f"{path} + '.' + {key}" if path != "''" else key
+
+        return repr(f"{parent}.{name}" if parent else name)
+
+    def error(self, path: str, message: str, indent: int = 0):
+        self.lines.append(
+            "    " * (self.indent + indent)
+            + f"errors.append({{'path': {path}, 'message': {message!r}}})"
+        )
+
+    def emit(self, field: Field, var: str, path: str):
+        if field.nullable:
+            self.line(f"if {var} is not None:")
+            self.indent += 1
+
+        start = len(self.lines)
+        field._emit(self, var, path)
+
+        if len(self.lines) == start:
+            self.line("pass")
+
+        if field.nullable:
+            self.indent -= 1
+
+    def compile(self, field: Field) -> t.Callable[[t.Any], t.List[t.Dict[str, str]]]:
+        self.emit(field, "data", "''")
+        source = "\n".join(["def validate(data):", "    errors = []", *self.lines])
+        source += "\n    return errors\n"
+
+        namespace = dict(self.constants)
+        exec(compile(source, "<flask_rpc.validation.Schema>", "exec"), namespace)
+
+        validate = namespace["validate"]
+        validate.source = source
+        return validate
+
+
+_MISSING = object()
+
+
+class Schema:
+    """
+    A declarative schema, compiled once into a single validation function
+    that reports every error at once.
+
+    Schema({
+        "client_id": Int(min=1),
+        "name": Str(max_length=50),
+        "tags": ListOf(Str(), required=False),
+        "owner": DictOf({"id": Int(), "name": Str(nullable=True)}),
+    })
+    """
+
+    _field: Field
+    _validate: t.Callable[[t.Any], t.List[t.Dict[str, str]]]
+
+    def __init__(
+        self,
+        fields: t.Union[t.Dict[str, Field], Field],
+        extra: str = "ignore",
+        max_errors: int = 100,
+    ):
+        """
+        :param fields: Dict[str, Field] for a dict, or a single Field
+        :param extra: Str, "ignore" or "forbid" keys not in fields
+        :param max_errors: Int, checking stops after this many errors
+        """
+        self._field = fields if isinstance(fields, Field) else DictOf(fields, extra)
+        self._validate = _Compiler(max_errors).compile(self._field)
+
+    @property
+    def source(self) -> str:
+        """
+        The generated validation function, for debugging.
+        """
+        return self._validate.source
+
+    def errors(self, data: t.Any) -> t.List[t.Dict[str, str]]:
+        """
+        Check data, and return every error found.
+
+        :param data: Any
+        :return: List of {"path": "owner.name", "message": "must be a str"}
+        """
+        return self._validate(data)
+
+    def validate(self, data: t.Any) -> t.Any:
+        """
+        Check data, and raise SchemaException if it's invalid.
+
+        :param data: Any
+        :return: data
+        """
+        if errors := self._validate(data):
+            raise SchemaException(errors)
+
+        return data
+
+    def __call__(self, func: t.Callable) -> t.Callable:
+        """
+        Use the schema as a decorator, the function only runs if its data
+        is valid, otherwise a failed RPCResponse listing the errors is sent back.
+        """
+        from .latest import RPCResponse
+
+        @functools.wraps(func)
+        def wrapper(data: t.Any):
+            if errors := self._validate(data):
+                return RPCResponse.fail("Invalid data.", errors)
+
+            return func(data)
+
+        return wrapper
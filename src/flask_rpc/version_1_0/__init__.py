@@ -1,7 +1,22 @@
+import typing as t
+
 from .auth_session_key import RPCAuthSessionKey
-from .model import RPCModel
 from .request import RPCRequest
 from .response import RPCResponse
 from .rpc import RPC
 
+if t.TYPE_CHECKING:
+    from .model import RPCModel
+
 __all__ = ["RPC", "RPCResponse", "RPCModel", "RPCRequest", "RPCAuthSessionKey"]
+
+
+def __getattr__(name: str) -> t.Any:
+    # RPCModel needs pydantic, so it's imported on first use
+    if name != "RPCModel":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    from .model import RPCModel
+
+    globals()[name] = RPCModel
+    return RPCModel
@@ -1,7 +1,100 @@
+import importlib
+import typing as t
+
+from .attachments import RPCAttachment
+from .auth_context import RPCAuthContext
 from .auth_session_key import RPCAuthSessionKey
-from .model import RPCModel
+from .auth_token import RPCAuthToken, RPCTokens
+from .client import RPCClient
+from .columnar import RPCTable
+from .fields import RPCFields
+from .notifications import RPCNotifications
+from .registry import RPCRegistry
 from .request import RPCRequest
 from .response import RPCResponse
 from .rpc import RPC
 
-__all__ = ["RPC", "RPCResponse", "RPCModel", "RPCRequest", "RPCAuthSessionKey"]
+if t.TYPE_CHECKING:
+    from .asgi import RPCASGI
+    from .balancer import RPCBalancedClient
+    from .cache import RPCCacheBackend, RPCCacheStore, RPCCacheStoreSQLite
+    from .events import RPCEvents
+    from .idempotency import (
+        RPCIdempotency,
+        RPCIdempotencyStore,
+        RPCIdempotencyStoreSQLite,
+    )
+    from .jobs import RPCJobs, RPCJobStore, RPCJobStoreSQLite
+    from .metrics import RPCMetrics
+    from .model import RPCModel
+    from .process_pool import RPCProcessPool
+    from .sockets import RPCSocketClient, RPCSocketServer
+
+# Imported on first use, so the core only imports Flask and the stdlib.
+# RPCModel needs pydantic, the rest pull in asyncio, multiprocessing, sqlite3
+# or thread pools.
+_LAZY = {
+    "RPCModel": ".model",
+    "RPCASGI": ".asgi",
+    "RPCBalancedClient": ".balancer",
+    "RPCCacheBackend": ".cache",
+    "RPCCacheStore": ".cache",
+    "RPCCacheStoreSQLite": ".cache",
+    "RPCEvents": ".events",
+    "RPCIdempotency": ".idempotency",
+    "RPCIdempotencyStore": ".idempotency",
+    "RPCIdempotencyStoreSQLite": ".idempotency",
+    "RPCJobs": ".jobs",
+    "RPCJobStore": ".jobs",
+    "RPCJobStoreSQLite": ".jobs",
+    "RPCMetrics": ".metrics",
+    "RPCProcessPool": ".process_pool",
+    "RPCSocketServer": ".sockets",
+    "RPCSocketClient": ".sockets",
+}
+
+__all__ = [
+    "RPC",
+    "RPCResponse",
+    "RPCModel",
+    "RPCRequest",
+    "RPCAuthSessionKey",
+    "RPCAuthToken",
+    "RPCTokens",
+    "RPCAuthContext",
+    "RPCAttachment",
+    "RPCASGI",
+    "RPCBalancedClient",
+    "RPCCacheBackend",
+    "RPCCacheStore",
+    "RPCCacheStoreSQLite",
+    "RPCClient",
+    "RPCEvents",
+    "RPCFields",
+    "RPCIdempotency",
+    "RPCIdempotencyStore",
+    "RPCIdempotencyStoreSQLite",
+    "RPCJobs",
+    "RPCJobStore",
+    "RPCJobStoreSQLite",
+    "RPCMetrics",
+    "RPCNotifications",
+    "RPCProcessPool",
+    "RPCRegistry",
+    "RPCSocketServer",
+    "RPCSocketClient",
+    "RPCTable",
+]
+
+
+def __getattr__(name: str) -> t.Any:
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> t.List[str]:
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,196 @@
+import asyncio
+import contextvars
+import json
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+
+from .attachments import encode_multipart, split_attachments
+from .auth_context import RPCAuthContext
+from .notifications import status
+from .response import RPCResponse
+
+if t.TYPE_CHECKING:
+    from .rpc import RPC
+
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+class RPCASGI:
+    """
+    An ASGI app that serves the functions of an RPC instance, for running
+    under an async server such as uvicorn or hypercorn.
+    """
+
+    _rpc: "RPC"
+    _app: t.Optional[Flask]
+    _executor: ThreadPoolExecutor
+
+    def __init__(
+        self,
+        rpc: "RPC",
+        app: t.Optional[Flask] = None,
+        max_workers: t.Optional[int] = None,
+        max_body_size: int = MAX_BODY_SIZE,
+    ):
+        """
+        Requests use the same envelope and RPCResponse as the RPC route,
+        responses that carry attachments are sent as multipart/mixed.
+
+        async functions are awaited on the event loop, sync functions are
+        run on a thread pool so they don't block it.
+
+        host_auth is checked against the Host header, token_auth against the
+        bearer token in the Authorization header. Flask's session is not
+        available, so functions that use session_auth will be unauthorized.
+
+        :param rpc: RPC
+        :param app: Optional Flask, functions run inside its app context and
+            responses are encoded using its JSON provider
+        :param max_workers: Optional Int, size of the thread pool running sync functions
+        :param max_body_size: Int, the largest request body accepted in bytes
+        """
+        self._rpc = rpc
+        self._app = app
+        self._max_body_size = max_body_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="rpc_asgi"
+        )
+
+    async def __call__(self, scope: dict, receive: t.Callable, send: t.Callable):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        if scope["type"] != "http":
+            return
+
+        if scope["method"] != "POST":
+            await self._send(
+                send,
+                405,
+                RPCResponse.fail("Method not allowed."),
+                [(b"allow", b"POST")],
+            )
+            return
+
+        headers = {k.lower(): v for k, v in scope.get("headers", [])}
+
+        content_type = headers.get(b"content-type", b"").split(b";")[0].strip()
+        if content_type != b"application/json" and not (
+            content_type.startswith(b"application/") and content_type.endswith(b"+json")
+        ):
+            await self._send(send, 200, RPCResponse.fail("Request must be JSON."))
+            return
+
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+
+            body.extend(message.get("body", b""))
+            more_body = message.get("more_body", False)
+
+            if len(body) > self._max_body_size:
+                await self._send(send, 413, RPCResponse.fail("Request too large."))
+                return
+
+        try:
+            _json = json.loads(body) if body else None
+        except ValueError:
+            await self._send(send, 400, RPCResponse.fail("Invalid request."))
+            return
+
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        auth_context = RPCAuthContext(
+            host=headers[b"host"].decode("latin-1") if b"host" in headers else None,
+            token=authorization[7:].strip()
+            if authorization[:7].lower() == "bearer "
+            else None,
+        )
+
+        if self._app is None:
+            response = await self._rpc._handle_async(
+                _json, auth_context, self._run_sync
+            )
+        else:
+            with self._app.app_context():
+                response = await self._rpc._handle_async(
+                    _json, auth_context, self._run_sync
+                )
+
+        responses = response if isinstance(response, list) else [response]
+
+        if any(isinstance(r, dict) and r.get("attachments") for r in responses):
+            await self._send_multipart(send, response)
+        else:
+            await self._send(send, status(_json, response), response)
+
+    async def _run_sync(self, func: t.Callable, data: t.Any) -> t.Any:
+        # Copying the context carries the app context into the thread
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, contextvars.copy_context().run, func, data
+        )
+
+    def _dumps(self, obj: t.Any) -> bytes:
+        if self._app is not None:
+            return self._app.json.dumps(obj).encode()
+
+        return json.dumps(obj, default=str).encode()
+
+    async def _send(
+        self,
+        send: t.Callable,
+        status: int,
+        obj: t.Any,
+        extra_headers: t.Optional[t.List[t.Tuple[bytes, bytes]]] = None,
+    ):
+        payload = self._dumps(obj)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(payload)).encode()),
+                    *(extra_headers or []),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": payload})
+
+    async def _send_multipart(self, send: t.Callable, response: t.Any):
+        envelope, parts = split_attachments(response)
+        body, content_type, length = encode_multipart(
+            envelope, parts, lambda obj: self._dumps(obj).decode()
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", content_type.encode()),
+                    (b"content-length", str(length).encode()),
+                ],
+            }
+        )
+
+        for chunk in body:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _lifespan(self, receive: t.Callable, send: t.Callable):
+        while True:
+            message = await receive()
+
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+
+            elif message["type"] == "lifespan.shutdown":
+                self._executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
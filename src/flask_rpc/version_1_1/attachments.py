@@ -0,0 +1,400 @@
+import io
+import json
+import mmap
+import os
+import secrets
+import tempfile
+import typing as t
+from contextvars import ContextVar
+
+from werkzeug.formparser import parse_form_data
+from werkzeug.http import parse_options_header
+
+# Parts larger than this are spooled to a temporary file, and memory mapped
+SPOOL_SIZE = 1024 * 1024
+
+CHUNK_SIZE = 256 * 1024
+
+ENVELOPE = "envelope"
+
+Attachment = t.Union[bytes, bytearray, memoryview, t.BinaryIO, "RPCAttachment"]
+
+_current: ContextVar[t.Optional[t.Dict[str, "RPCAttachment"]]] = ContextVar(
+    "flask_rpc_attachments", default=None
+)
+
+
+class _SpooledPart(io.RawIOBase):
+    """
+    Holds an uploaded part in memory, moving it to a temporary file once
+    it's larger than SPOOL_SIZE.
+    """
+
+    def __init__(self, max_size: int = SPOOL_SIZE):
+        super().__init__()
+        self._max_size = max_size
+        self._file = io.BytesIO()
+        self._rolled = False
+
+    def writable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        if not self._rolled and self._file.tell() + len(b) > self._max_size:
+            file = tempfile.TemporaryFile()
+            file.write(self._file.getbuffer())
+            self._file = file
+            self._rolled = True
+
+        return self._file.write(b)
+
+    def readinto(self, b) -> int:
+        return self._file.readinto(b)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class RPCAttachment:
+    """
+    A binary part of a multipart request.
+
+    Small parts are held in memory and large parts are spooled to a
+    temporary file, .view() returns either without copying.
+    """
+
+    __slots__ = ("name", "filename", "content_type", "_file", "_mmap")
+
+    name: str
+    filename: t.Optional[str]
+    content_type: str
+
+    def __init__(
+        self,
+        name: str,
+        file: t.BinaryIO,
+        filename: t.Optional[str] = None,
+        content_type: str = "application/octet-stream",
+    ):
+        """
+        :param name: Str
+        :param file: A readable, seekable binary file
+        :param filename: Optional Str
+        :param content_type: Str
+        """
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self._file = file
+        self._mmap = None
+
+    @classmethod
+    def current(cls) -> t.Dict[str, "RPCAttachment"]:
+        """
+        The attachments of the request being handled, by name.
+
+        :return: Dict[str, RPCAttachment]
+        """
+        return _current.get() or {}
+
+    @property
+    def size(self) -> int:
+        return len(self.view())
+
+    @property
+    def stream(self) -> t.BinaryIO:
+        """
+        The attachment as a file, from the start.
+        """
+        self._file.seek(0)
+        return self._file
+
+    def view(self) -> memoryview:
+        """
+        The attachment's bytes, without copying them.
+
+        :return: memoryview
+        """
+        file = self._file
+
+        if isinstance(file, _SpooledPart) and not file._rolled:
+            file = file._file
+
+        if isinstance(file, io.BytesIO):
+            return file.getbuffer()
+
+        if self._mmap is None:
+            if os.fstat(file.fileno()).st_size == 0:
+                return memoryview(b"")
+
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return memoryview(self._mmap)
+
+    def read(self) -> bytes:
+        """
+        A copy of the attachment's bytes.
+        """
+        return self.view().tobytes()
+
+    def close(self):
+        """
+        Release the attachment. If a memoryview from .view() is still in
+        use, the memory or file is released once the view is garbage
+        collected instead.
+        """
+        try:
+            if self._mmap is not None:
+                self._mmap.close()
+
+            self._file.close()
+        except BufferError:
+            pass
+
+    def __repr__(self) -> str:
+        return f"<RPCAttachment {self.name!r} ({self.content_type})>"
+
+
+def _stream_factory(*_: t.Any, **__: t.Any) -> t.BinaryIO:
+    return _SpooledPart()
+
+
+def read_multipart(
+    environ: t.Dict[str, t.Any],
+    max_form_memory_size: t.Optional[int] = None,
+    max_content_length: t.Optional[int] = None,
+) -> t.Tuple[t.Any, t.Dict[str, RPCAttachment]]:
+    """
+    Read a multipart/form-data request, the JSON envelope is sent as the
+    "envelope" field, and each file part is an attachment.
+
+    :return: The decoded envelope (None if missing or invalid), and the
+        attachments by name
+    """
+    _, form, files = parse_form_data(
+        environ,
+        stream_factory=_stream_factory,
+        max_form_memory_size=max_form_memory_size,
+        max_content_length=max_content_length,
+    )
+
+    attachments = {
+        name: RPCAttachment(
+            name,
+            storage.stream,
+            storage.filename,
+            storage.content_type or "application/octet-stream",
+        )
+        for name, storage in files.items(multi=False)
+    }
+
+    if ENVELOPE in attachments:
+        envelope = attachments.pop(ENVELOPE).read()
+    else:
+        envelope = form.get(ENVELOPE)
+
+    try:
+        return json.loads(envelope) if envelope else None, attachments
+    except ValueError:
+        return None, attachments
+
+
+def _size(value: Attachment) -> int:
+    if isinstance(value, RPCAttachment):
+        return value.size
+
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return memoryview(value).nbytes
+
+    position = value.tell()
+    size = value.seek(0, os.SEEK_END) - position
+    value.seek(position)
+    return size
+
+
+def _chunks(value: Attachment, views: bool) -> t.Iterator[t.Union[bytes, memoryview]]:
+    if isinstance(value, bytes):
+        yield value
+        return
+
+    if isinstance(value, RPCAttachment):
+        value = value.view()
+
+    if isinstance(value, (bytearray, memoryview)):
+        view = memoryview(value).cast("B")
+        for i in range(0, view.nbytes, CHUNK_SIZE):
+            yield view[i : i + CHUNK_SIZE] if views else bytes(view[i : i + CHUNK_SIZE])
+        return
+
+    while chunk := value.read(CHUNK_SIZE):
+        yield chunk
+
+
+def _part_header(
+    boundary: bytes, disposition: str, name: str, content_type: str
+) -> bytes:
+    if "\r" in name or "\n" in name:
+        raise ValueError(f"Invalid attachment name {name!r}, it has a line break.")
+
+    # Quotes are escaped as browsers do, and Werkzeug reads them back
+    name = name.replace('"', "%22")
+
+    return (
+        f'--{boundary.decode()}\r\nContent-Disposition: {disposition}; name="{name}"'
+        f"\r\nContent-Type: {content_type}\r\n\r\n"
+    ).encode()
+
+
+def split_attachments(
+    response: t.Any,
+) -> t.Tuple[t.Any, t.List[t.Tuple[str, Attachment]]]:
+    """
+    Take the attachments out of RPCResponses, each response's attachments
+    are replaced by a list of their names.
+
+    :param response: RPCResponse or List of RPCResponse
+    :return: (response, list of (name, attachment) in order)
+    """
+    parts = []
+
+    def split(r: t.Any) -> t.Any:
+        if not isinstance(r, dict) or not r.get("attachments"):
+            return r
+
+        parts.extend(r["attachments"].items())
+
+        return {**r, "attachments": list(r["attachments"])}
+
+    if isinstance(response, list):
+        return [split(r) for r in response], parts
+
+    return split(response), parts
+
+
+def encode_multipart(
+    envelope: t.Any,
+    parts: t.List[t.Tuple[str, Attachment]],
+    dumps: t.Callable[[t.Any], str],
+    subtype: str = "mixed",
+    views: bool = False,
+) -> t.Tuple[t.Iterator[t.Union[bytes, memoryview]], str, int]:
+    """
+    Encode a multipart body, the first part is the JSON envelope, the rest
+    are the attachments. Attachments are streamed in chunks, not joined.
+
+    WSGI and ASGI servers need each chunk as bytes, so chunks of attachments
+    held in memory are copied unless views is set.
+
+    :param envelope: Any, encoded using dumps
+    :param parts: List of (name, attachment)
+    :param dumps: Callable, encodes the envelope as JSON
+    :param subtype: Str, "mixed" for responses, "form-data" for requests
+    :param views: Bool, send memoryviews of attachments held in memory,
+        for writers that take any buffer, e.g. a socket
+    :return: (Iterator of Bytes or memoryview, content type, content length)
+    """
+    boundary = secrets.token_hex(16).encode()
+    disposition = "form-data" if subtype == "form-data" else "inline"
+
+    head = (
+        _part_header(boundary, disposition, ENVELOPE, "application/json")
+        + dumps(envelope).encode()
+        + b"\r\n"
+    )
+
+    headers = []
+    length = len(head) + len(boundary) + 6
+    for name, value in parts:
+        header = _part_header(
+            boundary,
+            f'form-data; filename="{name}"' if subtype == "form-data" else "attachment",
+            name,
+            value.content_type
+            if isinstance(value, RPCAttachment)
+            else "application/octet-stream",
+        )
+        headers.append(header)
+        length += len(header) + _size(value) + 2
+
+    def body() -> t.Iterator[bytes]:
+        yield head
+
+        for header, (_, value) in zip(headers, parts):
+            yield header
+            yield from _chunks(value, views)
+            yield b"\r\n"
+
+        yield b"--" + boundary + b"--\r\n"
+
+    return body(), f"multipart/{subtype}; boundary={boundary.decode()}", length
+
+
+def decode_multipart(
+    content: bytes, content_type: str
+) -> t.Tuple[t.Any, t.List[t.Tuple[str, memoryview]]]:
+    """
+    Decode a multipart response made by encode_multipart, attachments are
+    memoryviews of content, so they are not copied.
+
+    :return: The decoded envelope, and a list of (name, memoryview)
+    """
+    boundary = parse_options_header(content_type)[1].get("boundary", "").encode()
+
+    if not boundary:
+        raise ValueError("Missing multipart boundary.")
+
+    view = memoryview(content)
+    delimiter = b"\r\n--" + boundary
+    position = content.index(b"--" + boundary) + len(boundary) + 2
+    envelope = None
+    parts = []
+
+    while content[position : position + 2] != b"--":
+        headers_end = content.index(b"\r\n\r\n", position)
+        headers = content[position + 2 : headers_end].decode("latin-1")
+        end = content.index(delimiter, headers_end + 4)
+
+        name = ""
+        for line in headers.split("\r\n"):
+            key, _, value = line.partition(":")
+            if key.strip().lower() == "content-disposition":
+                name = parse_options_header(value)[1].get("name", "")
+
+        if envelope is None and name == ENVELOPE:
+            envelope = json.loads(view[headers_end + 4 : end].tobytes())
+        else:
+            parts.append((name, view[headers_end + 4 : end]))
+
+        position = end + len(delimiter)
+
+    return envelope, parts
+
+
+def attach(response: t.Any, parts: t.List[t.Tuple[str, memoryview]]) -> t.Any:
+    """
+    Put the attachments decoded by decode_multipart back into the responses
+    that listed them.
+    """
+    parts = iter(parts)
+
+    for r in response if isinstance(response, list) else [response]:
+        if isinstance(r, dict) and isinstance(r.get("attachments"), list):
+            r["attachments"] = {name: next(parts)[1] for name in r["attachments"]}
+
+    return response
@@ -0,0 +1,27 @@
+import typing as t
+
+
+class RPCAuthContext:
+    """
+    The session and host that auth is checked against when calling
+    functions in-process with RPC.call / RPC.call_many.
+    """
+
+    session: t.Mapping[str, t.Any]
+    host: t.Optional[str]
+    token: t.Optional[str]
+
+    def __init__(
+        self,
+        session: t.Optional[t.Mapping[str, t.Any]] = None,
+        host: t.Optional[str] = None,
+        token: t.Optional[str] = None,
+    ):
+        """
+        :param session: Optional Mapping, checked by session_auth
+        :param host: Optional Str, checked by host_auth
+        :param token: Optional Str, the bearer token checked by token_auth
+        """
+        self.session = session if session is not None else {}
+        self.host = host
+        self.token = token
@@ -0,0 +1,205 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+
+
+def _b64encode(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).rstrip(b"=").decode()
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+class RPCTokens:
+    """
+    Signs and verifies HMAC-SHA256 bearer tokens.
+
+    Tokens look like "<kid>.<claims>.<signature>", kid names the key the
+    token was signed with, so keys can be rotated without invalidating
+    tokens signed with an older key that is still listed.
+    """
+
+    _keys: "OrderedDict[str, bytes]"
+    _cache: "OrderedDict[bytes, t.Tuple[str, t.Optional[t.Dict[str, t.Any]]]]"
+
+    def __init__(
+        self,
+        keys: t.Union[str, bytes, t.Dict[str, t.Union[str, bytes]]],
+        cache_size: int = 4096,
+    ):
+        """
+        :param keys: The secret key, or a Dict of key id to secret key,
+            the first key is used to sign new tokens
+        :param cache_size: Int, how many decoded tokens are kept
+        """
+        if isinstance(keys, (str, bytes)):
+            keys = {"0": keys}
+
+        if not keys:
+            raise ValueError("At least one key is required.")
+
+        self._keys = OrderedDict(
+            (kid, key.encode() if isinstance(key, str) else key)
+            for kid, key in keys.items()
+        )
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def rotate(self, kid: str, key: t.Union[str, bytes], keep: int = 1):
+        """
+        Sign new tokens with a new key, keeping the newest older keys so
+        tokens signed with them stay valid.
+
+        :param kid: Str, the new key id
+        :param key: The new secret key
+        :param keep: Int, how many older keys to keep
+        :return: None
+        """
+        with self._lock:
+            old = [(k, v) for k, v in self._keys.items() if k != kid][:keep]
+            self._keys = OrderedDict(
+                [(kid, key.encode() if isinstance(key, str) else key), *old]
+            )
+            self._cache.clear()
+
+    def sign(
+        self,
+        claims: t.Dict[str, t.Any],
+        expires_in: t.Optional[int] = None,
+        kid: t.Optional[str] = None,
+    ) -> str:
+        """
+        Create a signed token.
+
+        :param claims: Dict (JSON serializable)
+        :param expires_in: Optional Int seconds, sets the exp claim
+        :param kid: Optional Str, defaults to the first key
+        :return: Str
+        """
+        kid = kid if kid is not None else next(iter(self._keys))
+
+        if expires_in is not None:
+            claims = {**claims, "exp": int(time.time()) + expires_in}
+
+        body = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = f"{kid}.{body}".encode()
+        signature = hmac.new(self._keys[kid], signing_input, hashlib.sha256).digest()
+
+        return f"{kid}.{body}.{_b64encode(signature)}"
+
+    def verify(self, token: t.Optional[str]) -> t.Optional[t.Dict[str, t.Any]]:
+        """
+        Return the claims of a valid token, or None.
+
+        Decoded tokens are cached, keyed by a digest of the token, so
+        repeated calls with the same token skip the HMAC and JSON decode.
+
+        :param token: Optional Str
+        :return: Optional Dict
+        """
+        if not token or not isinstance(token, str):
+            return None
+
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                self._cache.move_to_end(digest)
+
+        if cached is not None:
+            kid, claims = cached
+            if kid not in self._keys:
+                claims = None
+        else:
+            kid, claims = self._decode(token)
+
+            with self._lock:
+                self._cache[digest] = (kid, claims)
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+
+        if claims is None:
+            return None
+
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)) and exp < time.time():
+            return None
+
+        return claims
+
+    def _decode(self, token: str) -> t.Tuple[str, t.Optional[t.Dict[str, t.Any]]]:
+        try:
+            kid, body, signature = token.split(".")
+        except ValueError:
+            return "", None
+
+        key = self._keys.get(kid)
+        if key is None:
+            return kid, None
+
+        try:
+            expected = hmac.new(key, f"{kid}.{body}".encode(), hashlib.sha256).digest()
+
+            if not hmac.compare_digest(expected, _b64decode(signature)):
+                return kid, None
+
+            claims = json.loads(_b64decode(body))
+        except ValueError:
+            return kid, None
+
+        if not isinstance(claims, dict):
+            return kid, None
+
+        return kid, claims
+
+
+class RPCAuthToken:
+    _tokens: RPCTokens
+    _claims: t.Dict[str, t.FrozenSet[t.Any]]
+
+    def __init__(
+        self,
+        tokens: RPCTokens,
+        claims: t.Optional[t.Dict[str, t.Iterable[t.Any]]] = None,
+    ):
+        """
+        Checks the bearer token of a request.
+
+        claims sets the values allowed for each claim, a token without the
+        claim, or with a value not in the allowed values, is unauthorized.
+        Without claims, any validly signed token is authorized.
+
+        :param tokens: RPCTokens
+        :param claims: Optional Dict[str, Iterable]
+        """
+        self._tokens = tokens
+        self._claims = {k: frozenset(v) for k, v in (claims or {}).items()}
+
+    def check(self, ask: t.Optional[str]) -> bool:
+        if (claims := self._tokens.verify(ask)) is None:
+            return False
+
+        for key, value_in in self._claims.items():
+            if key not in claims:
+                return False
+
+            value = claims[key]
+
+            if isinstance(value, list):
+                if value_in.isdisjoint(
+                    v for v in value if not isinstance(v, (list, dict))
+                ):
+                    return False
+
+            elif isinstance(value, dict) or value not in value_in:
+                return False
+
+        return True
@@ -0,0 +1,471 @@
+import bisect
+import hashlib
+import http.client
+import json
+import random
+import threading
+import time
+import typing as t
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from ..exceptions import ResponseException
+from .attachments import Attachment
+from .client import RPCClient
+
+# Weight of the latest call in each endpoint's average latency
+_DECAY = 0.2
+
+# Seconds for an endpoint's recorded latency to count half as much, so an
+# endpoint that was slow once is tried again after a while
+_HALF_LIFE = 5
+
+# Connection failures and timeouts, and error pages that aren't JSON
+_FAILURES = (OSError, http.client.HTTPException, ValueError, ResponseException)
+
+# Calls seen before the hedge delay is taken from the observed latency
+_MIN_SAMPLES = 20
+
+
+class _Endpoint:
+    __slots__ = (
+        "client",
+        "latency",
+        "updated",
+        "inflight",
+        "failures",
+        "ejected_until",
+    )
+
+    def __init__(self, client: RPCClient):
+        self.client = client
+        self.latency = 0.0
+        self.updated = 0.0
+        self.inflight = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def cost(self, now: float) -> float:
+        if not self.updated:
+            # Not measured yet, try it unless a call is already waiting on it
+            return float("inf") if self.inflight else 0.0
+
+        age = now - self.updated
+        return self.latency * 0.5 ** (age / _HALF_LIFE) * (self.inflight + 1)
+
+
+class _Ring:
+    """
+    A consistent hash ring, each endpoint is placed at many points, so
+    adding or removing one only moves the keys next to its points.
+    """
+
+    __slots__ = ("_points", "_endpoints", "_count")
+
+    def __init__(self, endpoints: t.List[_Endpoint], virtual_nodes: int):
+        points = sorted(
+            (_hash(f"{endpoint.client.url}#{i}"), n)
+            for n, endpoint in enumerate(endpoints)
+            for i in range(virtual_nodes)
+        )
+        self._points = [point for point, _ in points]
+        self._endpoints = [endpoints[n] for _, n in points]
+        self._count = len(endpoints)
+
+    def owners(self, key: str) -> t.List[_Endpoint]:
+        """
+        Every endpoint, in the order they own the key.
+        """
+        at = bisect.bisect(self._points, _hash(key))
+        size = len(self._endpoints)
+        owners = []
+
+        for i in range(at, at + size):
+            if (endpoint := self._endpoints[i % size]) not in owners:
+                owners.append(endpoint)
+
+                if len(owners) == self._count:
+                    break
+
+        return owners
+
+
+class RPCBalancedClient(RPCClient):
+    """
+    An HTTP client for the same RPC route served by several endpoints.
+
+    Each call goes to the less loaded of two endpoints picked at random,
+    judged by their average latency and the calls they have in flight.
+    Latency recorded a while ago counts for less, so a slow endpoint gets
+    tried again.
+    Endpoints that fail eject_failures times in a row are left out for
+    eject_for seconds.
+
+    Calls to idempotent functions, or sent with an idempotency_key, are
+    hedged: if the first endpoint hasn't answered after hedge_after
+    seconds, the call is also sent to a second endpoint, and the first
+    response is used. The slower call is cancelled if it hasn't started,
+    otherwise it finishes in the background, and its latency or failure is
+    still recorded.
+
+    Functions in route_by are sent to the endpoint that owns the value of
+    their data key on a consistent hash ring instead, so calls for the same
+    key reach the same endpoint and find its cache warm. If that endpoint is
+    ejected, the next one on the ring is used.
+    """
+
+    _endpoints: t.List[_Endpoint]
+    _idempotent: t.FrozenSet[str]
+    _hedge_after: t.Optional[float]
+    _samples: "deque[float]"
+    _route_by: t.Dict[str, str]
+    _ring: t.Optional[_Ring]
+
+    def __init__(
+        self,
+        urls: t.Sequence[str],
+        timeout: t.Optional[float] = None,
+        headers: t.Optional[t.Dict[str, str]] = None,
+        token: t.Optional[str] = None,
+        idempotent: t.Iterable[str] = (),
+        hedge_after: t.Optional[float] = None,
+        eject_failures: int = 3,
+        eject_for: float = 10,
+        route_by: t.Optional[t.Dict[str, str]] = None,
+        virtual_nodes: int = 160,
+    ):
+        """
+        :param urls: Sequence of Str, the full URL of the RPC route on each
+            endpoint
+        :param timeout: Optional Float seconds
+        :param headers: Optional Dict[str, str], sent with every request
+        :param token: Optional Str, sent as a bearer token with every request
+        :param idempotent: Iterable of Str, the functions that are safe to
+            send twice
+        :param hedge_after: Optional Float seconds, None uses the 95th
+            percentile of the observed latency
+        :param eject_failures: Int, failures in a row that eject an endpoint
+        :param eject_for: Float seconds an ejected endpoint is left out
+        :param route_by: Optional Dict of function to the data key its calls
+            are routed by, e.g. {"clients.read": "client_id"}
+        :param virtual_nodes: Int, the points of each endpoint on the ring
+        """
+        if not urls:
+            raise ValueError("At least one URL is required.")
+
+        if eject_failures < 1:
+            raise ValueError("eject_failures must be at least 1.")
+
+        if virtual_nodes < 1:
+            raise ValueError("virtual_nodes must be at least 1.")
+
+        super().__init__(urls[0], timeout, headers, token)
+
+        self._endpoints = [
+            _Endpoint(RPCClient(url, timeout, headers, token)) for url in urls
+        ]
+        self._idempotent = frozenset(idempotent)
+        self._hedge_after = hedge_after
+        self._eject_failures = eject_failures
+        self._eject_for = eject_for
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=1000)
+        self._observed = 0
+        self._p95 = None
+        self._executor = None
+        self._route_by = dict(route_by or {})
+        self._virtual_nodes = virtual_nodes
+        self._ring = _Ring(self._endpoints, virtual_nodes) if self._route_by else None
+
+    @property
+    def urls(self) -> t.List[str]:
+        return [endpoint.client.url for endpoint in self._endpoints]
+
+    def add_endpoint(self, url: str):
+        """
+        Start sending calls to another endpoint, only the routed keys it
+        now owns move to it.
+
+        :param url: Str
+        :return: None
+        """
+        with self._lock:
+            if url in (e.client.url for e in self._endpoints):
+                return
+
+            client = RPCClient(url, self._timeout, self._headers)
+            self._set_endpoints([*self._endpoints, _Endpoint(client)])
+
+    def remove_endpoint(self, url: str):
+        """
+        Stop sending calls to an endpoint, only the routed keys it owned
+        move to the other endpoints.
+
+        :param url: Str
+        :return: None
+        """
+        with self._lock:
+            endpoints = [e for e in self._endpoints if e.client.url != url]
+
+            if not endpoints:
+                raise ValueError("Can't remove the last endpoint.")
+
+            removed = [e for e in self._endpoints if e.client.url == url]
+            self._set_endpoints(endpoints)
+
+        for endpoint in removed:
+            endpoint.client.close()
+
+    def _set_endpoints(self, endpoints: t.List[_Endpoint]):
+        """
+        Replace the endpoints, call with the lock held.
+        """
+        if self._route_by:
+            self._ring = _Ring(endpoints, self._virtual_nodes)
+
+        self._endpoints = endpoints
+
+    def _owners(self, body: t.Any) -> t.Optional[t.List[_Endpoint]]:
+        """
+        The endpoints in the order they own a routed call, None for calls
+        that aren't routed.
+        """
+        if (ring := self._ring) is None or not isinstance(body, dict):
+            return None
+
+        function = body.get("function")
+        data = body.get("data")
+
+        if (
+            (key := self._route_by.get(function)) is None
+            or not isinstance(data, dict)
+            or key not in data
+        ):
+            return None
+
+        return ring.owners(
+            f"{function}\0{json.dumps(data[key], sort_keys=True, default=str)}"
+        )
+
+    def _pick(
+        self,
+        exclude: t.Optional[_Endpoint] = None,
+        owners: t.Optional[t.List[_Endpoint]] = None,
+    ) -> t.Optional[_Endpoint]:
+        """
+        The first owner of a routed call, or the less loaded of two random
+        endpoints. Ejected endpoints are only used if every endpoint is
+        ejected.
+        """
+        now = time.monotonic()
+        candidates = [e for e in (owners or self._endpoints) if e is not exclude]
+        healthy = [e for e in candidates if e.ejected_until <= now]
+
+        if healthy:
+            candidates = healthy
+        elif candidates:
+            return min(candidates, key=lambda e: e.ejected_until)
+
+        if owners is not None:
+            return candidates[0] if candidates else None
+
+        if len(candidates) < 2:
+            return candidates[0] if candidates else None
+
+        a, b = random.sample(candidates, 2)
+        return a if a.cost(now) <= b.cost(now) else b
+
+    def _send_to(
+        self,
+        endpoint: _Endpoint,
+        body: t.Any,
+        attachments: t.Optional[t.Dict[str, Attachment]] = None,
+        get: bool = False,
+    ) -> t.Any:
+        with self._lock:
+            endpoint.inflight += 1
+
+        started = time.perf_counter()
+        try:
+            if get:
+                response = endpoint.client.get(body["function"], body["data"])
+            else:
+                response = endpoint.client.send(body, attachments)
+        except _FAILURES:
+            with self._lock:
+                endpoint.failures += 1
+
+                if endpoint.failures >= self._eject_failures:
+                    endpoint.ejected_until = time.monotonic() + self._eject_for
+
+            raise
+        finally:
+            with self._lock:
+                endpoint.inflight -= 1
+
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            endpoint.failures = 0
+            endpoint.latency = (
+                elapsed
+                if not endpoint.latency
+                else endpoint.latency + _DECAY * (elapsed - endpoint.latency)
+            )
+            endpoint.updated = time.monotonic()
+            self._samples.append(elapsed)
+            self._observed += 1
+
+            if self._observed % 50 == 0:
+                self._p95 = None
+
+        return response
+
+    def _hedge_delay(self) -> t.Optional[float]:
+        if self._hedge_after is not None:
+            return self._hedge_after
+
+        with self._lock:
+            if len(self._samples) < _MIN_SAMPLES:
+                return None
+
+            if self._p95 is None:
+                samples = sorted(self._samples)
+                self._p95 = samples[int(len(samples) * 0.95)]
+
+            return self._p95
+
+    def _hedgeable(self, body: t.Any) -> bool:
+        envelopes = body if isinstance(body, list) else [body]
+
+        return all(
+            isinstance(envelope, dict)
+            and (
+                envelope.get("function") in self._idempotent
+                or envelope.get("idempotency_key") is not None
+            )
+            for envelope in envelopes
+        )
+
+    def send(
+        self, body: t.Any, attachments: t.Optional[t.Dict[str, Attachment]] = None
+    ) -> t.Any:
+        """
+        Send a request envelope, or a list of them, to one of the endpoints,
+        see RPCClient.send
+
+        Requests with attachments are never hedged. A request that could be
+        hedged, and fails on one endpoint, is sent to another. Routed calls
+        go to the next owner on the ring.
+
+        :param body: Dict or List of Dict
+        :param attachments: Optional Dict[str, bytes, memoryview or binary file]
+        :return: RPCResponse or List of RPCResponse
+        """
+        owners = self._owners(body)
+        endpoint = self._pick(owners=owners)
+        hedgeable = (
+            not attachments and len(self._endpoints) > 1 and self._hedgeable(body)
+        )
+
+        if not hedgeable or (delay := self._hedge_delay()) is None:
+            try:
+                return self._send_to(endpoint, body, attachments)
+            except _FAILURES:
+                if not hedgeable:
+                    raise
+
+            return self._send_to(self._pick(endpoint, owners), body)
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=8 * len(self._endpoints),
+                        thread_name_prefix="rpc_hedge",
+                    )
+
+        first = self._executor.submit(self._send_to, endpoint, body)
+        done, _ = wait([first], timeout=delay)
+
+        if done and first.exception() is None:
+            return first.result()
+
+        second = self._executor.submit(
+            self._send_to, self._pick(endpoint, owners), body
+        )
+        return _first_result([first, second])
+
+    def get(self, function: str, data: t.Any = None) -> t.Dict[str, t.Any]:
+        """
+        Call a function registered with get__ using a GET request on one of
+        the endpoints, see RPCClient.get, GET requests aren't hedged.
+
+        :param function: Str
+        :param data: Any (JSON serializable)
+        :return: RPCResponse
+        """
+        body = {"function": function, "data": data}
+        return self._send_to(self._pick(owners=self._owners(body)), body, get=True)
+
+    def stats(self) -> t.List[t.Dict[str, t.Any]]:
+        """
+        The state of each endpoint, "url", "latency" (the average, in seconds),
+        "inflight", "failures" (in a row) and "ejected".
+
+        :return: List of Dict
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            return [
+                {
+                    "url": e.client.url,
+                    "latency": e.latency,
+                    "inflight": e.inflight,
+                    "failures": e.failures,
+                    "ejected": e.ejected_until > now,
+                }
+                for e in self._endpoints
+            ]
+
+    def close(self):
+        for endpoint in self._endpoints:
+            endpoint.client.close()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def _first_result(futures: t.List[Future]) -> t.Any:
+    """
+    The result of the first future that succeeds, or the exception of the
+    last one to fail. The others are cancelled, or drained if they already
+    started.
+    """
+    pending = set(futures)
+
+    while True:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    if not loser.cancel():
+                        loser.add_done_callback(_drain)
+
+                return future.result()
+
+        if not pending:
+            raise next(iter(done)).exception()
+
+
+def _drain(future: Future):
+    # The failure was recorded against its endpoint, nobody waits for it
+    if not future.cancelled():
+        future.exception()
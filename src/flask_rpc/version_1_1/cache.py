@@ -0,0 +1,238 @@
+import os
+import sqlite3
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+
+# The SQLite store evicts every EVICT_EVERY writes, or once the values written
+# since the last eviction add up to 1 / EVICT_EVERY of max_bytes.
+EVICT_EVERY = 100
+
+
+@t.runtime_checkable
+class RPCCacheBackend(t.Protocol):
+    """
+    The interface of a result cache backend, implement it to keep cached
+    results somewhere else, e.g. a network cache.
+
+    Values are the JSON encoded responses, as bytes. Backends are used from
+    many threads at once, and get / set are called while handling requests,
+    so they should be quick.
+    """
+
+    def get(self, key: str) -> t.Optional[bytes]: ...
+
+    def set(self, key: str, value: bytes, ttl: float): ...
+
+    def delete(self, key: str): ...
+
+    def clear(self): ...
+
+
+class RPCCacheStore:
+    """
+    In-memory LRU result cache, bounded by max_size entries and max_bytes.
+
+    Each worker process has its own, use RPCCacheStoreSQLite to share
+    cached results between workers.
+    """
+
+    _max_size: int
+    _max_bytes: int
+    _bytes: int
+    _entries: "OrderedDict[str, t.Tuple[float, bytes]]"
+
+    def __init__(self, max_size: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        """
+        :param max_size: Int maximum number of entries, least recently used
+            are evicted first
+        :param max_bytes: Int maximum total size of the cached values
+        """
+        self._max_size = max_size
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> t.Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            if entry[0] < time.monotonic():
+                self._pop(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        if len(value) > self._max_bytes:
+            return
+
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._bytes += len(value)
+
+            while len(self._entries) > self._max_size or self._bytes > self._max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _pop(self, key: str):
+        """
+        Remove an entry, call with the lock held.
+        """
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+
+class RPCCacheStoreSQLite:
+    """
+    SQLite backed result cache, shared between workers using the same
+    database file.
+
+    The database uses WAL mode, so reads don't wait for writes. Once the
+    cached values are larger than max_bytes, or there are more than max_size,
+    those closest to expiring are evicted first.
+
+    Eviction runs every EVICT_EVERY writes, not on each one, so the cache can
+    briefly hold a few more entries, or about 1% more bytes, than its limits.
+    """
+
+    _path: str
+    _max_size: int
+    _max_bytes: int
+    _writes: int
+    _written: int
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = 100000,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        :param path: Str path to the SQLite database file
+        :param max_size: Int maximum number of entries
+        :param max_bytes: Int maximum total size of the cached values
+        """
+        self._path = path
+        self._max_size = max_size
+        self._max_bytes = max_bytes
+        self._writes = 0
+        self._written = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rpc_cache ("
+                "key TEXT PRIMARY KEY, "
+                "expires REAL NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "value BLOB NOT NULL)"
+            )
+            # Covers the eviction queries, so they don't read the values
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS rpc_cache_expires "
+                "ON rpc_cache (expires, size)"
+            )
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=30)
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        A connection per thread, reused so a cache hit is a single query.
+        Connections are not shared with forked worker processes.
+        """
+        pid, conn = getattr(self._local, "connection", (None, None))
+
+        if pid != os.getpid():
+            conn = self._connect()
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = (os.getpid(), conn)
+
+        return conn
+
+    def get(self, key: str) -> t.Optional[bytes]:
+        row = (
+            self._connection()
+            .execute(
+                "SELECT value FROM rpc_cache WHERE key = ? AND expires >= ?",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+
+        return row[0] if row is not None else None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        if len(value) > self._max_bytes:
+            return
+
+        now = time.time()
+
+        with self._lock:
+            self._writes += 1
+            self._written += len(value)
+            evict = (
+                self._writes >= EVICT_EVERY
+                or self._written * EVICT_EVERY >= self._max_bytes
+            )
+
+            if evict:
+                self._writes = self._written = 0
+
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO rpc_cache (key, expires, size, value) "
+                "VALUES (?, ?, ?, ?)",
+                (key, now + ttl, len(value), value),
+            )
+
+            if not evict:
+                return
+
+            conn.execute("DELETE FROM rpc_cache WHERE expires < ?", (now,))
+
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM rpc_cache"
+            ).fetchone()
+
+            if count > self._max_size or total > self._max_bytes:
+                conn.execute(
+                    "DELETE FROM rpc_cache WHERE key IN ("
+                    "SELECT key FROM ("
+                    "SELECT key, "
+                    "ROW_NUMBER() OVER (ORDER BY expires DESC) AS n, "
+                    "SUM(size) OVER (ORDER BY expires DESC) AS running "
+                    "FROM rpc_cache) "
+                    "WHERE n > ? OR running > ?)",
+                    (self._max_size, self._max_bytes),
+                )
+
+    def delete(self, key: str):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM rpc_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM rpc_cache")
@@ -0,0 +1,339 @@
+import http.client
+import json
+import threading
+import typing as t
+from urllib.parse import urlsplit
+
+from ..exceptions import CallException, ResponseException
+from .attachments import Attachment, attach, decode_multipart, encode_multipart
+from .columnar import rehydrate
+from .request import RPCRequest
+
+
+class RPCClient:
+    """
+    An HTTP client for an RPC route, using a persistent connection per thread.
+    """
+
+    _url: str
+    _headers: t.Dict[str, str]
+    _timeout: t.Optional[float]
+
+    def __init__(
+        self,
+        url: str,
+        timeout: t.Optional[float] = None,
+        headers: t.Optional[t.Dict[str, str]] = None,
+        token: t.Optional[str] = None,
+    ):
+        """
+        :param url: Str, the full URL of the RPC route, e.g. "http://127.0.0.1:5000/rpc"
+        :param timeout: Optional Float seconds
+        :param headers: Optional Dict[str, str], sent with every request
+        :param token: Optional Str, sent as a bearer token with every request
+        """
+        parts = urlsplit(url)
+
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL {url}, use http or https.")
+
+        self._url = url
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+        self._path = parts.path or "/"
+        if parts.query:
+            self._path = f"{self._path}?{parts.query}"
+
+        self._timeout = timeout
+        self._headers = {"Content-Type": "application/json", **(headers or {})}
+        if token:
+            self._headers["Authorization"] = f"Bearer {token}"
+
+        self._local = threading.local()
+
+    @property
+    def url(self) -> str:
+        return self._url
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None:
+            connection_class = (
+                http.client.HTTPSConnection
+                if self._scheme == "https"
+                else http.client.HTTPConnection
+            )
+            connection = connection_class(self._netloc, timeout=self._timeout)
+            self._local.connection = connection
+
+        return connection
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        build: t.Callable[[], t.Tuple[t.Optional[bytes], t.Dict[str, str]]],
+        idempotent: bool,
+    ) -> t.Tuple[http.client.HTTPResponse, bytes]:
+        """
+        Make a request on this thread's connection. If the server closed an
+        idle keep-alive connection it's retried once on a new one, but only
+        when it's safe: the request is idempotent, or it failed before it
+        was written, so the server can't have run it.
+
+        Any other error, e.g. a timeout, closes the connection, so the next
+        request on this thread starts on a new one.
+
+        :param build: Callable returning the (payload, headers) of each attempt
+        """
+        for attempt in range(2):
+            payload, headers = build()
+            connection = self._connection()
+            written = False
+            try:
+                connection.request(method, path, payload, headers)
+                written = True
+                response = connection.getresponse()
+                return response, response.read()
+            except (
+                http.client.RemoteDisconnected,
+                ConnectionResetError,
+                BrokenPipeError,
+            ):
+                connection.close()
+                self._local.connection = None
+                if attempt or (written and not idempotent):
+                    raise
+            except BaseException:
+                connection.close()
+                self._local.connection = None
+                raise
+
+    def send(
+        self, body: t.Any, attachments: t.Optional[t.Dict[str, Attachment]] = None
+    ) -> t.Any:
+        """
+        Send a request envelope, or a list of them, and return the decoded
+        response.
+
+        Columnar data, see RPCResponse.success, is returned as an RPCTable.
+
+        attachments are sent as binary parts of a multipart request. Response
+        attachments are returned as memoryviews in the "attachments" of each
+        response.
+
+        If the connection is closed after the request was written, it's only
+        sent again when every envelope has an idempotency_key.
+
+        :param body: Dict or List of Dict
+        :param attachments: Optional Dict[str, bytes, memoryview or binary file]
+        :return: RPCResponse or List of RPCResponse
+        """
+        positions = {
+            name: value.tell()
+            for name, value in (attachments or {}).items()
+            if hasattr(value, "tell")
+        }
+
+        def build():
+            if not attachments:
+                return _dumps(body).encode(), self._headers
+
+            for name, position in positions.items():
+                attachments[name].seek(position)
+
+            payload, content_type, length = encode_multipart(
+                body, list(attachments.items()), _dumps, "form-data", views=True
+            )
+            return payload, {
+                **self._headers,
+                "Content-Type": content_type,
+                "Content-Length": str(length),
+            }
+
+        return _decode(*self._request("POST", self._path, build, _idempotent(body)))
+
+    def get(self, function: str, data: t.Any = None) -> t.Dict[str, t.Any]:
+        """
+        Call a function registered with get__ using a GET request, so caches
+        between the client and the app can answer it.
+
+        :param function: Str
+        :param data: Any (JSON serializable)
+        :return: RPCResponse
+        """
+        separator = "&" if "?" in self._path else "?"
+        path = f"{self._path}{separator}{RPCRequest.query(function, data)}"
+        headers = {k: v for k, v in self._headers.items() if k != "Content-Type"}
+
+        return _decode(*self._request("GET", path, lambda: (None, headers), True))
+
+    def call(
+        self,
+        function: str,
+        data: t.Any = None,
+        fields: t.Optional[t.List[str]] = None,
+        idempotency_key: t.Optional[str] = None,
+        attachments: t.Optional[t.Dict[str, Attachment]] = None,
+    ) -> t.Dict[str, t.Any]:
+        """
+        Call a function and return its RPCResponse.
+
+        :param function: Str
+        :param data: Any (JSON serializable)
+        :param fields: Optional List[str], narrows the response data
+        :param idempotency_key: Optional Str, retries with the same key get the
+            first response
+        :param attachments: Optional Dict[str, bytes, memoryview or binary file]
+        :return: RPCResponse
+        """
+        return self.send(
+            RPCRequest.build(function, data, fields, idempotency_key), attachments
+        )
+
+    def notify(
+        self,
+        function: str,
+        data: t.Any = None,
+        idempotency_key: t.Optional[str] = None,
+    ) -> t.Dict[str, t.Any]:
+        """
+        Send a notification, returns once the server has queued it, without
+        waiting for the function to run.
+
+        The response is not ok if the function doesn't exist, or the caller
+        isn't authorized, or the server has too many notifications pending,
+        send it again later.
+
+        :param function: Str
+        :param data: Any (JSON serializable)
+        :param idempotency_key: Optional Str, makes it safe to send again
+        :return: RPCResponse
+        """
+        return self.send(
+            RPCRequest.build(
+                function, data, idempotency_key=idempotency_key, notify=True
+            )
+        )
+
+    def call_many(
+        self, calls: t.Iterable[t.Tuple[str, t.Any]]
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """
+        Call many functions in one batch request.
+
+        :param calls: Iterable of (function, data)
+        :return: List of RPCResponse
+        """
+        return self.send([RPCRequest.build(function, data) for function, data in calls])
+
+    def pages(
+        self, function: str, data: t.Optional[t.Dict[str, t.Any]] = None
+    ) -> t.Iterator[t.List[t.Any]]:
+        """
+        Iterate over the pages of a function that returns RPCResponse.page,
+        the next page is only requested when the previous one is used.
+
+        :param function: Str
+        :param data: Optional Dict, the cursor is added to it for each page
+        :return: Iterator of List, one per page
+        """
+        cursor = None
+
+        while True:
+            response = self.call(function, {**(data or {}), "cursor": cursor})
+
+            if not response.get("ok"):
+                raise CallException(response)
+
+            page = response.get("data") or {}
+            yield page.get("items") or []
+
+            if not (cursor := page.get("cursor")):
+                return
+
+    def items(
+        self, function: str, data: t.Optional[t.Dict[str, t.Any]] = None
+    ) -> t.Iterator[t.Any]:
+        """
+        Iterate over the items of every page, see .pages
+
+        :param function: Str
+        :param data: Optional Dict
+        :return: Iterator
+        """
+        for page in self.pages(function, data):
+            yield from page
+
+    def subscribe(
+        self, topics: t.List[str], timeout: float = 25
+    ) -> t.Iterator[t.Dict[str, t.Any]]:
+        """
+        Long-poll the built-in subscribe function, yielding each change.
+
+        Each change is a Dict of "topics", the topics that changed, and
+        "reset", true if changes may have been missed. The client's timeout
+        must be longer than the subscribe timeout.
+
+        :param topics: List[str], e.g. ["clients:42", "clients:*"]
+        :param timeout: Float seconds each subscribe call waits for
+        :return: Iterator of Dict
+        """
+        data = {"topics": topics}
+
+        while True:
+            response = self.call("subscribe", data)
+
+            if not response.get("ok"):
+                raise CallException(response)
+
+            position = response["data"]
+
+            if "after" in data and (position["topics"] or position["reset"]):
+                yield position
+
+            data = {
+                "topics": topics,
+                "after": position["seq"],
+                "stream": position["stream"],
+                "timeout": timeout,
+            }
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def _decode(response: http.client.HTTPResponse, content: bytes) -> t.Any:
+    content_type = response.getheader("Content-Type", "")
+
+    if content_type.startswith("multipart/"):
+        envelope, parts = decode_multipart(content, content_type)
+        return rehydrate(attach(envelope, parts))
+
+    mimetype = content_type.split(";")[0].strip()
+
+    # Rejected notifications and ASGI errors are RPCResponses with an HTTP
+    # error status, anything else is an error page
+    if response.status >= 400 and not (
+        mimetype == "application/json" or mimetype.endswith("+json")
+    ):
+        raise ResponseException(response.status, content)
+
+    return rehydrate(json.loads(content))
+
+
+def _idempotent(body: t.Any) -> bool:
+    envelopes = body if isinstance(body, list) else [body]
+
+    return bool(envelopes) and all(
+        isinstance(envelope, dict) and envelope.get("idempotency_key") is not None
+        for envelope in envelopes
+    )
+
+
+def _dumps(obj: t.Any) -> str:
+    return json.dumps(obj, separators=(",", ":"))
@@ -0,0 +1,135 @@
+import typing as t
+from collections.abc import Sequence
+from operator import itemgetter
+
+
+class RPCTable(Sequence):
+    """
+    A list of records received in the columnar shape, the column names are
+    sent once instead of in every row.
+
+    Rows are turned back into dicts one at a time, as they are used, so
+    iterating behaves like the list of dicts the function returned.
+    Use .rows and .column() to read the values without building dicts,
+    e.g. pandas.DataFrame(table.rows, columns=table.columns)
+    """
+
+    __slots__ = ("columns", "rows")
+
+    columns: t.List[str]
+    rows: t.List[t.List[t.Any]]
+
+    def __init__(self, columns: t.List[str], rows: t.List[t.List[t.Any]]):
+        """
+        :param columns: List[str], the column names
+        :param rows: List of List, the values of each row, in column order
+        """
+        self.columns = columns
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [dict(zip(self.columns, row)) for row in self.rows[index]]
+
+        return dict(zip(self.columns, self.rows[index]))
+
+    def __iter__(self) -> t.Iterator[t.Dict[str, t.Any]]:
+        columns = self.columns
+
+        for row in self.rows:
+            yield dict(zip(columns, row))
+
+    def __eq__(self, other: t.Any) -> bool:
+        if isinstance(other, RPCTable):
+            return self.columns == other.columns and self.rows == other.rows
+
+        if isinstance(other, list):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"<RPCTable {len(self.rows)} rows, columns {self.columns!r}>"
+
+    def column(self, name: str) -> t.List[t.Any]:
+        """
+        The values of one column, e.g. for numpy.array(table.column("total"))
+
+        :param name: Str
+        :return: List
+        """
+        i = self.columns.index(name)
+        return [row[i] for row in self.rows]
+
+    def to_columns(self) -> t.Dict[str, t.List[t.Any]]:
+        """
+        Every column as a list, e.g. for pandas.DataFrame(table.to_columns())
+
+        :return: Dict[str, List]
+        """
+        return {
+            name: list(values) for name, values in zip(self.columns, zip(*self.rows))
+        }
+
+
+def encode_table(items: t.Any) -> t.Optional[t.Dict[str, t.List[t.Any]]]:
+    """
+    Encode a list of dicts that all have the same keys as
+    {"columns": [...], "rows": [[...], ...]}
+
+    :param items: Any
+    :return: Optional Dict, None if items is not a non-empty list of dicts
+        with the same keys
+    """
+    if not isinstance(items, list) or not items or not isinstance(items[0], dict):
+        return None
+
+    first = items[0]
+    keys = first.keys()
+
+    for item in items:
+        if not isinstance(item, dict) or item.keys() != keys:
+            return None
+
+    columns = list(first)
+
+    if len(columns) == 1:
+        name = columns[0]
+        return {"columns": columns, "rows": [[item[name]] for item in items]}
+
+    get = itemgetter(*columns)
+    return {"columns": columns, "rows": [list(get(item)) for item in items]}
+
+
+def _is_table(value: t.Any) -> bool:
+    return (
+        isinstance(value, dict)
+        and isinstance(value.get("columns"), list)
+        and isinstance(value.get("rows"), list)
+    )
+
+
+def rehydrate(response: t.Any) -> t.Any:
+    """
+    Replace the columnar data of responses with RPCTables, responses that
+    aren't columnar are returned unchanged.
+
+    :param response: RPCResponse or List of RPCResponse
+    :return: RPCResponse or List of RPCResponse
+    """
+    for r in response if isinstance(response, list) else [response]:
+        if not isinstance(r, dict) or not r.get("columnar"):
+            continue
+
+        data = r.get("data")
+
+        if _is_table(data):
+            r["data"] = RPCTable(data["columns"], data["rows"])
+        elif isinstance(data, dict) and _is_table(data.get("items")):
+            # RPCResponse.page
+            data["items"] = RPCTable(data["items"]["columns"], data["items"]["rows"])
+
+    return response
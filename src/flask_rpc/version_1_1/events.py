@@ -0,0 +1,240 @@
+import asyncio
+import os
+import threading
+import time
+import typing as t
+import uuid
+from collections import deque
+
+from .response import RPCResponse
+
+
+class RPCEvents:
+    """
+    An in-process event bus. Functions publish topics when they change
+    something, and clients long-poll the built-in subscribe function to find
+    out what changed, instead of polling read functions.
+
+    Every published topic gets the next sequence number, clients pass back
+    the last sequence number they saw, so no change is missed.
+
+    Each process has its own stream, a forked worker starts a new one, so a
+    client that moves between workers is told to reset.
+    """
+
+    _history: "deque[t.Tuple[int, str]]"
+    _async_waiters: t.Set[t.Tuple[asyncio.AbstractEventLoop, asyncio.Future]]
+
+    def __init__(
+        self,
+        history: int = 10000,
+        timeout: float = 25,
+        max_timeout: float = 60,
+    ):
+        """
+        :param history: Int, how many published topics are kept, a client that
+            falls further behind than this is told to reset
+        :param timeout: Float seconds subscribe waits for, if not set by the request
+        :param max_timeout: Float, the longest timeout a request can ask for
+        """
+        self._size = history
+        self._timeout = timeout
+        self._max_timeout = max_timeout
+        self._pid = None
+        self._fork_check()
+
+    def _fork_check(self):
+        """
+        Start a new stream in a new process, the parent's stream id, history
+        and locks are copied by fork but its sequence numbers move on without it.
+        """
+        if self._pid == os.getpid():
+            return
+
+        self._pid = os.getpid()
+        self._stream = uuid.uuid4().hex
+        self._seq = 0
+        self._history = deque(maxlen=self._size)
+        self._condition = threading.Condition()
+        self._async_waiters = set()
+
+    @property
+    def seq(self) -> int:
+        self._fork_check()
+        return self._seq
+
+    def publish(self, *topics: str) -> int:
+        """
+        Publish changed topics, e.g. events.publish("clients:42")
+
+        :param topics: Str
+        :return: Int, the sequence number of the last topic
+        """
+        self._fork_check()
+
+        with self._condition:
+            for topic in topics:
+                self._seq += 1
+                self._history.append((self._seq, topic))
+
+            seq = self._seq
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, set()
+
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The loop has been closed
+                pass
+
+        return seq
+
+    def _read(
+        self, data: t.Any
+    ) -> t.Union[t.Tuple[t.Callable[[str], bool], int, float], t.Dict[str, t.Any]]:
+        self._fork_check()
+
+        if not isinstance(data, dict):
+            return RPCResponse.fail("Invalid data.")
+
+        topics = data.get("topics")
+        if (
+            not isinstance(topics, list)
+            or not topics
+            or not all(isinstance(topic, str) and topic for topic in topics)
+        ):
+            return RPCResponse.fail("topics must be a list of topic names.")
+
+        after = data.get("after")
+        if after is not None and (
+            not isinstance(after, int) or isinstance(after, bool) or after < 0
+        ):
+            return RPCResponse.fail("after must be a sequence number.")
+
+        timeout = data.get("timeout", self._timeout)
+        if (
+            not isinstance(timeout, (int, float))
+            or isinstance(timeout, bool)
+            or not 0 <= timeout <= self._max_timeout
+        ):
+            return RPCResponse.fail(
+                f"timeout must be between 0 and {self._max_timeout}."
+            )
+
+        if after is None or data.get("stream", self._stream) != self._stream:
+            # A first subscribe, or a client that was subscribed to another
+            # worker, or before a restart, starts from the current position.
+            return RPCResponse.success(self._position(reset=after is not None))
+
+        return _matcher(topics), after, timeout
+
+    def _position(self, topics: t.Optional[t.List[str]] = None, reset: bool = False):
+        return {
+            "stream": self._stream,
+            "seq": self._seq,
+            "topics": topics or [],
+            "reset": reset,
+        }
+
+    def _changes(
+        self, match: t.Callable[[str], bool], after: int
+    ) -> t.Optional[t.Dict[str, t.Any]]:
+        """
+        The topics changed after the sequence number, call with the
+        condition held.
+        """
+        if after > self._seq or (self._history and self._history[0][0] > after + 1):
+            return self._position(reset=True)
+
+        topics = []
+        for seq, topic in reversed(self._history):
+            if seq <= after:
+                break
+
+            if topic not in topics and match(topic):
+                topics.append(topic)
+
+        if not topics:
+            return None
+
+        topics.reverse()
+        return self._position(topics)
+
+    def subscribe(self, data: t.Any):
+        """
+        data: {"topics": ["clients:42", "clients:*"], "after": Optional int,
+        "stream": Optional str, "timeout": Optional float}
+
+        Waits until one of the topics is published after the sequence number
+        "after", or the timeout expires. A topic ending in * matches every
+        topic that starts with it.
+
+        Without "after", the current position is returned straight away,
+        pass its "stream" and "seq" (as "after") to the next subscribe.
+
+        "reset" is true if changes may have been missed, reload everything.
+        """
+        read = self._read(data)
+
+        if isinstance(read, dict):
+            return read
+
+        match, after, timeout = read
+        deadline = time.monotonic() + timeout
+
+        with self._condition:
+            while (changes := self._changes(match, after)) is None:
+                if (remaining := deadline - time.monotonic()) <= 0:
+                    return RPCResponse.success(self._position())
+
+                self._condition.wait(remaining)
+
+        return RPCResponse.success(changes)
+
+    async def subscribe_async(self, data: t.Any):
+        """
+        The async version of .subscribe, waiting doesn't hold a thread.
+        """
+        read = self._read(data)
+
+        if isinstance(read, dict):
+            return read
+
+        match, after, timeout = read
+        deadline = time.monotonic() + timeout
+        loop = asyncio.get_running_loop()
+
+        while True:
+            with self._condition:
+                if (changes := self._changes(match, after)) is not None:
+                    return RPCResponse.success(changes)
+
+                waiter = (loop, loop.create_future())
+                self._async_waiters.add(waiter)
+
+            try:
+                await asyncio.wait_for(waiter[1], deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                with self._condition:
+                    self._async_waiters.discard(waiter)
+
+                    if (changes := self._changes(match, after)) is not None:
+                        return RPCResponse.success(changes)
+
+                    return RPCResponse.success(self._position())
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _matcher(topics: t.List[str]) -> t.Callable[[str], bool]:
+    exact = frozenset(topic for topic in topics if not topic.endswith("*"))
+    prefixes = tuple(topic[:-1] for topic in topics if topic.endswith("*"))
+
+    def match(topic: str) -> bool:
+        return topic in exact or topic.startswith(prefixes)
+
+    return match
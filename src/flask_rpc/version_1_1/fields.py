@@ -0,0 +1,165 @@
+import typing as t
+from contextvars import ContextVar
+from functools import lru_cache
+
+# A tree of the requested paths, None marks a field that is kept whole
+_Tree = t.Dict[str, t.Optional["_Tree"]]
+
+_current: ContextVar[t.Optional["RPCFields"]] = ContextVar(
+    "flask_rpc_fields", default=None
+)
+
+
+class RPCFields:
+    """
+    The fields a request asked for, used to project the response data.
+
+    Paths are dotted, e.g. "client.name", and are applied to every item
+    of a list, so "items.name" keeps only the name of each item.
+
+    For a page, see RPCResponse.page, paths are applied to the items, so
+    "name" and "items.name" are the same, and the cursor is always kept.
+    """
+
+    __slots__ = ("paths", "_tree")
+
+    paths: t.Tuple[str, ...]
+    _tree: _Tree
+
+    def __init__(self, paths: t.Iterable[str]):
+        """
+        :param paths: Iterable[str], dotted paths
+        """
+        self.paths = tuple(paths)
+        self._tree = {}
+
+        if not self.paths:
+            raise ValueError("At least one field is required.")
+
+        for path in self.paths:
+            if not isinstance(path, str):
+                raise TypeError(f"Expected a str field, got {type(path)}.")
+
+            *parents, name = path.split(".")
+
+            if not name or not all(parents):
+                raise ValueError(f"Invalid field {path!r}.")
+
+            node = self._tree
+            for parent in parents:
+                if parent in node and node[parent] is None:
+                    break
+                node = node.setdefault(parent, {})
+            else:
+                node[name] = None
+
+    @classmethod
+    def parse(cls, fields: t.Any) -> t.Optional["RPCFields"]:
+        """
+        Read the fields member of a request envelope, repeated
+        requests for the same fields share one RPCFields.
+
+        :param fields: Any
+        :return: Optional RPCFields, None if fields is invalid
+        """
+        if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+            return None
+
+        try:
+            return _parse(tuple(fields))
+        except ValueError:
+            return None
+
+    @classmethod
+    def current(cls) -> t.Optional["RPCFields"]:
+        """
+        The fields asked for by the request being handled, use this in
+        a function to only select the columns that will be returned.
+
+        :return: Optional RPCFields, None if every field was asked for
+        """
+        return _current.get()
+
+    @property
+    def top(self) -> t.List[str]:
+        """
+        The top level field names, e.g. ["client"] for "client.name"
+        """
+        return list(self._tree)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tree
+
+    def __repr__(self) -> str:
+        return f"RPCFields({list(self.paths)!r})"
+
+    def apply(self, data: t.Any, columnar: bool = False) -> t.Any:
+        """
+        Return a copy of data holding only the requested fields.
+
+        :param data: Any
+        :param columnar: Bool, data holds a {"columns", "rows"} table
+            made by RPCResponse.success(columnar=True)
+        :return: Any
+        """
+        project = _project_columnar if columnar else _project
+
+        if _is_page(data):
+            items = data["items"]
+
+            if "items" not in self._tree:
+                items = project(items, self._tree)
+            elif self._tree["items"] is not None:
+                items = project(items, self._tree["items"])
+
+            return {"items": items, "cursor": data["cursor"]}
+
+        return project(data, self._tree)
+
+
+@lru_cache(maxsize=256)
+def _parse(fields: t.Tuple[str, ...]) -> RPCFields:
+    return RPCFields(fields)
+
+
+def _is_page(value: t.Any) -> bool:
+    return isinstance(value, dict) and value.keys() == {"items", "cursor"}
+
+
+def _project(value: t.Any, tree: _Tree) -> t.Any:
+    if isinstance(value, dict):
+        return {
+            key: value[key] if sub is None else _project(value[key], sub)
+            for key, sub in tree.items()
+            if key in value
+        }
+
+    if isinstance(value, (list, tuple)):
+        return [_project(item, tree) for item in value]
+
+    return value
+
+
+def _project_columnar(value: t.Any, tree: _Tree) -> t.Any:
+    if not isinstance(value, dict):
+        return _project(value, tree)
+
+    columns = value.get("columns")
+    rows = value.get("rows")
+
+    if not isinstance(columns, list) or not isinstance(rows, list):
+        return {
+            key: value[key] if sub is None else _project_columnar(value[key], sub)
+            for key, sub in tree.items()
+            if key in value
+        }
+
+    keep = [(i, tree[name]) for i, name in enumerate(columns) if name in tree]
+
+    return {
+        "columns": [columns[i] for i, _ in keep],
+        "rows": [
+            [row[i] if sub is None else _project(row[i], sub) for i, sub in keep]
+            for row in rows
+        ],
+    }
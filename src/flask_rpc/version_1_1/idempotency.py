@@ -0,0 +1,325 @@
+import json
+import sqlite3
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .response import RPCResponse
+
+CLAIMED = "claimed"
+RUNNING = "running"
+DONE = "done"
+
+# The (key, response) of calls run inside RPCIdempotency.hold()
+_held: ContextVar[t.Optional[t.List[t.Tuple[str, t.Any]]]] = ContextVar(
+    "flask_rpc_idempotency_held", default=None
+)
+
+
+class RPCIdempotencyStore:
+    """
+    In-memory idempotency store, bounded by max_size and expiring responses
+    after ttl seconds.
+    """
+
+    _ttl: int
+    _max_size: int
+    _records: "OrderedDict[str, t.Tuple[float, str, t.Optional[t.Dict[str, t.Any]]]]"
+
+    def __init__(self, ttl: int = 86400, max_size: int = 10000):
+        """
+        :param ttl: Int seconds a response is kept for
+        :param max_size: Int maximum number of records, oldest are evicted first
+        """
+        self._ttl = ttl
+        self._max_size = max_size
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(
+        self, key: str, lease: float
+    ) -> t.Tuple[str, t.Optional[t.Dict[str, t.Any]]]:
+        """
+        Claim a key, unless it's done or another call holds it.
+
+        :param key: Str
+        :param lease: Float seconds the claim is held for, in case the
+            call never finishes
+        :return: (CLAIMED, None), (RUNNING, None) or (DONE, response)
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            record = self._records.get(key)
+
+            if record is not None and record[0] >= now:
+                return record[1], record[2]
+
+            self._records[key] = (now + lease, RUNNING, None)
+            self._records.move_to_end(key)
+
+            while len(self._records) > self._max_size:
+                self._records.popitem(last=False)
+
+        return CLAIMED, None
+
+    def finish(self, key: str, response: t.Dict[str, t.Any]):
+        with self._lock:
+            self._records[key] = (time.monotonic() + self._ttl, DONE, response)
+            self._records.move_to_end(key)
+
+    def release(self, key: str):
+        with self._lock:
+            record = self._records.get(key)
+
+            if record is not None and record[1] == RUNNING:
+                del self._records[key]
+
+
+class RPCIdempotencyStoreSQLite:
+    """
+    SQLite backed idempotency store, shared between workers using the same
+    database file.
+    """
+
+    _path: str
+    _ttl: int
+    _max_size: int
+
+    def __init__(self, path: str, ttl: int = 86400, max_size: int = 100000):
+        """
+        :param path: Str path to the SQLite database file
+        :param ttl: Int seconds a response is kept for
+        :param max_size: Int maximum number of records, oldest are evicted first
+        """
+        self._path = path
+        self._ttl = ttl
+        self._max_size = max_size
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rpc_idempotency ("
+                "key TEXT PRIMARY KEY, "
+                "expires REAL NOT NULL, "
+                "status TEXT NOT NULL, "
+                "response TEXT)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS rpc_idempotency_expires "
+                "ON rpc_idempotency (expires)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=30)
+
+    def begin(
+        self, key: str, lease: float
+    ) -> t.Tuple[str, t.Optional[t.Dict[str, t.Any]]]:
+        now = time.time()
+        conn = self._connect()
+        conn.isolation_level = None
+
+        try:
+            # IMMEDIATE takes the write lock first, so only one worker can
+            # claim the key.
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT status, response FROM rpc_idempotency "
+                "WHERE key = ? AND expires >= ?",
+                (key, now),
+            ).fetchone()
+
+            if row is None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO rpc_idempotency "
+                    "(key, expires, status, response) VALUES (?, ?, ?, NULL)",
+                    (key, now + lease, RUNNING),
+                )
+
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        if row is None:
+            return CLAIMED, None
+
+        return row[0], json.loads(row[1]) if row[1] is not None else None
+
+    def finish(self, key: str, response: t.Dict[str, t.Any]):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO rpc_idempotency "
+                "(key, expires, status, response) VALUES (?, ?, ?, ?)",
+                (key, now + self._ttl, DONE, json.dumps(response, default=str)),
+            )
+            conn.execute("DELETE FROM rpc_idempotency WHERE expires < ?", (now,))
+            conn.execute(
+                "DELETE FROM rpc_idempotency WHERE key NOT IN "
+                "(SELECT key FROM rpc_idempotency ORDER BY expires DESC LIMIT ?)",
+                (self._max_size,),
+            )
+
+    def release(self, key: str):
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM rpc_idempotency WHERE key = ? AND status = ?",
+                (key, RUNNING),
+            )
+
+
+class RPCIdempotency:
+    """
+    Stores the first response for each idempotency key, so a retried
+    request gets the same response without running the function again.
+    """
+
+    _store: t.Union[RPCIdempotencyStore, RPCIdempotencyStoreSQLite]
+    _lease: float
+    _wait: float
+    _events: t.Dict[str, threading.Event]
+
+    def __init__(
+        self,
+        store: t.Optional[
+            t.Union[RPCIdempotencyStore, RPCIdempotencyStoreSQLite]
+        ] = None,
+        lease: float = 60,
+        wait: float = 30,
+    ):
+        """
+        A request that arrives while the first request with the same key is
+        still running waits for it, and gets its response.
+
+        Calls that raise are not stored, so they can be retried.
+
+        :param store: Optional RPCIdempotencyStore or RPCIdempotencyStoreSQLite,
+            use the SQLite store to share keys between workers
+        :param lease: Float seconds a running call holds its key for, after
+            this the key can be claimed again
+        :param wait: Float seconds a duplicate request waits for the first
+        """
+        self._store = store if store is not None else RPCIdempotencyStore()
+        self._lease = lease
+        self._wait = wait
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def run(
+        self, key: str, func: t.Callable[[], t.Dict[str, t.Any]]
+    ) -> t.Dict[str, t.Any]:
+        """
+        Run func once for key, and return its response.
+
+        :param key: Str
+        :param func: Callable, returns an RPCResponse
+        :return: RPCResponse
+        """
+        deadline = time.monotonic() + self._wait
+        delay = 0.005
+
+        if (held := _held.get()) is not None:
+            # Repeated in the same batch, its key is still claimed
+            for held_key, response in held:
+                if held_key == key:
+                    return response
+
+        while True:
+            state, response = self._store.begin(key, self._lease)
+
+            if state == DONE:
+                return response
+
+            if state == CLAIMED:
+                return self._run(key, func)
+
+            if (remaining := deadline - time.monotonic()) <= 0:
+                return RPCResponse.fail(
+                    "A request with this idempotency_key is still running."
+                )
+
+            with self._lock:
+                event = self._events.get(key)
+
+            if event is not None:
+                # Running in this process, wake up as soon as it's done
+                event.wait(remaining)
+            else:
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.2)
+
+    def _run(
+        self, key: str, func: t.Callable[[], t.Dict[str, t.Any]]
+    ) -> t.Dict[str, t.Any]:
+        event = threading.Event()
+
+        with self._lock:
+            self._events[key] = event
+
+        try:
+            response = func()
+        except BaseException:
+            self.release(key)
+            raise
+
+        if (held := _held.get()) is not None:
+            held.append((key, response))
+        else:
+            self.finish(key, response)
+
+        return response
+
+    @contextmanager
+    def hold(self) -> t.Iterator[t.List[t.Tuple[str, t.Any]]]:
+        """
+        Hold the responses of calls run inside, for work that isn't kept
+        until a transaction commits. Their keys stay claimed, and each
+        (key, response) is added to the yielded list, pass them to .finish
+        once the work is kept, or .release if it was rolled back.
+
+        Every key is released if the block raises.
+
+        :return: List of (key, response)
+        """
+        held = []
+        token = _held.set(held)
+
+        try:
+            yield held
+        except BaseException:
+            for key, _ in held:
+                self.release(key)
+            raise
+        finally:
+            _held.reset(token)
+
+    def finish(self, key: str, response: t.Any):
+        """
+        Store the response for a claimed key, responses that carry
+        attachments aren't stored, their key is released.
+        """
+        if isinstance(response, dict) and "attachments" not in response:
+            self._store.finish(key, response)
+        else:
+            self._store.release(key)
+
+        self._done(key)
+
+    def release(self, key: str):
+        """
+        Release a claimed key without storing a response, so the next
+        request with it runs the function.
+        """
+        self._store.release(key)
+        self._done(key)
+
+    def _done(self, key: str):
+        with self._lock:
+            event = self._events.pop(key, None)
+
+        if event is not None:
+            event.set()
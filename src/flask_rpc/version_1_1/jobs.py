@@ -0,0 +1,404 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typing as t
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+
+from .response import RPCResponse
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Writes between the SQLite store's evictions
+PRUNE_EVERY = 100
+
+logger = logging.getLogger(__name__)
+
+# (pid, database path) of the SQLite stores checked for orphaned jobs, shared
+# by every store instance so a second store on the same file skips the check
+_started: t.Set[t.Tuple[int, str]] = set()
+_started_lock = threading.Lock()
+
+
+class RPCJobStore:
+    """
+    In-memory job store, bounded by max_size and expiring records after ttl seconds.
+    """
+
+    _ttl: int
+    _max_size: int
+    _records: "OrderedDict[str, t.Tuple[float, t.Dict[str, t.Any]]]"
+
+    def __init__(self, ttl: int = 3600, max_size: int = 1000):
+        """
+        :param ttl: Int seconds a record is kept for
+        :param max_size: Int maximum number of records, oldest are evicted first
+        """
+        self._ttl = ttl
+        self._max_size = max_size
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set(self, job_id: str, record: t.Dict[str, t.Any]):
+        with self._lock:
+            self._records[job_id] = (time.monotonic() + self._ttl, record)
+            self._records.move_to_end(job_id)
+
+            while len(self._records) > self._max_size:
+                self._records.popitem(last=False)
+
+    def get(self, job_id: str) -> t.Optional[t.Dict[str, t.Any]]:
+        with self._lock:
+            entry = self._records.get(job_id)
+
+            if entry is None:
+                return None
+
+            if entry[0] < time.monotonic():
+                del self._records[job_id]
+                return None
+
+            return entry[1]
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._records.pop(job_id, None)
+
+
+class RPCJobStoreSQLite:
+    """
+    SQLite backed job store, records survive a worker restart and are
+    shared between workers using the same database file.
+
+    Expired records, and the oldest beyond max_size, are removed every
+    PRUNE_EVERY writes, so the table can briefly hold more than max_size.
+    Jobs left pending or running by a worker that has exited are marked
+    failed the first time the database is used in each worker process.
+    """
+
+    _path: str
+    _ttl: int
+    _max_size: int
+
+    def __init__(self, path: str, ttl: int = 3600, max_size: int = 10000):
+        """
+        :param path: Str path to the SQLite database file
+        :param ttl: Int seconds a record is kept for
+        :param max_size: Int maximum number of records, oldest are evicted first
+        """
+        self._path = path
+        self._ttl = ttl
+        self._max_size = max_size
+        self._writes = 0
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rpc_jobs ("
+                "job_id TEXT PRIMARY KEY, "
+                "expires REAL NOT NULL, "
+                "record TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS rpc_jobs_expires ON rpc_jobs (expires)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=30)
+
+    def _started(self):
+        """
+        Mark failed the jobs left unfinished by workers that have exited,
+        once for each database file in each process. Jobs of live workers,
+        this one included, are left alone.
+        """
+        key = (os.getpid(), os.path.realpath(self._path))
+
+        with _started_lock:
+            if key in _started:
+                return
+
+            _started.add(key)
+
+        orphans = []
+
+        with self._connect() as conn:
+            for job_id, record in conn.execute(
+                "SELECT job_id, record FROM rpc_jobs WHERE expires >= ?",
+                (time.time(),),
+            ):
+                record = json.loads(record)
+
+                if record.get("status") in (PENDING, RUNNING) and not _alive(
+                    record.get("pid")
+                ):
+                    orphans.append((job_id, record))
+
+            for job_id, record in orphans:
+                conn.execute(
+                    "UPDATE rpc_jobs SET record = ? WHERE job_id = ?",
+                    (
+                        json.dumps(
+                            {
+                                "job_id": job_id,
+                                "function": record.get("function"),
+                                "status": FAILED,
+                                "response": RPCResponse.fail(
+                                    "Job lost, its worker exited."
+                                ),
+                            }
+                        ),
+                        job_id,
+                    ),
+                )
+
+    def set(self, job_id: str, record: t.Dict[str, t.Any]):
+        self._started()
+        now = time.time()
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO rpc_jobs (job_id, expires, record) "
+                "VALUES (?, ?, ?)",
+                (job_id, now + self._ttl, json.dumps(record, default=str)),
+            )
+
+            self._writes += 1
+            if self._writes % PRUNE_EVERY:
+                return
+
+            conn.execute("DELETE FROM rpc_jobs WHERE expires < ?", (now,))
+            # Walks the expires index, instead of sorting the table
+            conn.execute(
+                "DELETE FROM rpc_jobs WHERE expires < ("
+                "SELECT expires FROM rpc_jobs ORDER BY expires DESC "
+                "LIMIT 1 OFFSET ?)",
+                (self._max_size - 1,),
+            )
+
+    def get(self, job_id: str) -> t.Optional[t.Dict[str, t.Any]]:
+        self._started()
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT record FROM rpc_jobs WHERE job_id = ? AND expires >= ?",
+                (job_id, time.time()),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return json.loads(row[0])
+
+    def delete(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM rpc_jobs WHERE job_id = ?", (job_id,))
+
+
+class RPCJobs:
+    """
+    Runs job functions on a worker pool and keeps track of their results.
+    """
+
+    _executor: t.Union[ThreadPoolExecutor, ProcessPoolExecutor]
+    _store: t.Union[RPCJobStore, RPCJobStoreSQLite]
+    _futures: t.Dict[str, Future]
+    _uses_threads: bool
+
+    def __init__(
+        self,
+        executor: str = "thread",
+        max_workers: t.Optional[int] = None,
+        store: t.Optional[t.Union[RPCJobStore, RPCJobStoreSQLite]] = None,
+    ):
+        """
+        executor "thread" runs jobs inside the current Flask app context,
+        "process" runs them in a process pool, job functions must then be
+        importable (picklable) and not use Flask globals.
+
+        :param executor: Str "thread" or "process"
+        :param max_workers: Optional Int
+        :param store: Optional RPCJobStore or RPCJobStoreSQLite
+        """
+        if executor == "thread":
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="rpc_job"
+            )
+            self._uses_threads = True
+        elif executor == "process":
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+            self._uses_threads = False
+        else:
+            raise ValueError(f"Unknown executor {executor}, use 'thread' or 'process'.")
+
+        self._store = store if store is not None else RPCJobStore()
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, function: str, func: t.Callable, data: t.Any) -> str:
+        job_id = uuid.uuid4().hex
+        record = {
+            "job_id": job_id,
+            "function": function,
+            "status": PENDING,
+            "pid": os.getpid(),
+        }
+        self._store.set(job_id, record)
+
+        if self._uses_threads:
+            app = current_app._get_current_object() if has_app_context() else None
+            future = self._executor.submit(self._run_in_thread, app, job_id, func, data)
+        else:
+            future = self._executor.submit(func, data)
+
+        with self._lock:
+            self._futures[job_id] = future
+
+        future.add_done_callback(
+            lambda f: self._finish(job_id, function, f),
+        )
+        return job_id
+
+    def _run_in_thread(self, app, job_id: str, func: t.Callable, data: t.Any):
+        record = self._store.get(job_id)
+        if record is not None:
+            self._store.set(job_id, {**record, "status": RUNNING})
+
+        if app is None:
+            return func(data)
+
+        with app.app_context():
+            return func(data)
+
+    def _finish(self, job_id: str, function: str, future: Future):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+        record = {"job_id": job_id, "function": function}
+
+        if future.cancelled():
+            self._store.set(job_id, {**record, "status": CANCELLED})
+            return
+
+        if (error := future.exception()) is not None:
+            logger.exception(f"Job {function} ({job_id}) failed.", exc_info=error)
+            self._store.set(
+                job_id,
+                {
+                    **record,
+                    "status": FAILED,
+                    "response": RPCResponse.fail(f"Job raised {type(error).__name__}."),
+                },
+            )
+            return
+
+        response = future.result()
+        self._store.set(
+            job_id,
+            {
+                **record,
+                "status": DONE,
+                "response": response
+                if response
+                else RPCResponse.fail("Unsuccessful command execution."),
+            },
+        )
+
+    def _record(self, job_id: t.Any) -> t.Optional[t.Dict[str, t.Any]]:
+        if not isinstance(job_id, str):
+            return None
+
+        record = self._store.get(job_id)
+        if record is None:
+            return None
+
+        with self._lock:
+            future = self._futures.get(job_id)
+
+        if future is not None and future.running() and record["status"] == PENDING:
+            record = {**record, "status": RUNNING}
+
+        return record
+
+    def function(self, job_id: t.Any) -> t.Optional[str]:
+        """
+        The name of the function that queued a job, RPC checks its auth
+        before job.status, job.result and job.cancel.
+
+        :param job_id: Any
+        :return: Optional Str, None if the job isn't found
+        """
+        if (record := self._record(job_id)) is None:
+            return None
+
+        return record["function"]
+
+    def status(self, data: t.Any):
+        if not (record := self._record(data)):
+            return RPCResponse.fail("Job not found.")
+
+        return RPCResponse.success(
+            {
+                "job_id": record["job_id"],
+                "function": record["function"],
+                "status": record["status"],
+            }
+        )
+
+    def result(self, data: t.Any):
+        if not (record := self._record(data)):
+            return RPCResponse.fail("Job not found.")
+
+        if record["status"] in (PENDING, RUNNING):
+            return RPCResponse.fail(
+                "Job not finished.", {"job_id": data, "status": record["status"]}
+            )
+
+        if record["status"] == CANCELLED:
+            return RPCResponse.fail(
+                "Job cancelled.", {"job_id": data, "status": CANCELLED}
+            )
+
+        return record["response"]
+
+    def cancel(self, data: t.Any):
+        if not (record := self._record(data)):
+            return RPCResponse.fail("Job not found.")
+
+        with self._lock:
+            future = self._futures.get(data)
+
+        if future is None or not future.cancel():
+            return RPCResponse.fail(
+                "Job can no longer be cancelled.",
+                {"job_id": data, "status": record["status"]},
+            )
+
+        return RPCResponse.success({"job_id": data, "status": CANCELLED})
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _alive(pid: t.Any) -> bool:
+    if not isinstance(pid, int):
+        return False
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
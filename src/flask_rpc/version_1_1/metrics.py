@@ -0,0 +1,369 @@
+import bisect
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import typing as t
+import warnings
+
+MAGIC = b"FRPCMET1"
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+NAME_SIZE = 64
+
+# magic, slots, max_functions, number of buckets, padded to keep the
+# counters 8 byte aligned
+_HEADER = struct.Struct("<8sIII4x")
+
+# Counters of each function, in each slot, before the latency buckets
+CALLS = 0
+FAILURES = 1
+LATENCY_US = 2
+_FIXED = 3
+
+
+class RPCMetrics:
+    """
+    Call counts, failures and latency histograms of every function, shared
+    by the worker processes on a host through a memory mapped file.
+
+    Each worker process writes to its own slot, so recording never waits
+    for another process. Reading adds the slots together, so whichever
+    worker serves the metrics reports the totals of every worker.
+
+    Uses fcntl, so it needs a Unix host.
+    """
+
+    _path: str
+    _slots: int
+    _max_functions: int
+    _buckets: t.Tuple[float, ...]
+    _indexes: t.Dict[str, int]
+
+    def __init__(
+        self,
+        path: str,
+        slots: int = 64,
+        max_functions: int = 256,
+        buckets: t.Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """
+        Every worker must open the same path with the same settings. A slot
+        left by a worker that exited is taken over by the next new worker,
+        keeping its counts, so totals never go down.
+
+        :param path: Str path to the metrics file, created if it doesn't exist
+        :param slots: Int, the most worker processes that record at once
+        :param max_functions: Int, the most function names that are recorded
+        :param buckets: Sequence of Float, the upper bounds of the latency
+            buckets in seconds
+        """
+        buckets = tuple(float(b) for b in buckets)
+
+        if not buckets or list(buckets) != sorted(set(buckets)):
+            raise ValueError("buckets must be increasing and not empty.")
+
+        self._path = path
+        self._slots = slots
+        self._max_functions = max_functions
+        self._buckets = buckets
+        self._stride = _FIXED + len(buckets) + 1
+
+        self._names_at = _HEADER.size + 8 * len(buckets)
+        self._pids_at = self._names_at + NAME_SIZE * max_functions
+        self._counters_at = self._pids_at + 8 * slots
+        size = self._counters_at + 8 * slots * max_functions * self._stride
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._lock = threading.Lock()
+
+        try:
+            self._init_file(size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+        self._mmap = mmap.mmap(self._fd, size)
+        view = memoryview(self._mmap)
+        self._pids = view[self._pids_at : self._counters_at].cast("q")
+        self._counters = view[self._counters_at :].cast("Q")
+
+        self._indexes = {}
+        self._slot_pid = None
+        self._slot = None
+
+    def _init_file(self, size: int):
+        """
+        Write the header of a new metrics file, or check that an existing
+        file was created with the same settings.
+        """
+        buckets = struct.pack(f"<{len(self._buckets)}d", *self._buckets)
+        expected = _HEADER.pack(
+            MAGIC, self._slots, self._max_functions, len(self._buckets)
+        )
+
+        with self._locked():
+            header = os.pread(self._fd, _HEADER.size, 0)
+
+            if not header.strip(b"\0"):
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, expected + buckets, 0)
+            elif (
+                header != expected
+                or os.pread(self._fd, len(buckets), _HEADER.size) != buckets
+            ):
+                raise ValueError(
+                    f"{self._path} was created with other settings, use the "
+                    "same slots, max_functions and buckets, or another path."
+                )
+
+    def _locked(self) -> "_FileLock":
+        return _FileLock(self._fd)
+
+    def _read_names(self) -> t.List[bytes]:
+        names = []
+
+        for i in range(self._max_functions):
+            at = self._names_at + i * NAME_SIZE
+            name = self._mmap[at : at + NAME_SIZE].rstrip(b"\0")
+
+            if not name:
+                break
+
+            names.append(name)
+
+        return names
+
+    def _index(self, function: str) -> t.Optional[int]:
+        """
+        The position of a function's counters, the same in every process.
+        """
+        if (index := self._indexes.get(function)) is not None:
+            return index
+
+        # Longer names are cut short
+        stored = function.encode()[:NAME_SIZE]
+
+        with self._locked():
+            names = self._read_names()
+
+            if stored in names:
+                index = names.index(stored)
+            elif len(names) < self._max_functions:
+                index = len(names)
+                at = self._names_at + index * NAME_SIZE
+                self._mmap[at : at + len(stored)] = stored
+            else:
+                return None
+
+        self._indexes[function] = index
+        return index
+
+    def _claim_slot(self) -> t.Optional[int]:
+        """
+        The slot this process writes to, claimed on first use after a fork.
+        """
+        pid = os.getpid()
+
+        if self._slot_pid == pid:
+            return self._slot
+
+        with self._locked():
+            free = None
+
+            for i in range(self._slots):
+                owner = self._pids[i]
+
+                if owner == pid:
+                    free = i
+                    break
+
+                if free is None and (owner == 0 or not _alive(owner)):
+                    free = i
+
+            if free is not None:
+                self._pids[free] = pid
+
+        if free is None:
+            warnings.warn(
+                f"Every metrics slot in {self._path} is in use, "
+                f"calls in process {pid} are not recorded.",
+                stacklevel=3,
+            )
+
+        self._slot_pid = pid
+        self._slot = free
+        return free
+
+    def observe(self, function: str, seconds: float, ok: bool):
+        """
+        Record a call.
+
+        :param function: Str
+        :param seconds: Float, how long the call took
+        :param ok: Bool, False if the call failed or raised
+        """
+        slot = self._claim_slot()
+        index = self._index(function)
+
+        if slot is None or index is None:
+            return
+
+        at = (slot * self._max_functions + index) * self._stride
+        bucket = at + _FIXED + bisect.bisect_left(self._buckets, seconds)
+        counters = self._counters
+
+        # Only this process writes to its slot, the lock is for its threads
+        with self._lock:
+            counters[at + CALLS] += 1
+            counters[at + LATENCY_US] += int(seconds * 1_000_000)
+            counters[bucket] += 1
+
+            if not ok:
+                counters[at + FAILURES] += 1
+
+    def snapshot(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """
+        The totals of every worker, by function.
+
+        :return: Dict of function to {"calls", "failures", "seconds",
+            "buckets": {upper bound: calls, "+Inf": calls}}, bucket counts are
+            cumulative
+        """
+        counters = self._counters
+        stride = self._stride
+        per_slot = self._max_functions * stride
+        totals = {}
+
+        for index, name in enumerate(self._read_names()):
+            name = name.decode(errors="replace")
+            summed = [0] * stride
+
+            for slot in range(self._slots):
+                at = slot * per_slot + index * stride
+                for i, value in enumerate(counters[at : at + stride]):
+                    summed[i] += value
+
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip((*self._buckets, "+Inf"), summed[_FIXED:]):
+                cumulative += count
+                buckets[bound] = cumulative
+
+            totals[name] = {
+                "calls": summed[CALLS],
+                "failures": summed[FAILURES],
+                "seconds": summed[LATENCY_US] / 1_000_000,
+                "buckets": buckets,
+            }
+
+        return totals
+
+    def prometheus(self, prefix: str = "flask_rpc") -> str:
+        """
+        The totals in the Prometheus text format, serve this from a metrics
+        route.
+
+        :param prefix: Str, the start of every metric name
+        :return: Str
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_calls_total RPC function calls.",
+            f"# TYPE {prefix}_calls_total counter",
+        ]
+        lines.extend(
+            f'{prefix}_calls_total{{function="{_label(name)}"}} {m["calls"]}'
+            for name, m in snapshot.items()
+        )
+        lines.extend(
+            [
+                f"# HELP {prefix}_failures_total RPC function calls that failed.",
+                f"# TYPE {prefix}_failures_total counter",
+            ]
+        )
+        lines.extend(
+            f'{prefix}_failures_total{{function="{_label(name)}"}} {m["failures"]}'
+            for name, m in snapshot.items()
+        )
+        lines.extend(
+            [
+                f"# HELP {prefix}_duration_seconds RPC function call duration.",
+                f"# TYPE {prefix}_duration_seconds histogram",
+            ]
+        )
+        for name, m in snapshot.items():
+            label = _label(name)
+
+            for bound, count in m["buckets"].items():
+                lines.append(
+                    f'{prefix}_duration_seconds_bucket{{function="{label}",'
+                    f'le="{bound}"}} {count}'
+                )
+
+            lines.append(
+                f'{prefix}_duration_seconds_sum{{function="{label}"}} {m["seconds"]}'
+            )
+            lines.append(
+                f'{prefix}_duration_seconds_count{{function="{label}"}} {m["calls"]}'
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        self._pids.release()
+        self._counters.release()
+        self._mmap.close()
+        os.close(self._fd)
+
+
+class _FileLock:
+    """
+    An exclusive lock on the metrics file, only taken to add a function
+    name or claim a slot.
+
+    lockf locks belong to the process, so forked workers sharing the file
+    descriptor exclude each other, which flock on an inherited descriptor
+    doesn't. They don't exclude threads, or two RPCMetrics on the same file,
+    in one process, so a process wide lock is taken first.
+    """
+
+    def __init__(self, fd: int):
+        self._fd = fd
+
+    def __enter__(self):
+        _process_lock.acquire()
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *_):
+        fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        _process_lock.release()
+
+
+_process_lock = threading.Lock()
+
+
+def _reset_process_lock():
+    # A thread holding it when the process forked doesn't exist in the child
+    global _process_lock
+    _process_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_process_lock)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
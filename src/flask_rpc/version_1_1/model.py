@@ -7,3 +7,6 @@ class RPCModel(BaseModel):
     weerpc: float
     function: str
     data: t.Any
+    fields: t.Optional[t.List[str]] = None
+    idempotency_key: t.Optional[str] = None
+    notify: t.Optional[bool] = None
@@ -0,0 +1,165 @@
+import os
+import threading
+import typing as t
+from collections import deque
+
+from .response import RPCResponse
+
+OVERFLOW = ("reject", "drop_oldest", "run")
+
+ACCEPTED = "Notification accepted."
+REJECTED = "Too many notifications pending."
+
+
+class RPCNotifications:
+    """
+    Runs notifications, calls the client doesn't wait for, on a bounded
+    pool of background threads.
+    """
+
+    _max_workers: int
+    _max_pending: int
+    _overflow: str
+    _queue: "deque[t.Callable[[], t.Any]]"
+    _counts: t.Dict[str, int]
+
+    def __init__(
+        self, max_workers: int = 4, max_pending: int = 1000, overflow: str = "reject"
+    ):
+        """
+        overflow decides what happens to a notification that arrives while
+        max_pending are already waiting:
+
+        "reject" refuses it, the client gets a 503 and can retry.
+        "drop_oldest" drops the notification that has waited longest.
+        "run" runs it before acknowledging, slowing the client down.
+
+        :param max_workers: Int, the most notifications that run at once
+        :param max_pending: Int, the most notifications waiting to run
+        :param overflow: Str, "reject", "drop_oldest" or "run"
+        """
+        if overflow not in OVERFLOW:
+            raise ValueError(
+                f"Unknown overflow {overflow}, use {', '.join(OVERFLOW[:-1])} "
+                f"or {OVERFLOW[-1]}."
+            )
+
+        if max_workers < 1 or max_pending < 1:
+            raise ValueError("max_workers and max_pending must be at least 1.")
+
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._overflow = overflow
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._pid = None
+        self._running = 0
+        self._counts = dict.fromkeys(
+            ("accepted", "rejected", "dropped", "completed", "failed"), 0
+        )
+
+    def submit(self, call: t.Callable[[], t.Any]) -> bool:
+        """
+        Queue a notification.
+
+        :param call: Callable, returns an RPCResponse, a response that is
+            not ok, or an exception, counts as failed
+        :return: Bool, False if the notification was rejected
+        """
+        with self._condition:
+            if self._pid != os.getpid():
+                # Threads don't survive a fork, start them in this process
+                self._pid = os.getpid()
+                self._running = 0
+                self._queue.clear()
+
+                for i in range(self._max_workers):
+                    threading.Thread(
+                        target=self._work, name=f"rpc_notify_{i}", daemon=True
+                    ).start()
+
+            if len(self._queue) >= self._max_pending:
+                if self._overflow == "reject":
+                    self._counts["rejected"] += 1
+                    return False
+
+                if self._overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self._counts["dropped"] += 1
+
+            self._counts["accepted"] += 1
+
+            if len(self._queue) < self._max_pending:
+                self._queue.append(call)
+                self._condition.notify()
+                return True
+
+        self._run(call)
+        return True
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+
+                call = self._queue.popleft()
+                self._running += 1
+
+            try:
+                self._run(call)
+            finally:
+                with self._condition:
+                    self._running -= 1
+
+    def _run(self, call: t.Callable[[], t.Any]):
+        try:
+            ok = _ok(call())
+        except Exception:
+            ok = False
+
+        with self._condition:
+            self._counts["completed" if ok else "failed"] += 1
+
+    def stats(self) -> t.Dict[str, int]:
+        """
+        The notifications of this process, "pending" and "running" now, and
+        the totals "accepted", "rejected", "dropped", "completed" and "failed".
+
+        :return: Dict[str, int]
+        """
+        with self._condition:
+            return {
+                "pending": len(self._queue),
+                "running": self._running,
+                **self._counts,
+            }
+
+
+def is_notification(envelope: t.Any) -> bool:
+    return isinstance(envelope, dict) and envelope.get("notify") is True
+
+
+def status(body: t.Any, response: t.Any) -> int:
+    """
+    The HTTP status for a request: 202 once a single notification is
+    accepted, 503 if it was rejected, 200 for everything else.
+    """
+    if not is_notification(body) or not isinstance(response, dict):
+        return 200
+
+    if response.get("ok"):
+        return 202
+
+    return 503 if response.get("message") == REJECTED else 200
+
+
+def acknowledge(accepted: bool) -> t.Dict[str, t.Any]:
+    if accepted:
+        return RPCResponse.success(None, ACCEPTED)
+
+    return RPCResponse.fail(REJECTED)
+
+
+def _ok(response: t.Any) -> bool:
+    return isinstance(response, dict) and bool(response.get("ok"))
@@ -0,0 +1,307 @@
+import multiprocessing
+import os
+import pickle
+import threading
+import types
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import flask
+from werkzeug.local import LocalProxy
+
+# Buffers at or above this size are handed between processes through
+# shared memory instead of being copied through the executor's pipe.
+OUT_OF_BAND_THRESHOLD = 1 << 16
+
+# Seconds prewarm waits for every worker process to start
+PREWARM_TIMEOUT = 60
+
+_FLASK_GLOBALS = {"request", "session", "g", "current_app"}
+
+# Set in each worker process, the prewarm tasks wait on it together
+_barrier: t.Optional[threading.Barrier] = None
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Protocol 5 pickler that leaves large buffers out of the payload.
+
+    Exact bytes and bytearray are pickled before reducer_override is asked,
+    so they are taken out through persistent_id. Other buffers, e.g. numpy
+    arrays, are taken out by the buffer_callback.
+    """
+
+    def __init__(self, file: t.BinaryIO, out: t.List[t.Tuple[memoryview, str]]):
+        super().__init__(file, protocol=5, buffer_callback=self._out_of_band)
+        self._out = out
+
+    def persistent_id(self, obj):
+        if type(obj) in (bytes, bytearray) and len(obj) >= OUT_OF_BAND_THRESHOLD:
+            self._out.append((memoryview(obj), type(obj).__name__))
+            return len(self._out) - 1
+
+        return None
+
+    def reducer_override(self, obj):
+        if isinstance(obj, memoryview) and obj.nbytes >= OUT_OF_BAND_THRESHOLD:
+            return bytearray, (pickle.PickleBuffer(obj),)
+
+        return NotImplemented
+
+    def _out_of_band(self, buffer: pickle.PickleBuffer) -> bool:
+        raw = buffer.raw()
+
+        if raw.nbytes < OUT_OF_BAND_THRESHOLD:
+            return True
+
+        self._out.append((raw, ""))
+        return False
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file: t.BinaryIO, views: t.List[t.Tuple[t.Any, str]]):
+        super().__init__(file, buffers=[view for view, kind in views if not kind])
+        self._views = views
+
+    def persistent_load(self, pid):
+        view, kind = self._views[pid]
+        return bytes(view) if kind == "bytes" else bytearray(view)
+
+
+Segments = t.List[t.Tuple[str, int, str]]
+
+
+def _dumps(obj: t.Any) -> t.Tuple[bytes, Segments, t.List[SharedMemory]]:
+    """
+    Pickle obj using protocol 5, large buffers are written to shared memory
+    segments and only their names travel with the payload.
+    """
+    out: t.List[t.Tuple[memoryview, str]] = []
+    stream = BytesIO()
+    _Pickler(stream, out).dump(obj)
+
+    segments = []
+    handles = []
+    for raw, kind in out:
+        shm = SharedMemory(create=True, size=max(raw.nbytes, 1))
+        shm.buf[: raw.nbytes] = raw.cast("B")
+        segments.append((shm.name, raw.nbytes, kind))
+        handles.append(shm)
+
+    return stream.getvalue(), segments, handles
+
+
+def _loads(
+    payload: bytes, handles: t.List[SharedMemory], segments: Segments, copy: bool
+):
+    """
+    Unpickle a payload from _dumps, copy keeps buffers that are used in
+    place, e.g. by numpy arrays, valid once the segments are released.
+    """
+    views = []
+    for shm, (_, size, kind) in zip(handles, segments):
+        view = shm.buf[:size]
+        views.append((bytearray(view) if copy and not kind else view, kind))
+
+    return _Unpickler(BytesIO(payload), views).load()
+
+
+def _release(handles: t.List[SharedMemory], unlink: bool):
+    for shm in handles:
+        try:
+            shm.close()
+        except BufferError:
+            # Views into the segment are still alive; the mapping is
+            # released when they are garbage collected.
+            pass
+
+        if unlink:
+            shm.unlink()
+
+
+def _worker_init(barrier: threading.Barrier):
+    global _barrier
+    _barrier = barrier
+
+
+def _worker_warm():
+    # Every prewarm task waits for the others, so no worker can run two of
+    # them, and the pool has to start a process for each.
+    _barrier.wait(PREWARM_TIMEOUT)
+    return os.getpid()
+
+
+def _worker_call(payload: bytes, segments: Segments):
+    handles = [SharedMemory(name=name) for name, _, _ in segments]
+    try:
+        func, data = _loads(payload, handles, segments, copy=False)
+        result = _dumps(func(data))
+        del func, data
+    finally:
+        _release(handles, unlink=False)
+
+    response_payload, response_segments, response_handles = result
+    _release(response_handles, unlink=False)
+    return response_payload, response_segments
+
+
+def flask_globals_used(func: t.Callable) -> t.List[str]:
+    """
+    Return the Flask request globals (request, session, g, current_app)
+    that func, or any function nested in it, refers to.
+    """
+    code = getattr(func, "__code__", None)
+    func_globals = getattr(func, "__globals__", {})
+    if code is None:
+        return []
+
+    names = set()
+    stack = [code]
+    while stack:
+        c = stack.pop()
+        names.update(c.co_names)
+        stack.extend(x for x in c.co_consts if isinstance(x, types.CodeType))
+
+    used = [n for n in names if isinstance(func_globals.get(n), LocalProxy)]
+
+    if any(func_globals.get(n) is flask for n in names):
+        used.extend(n for n in names & _FLASK_GLOBALS if n not in used)
+
+    return sorted(used)
+
+
+class RPCProcessPool:
+    """
+    A managed ProcessPoolExecutor used to run CPU-bound RPC functions
+    across cores.
+
+    If a worker process dies, e.g. killed by the OOM killer, the calls it
+    breaks raise BrokenProcessPool, and the pool is started again for the
+    next call.
+    """
+
+    _max_workers: int
+    _executor: t.Optional[ProcessPoolExecutor]
+    _pid: t.Optional[int]
+
+    def __init__(self, max_workers: t.Optional[int] = None, prewarm: bool = True):
+        """
+        The pool is started on first use, or by calling warmup() after the
+        worker process has forked (e.g. in gunicorn's post_fork hook).
+
+        :param max_workers: Optional Int, defaults to the number of CPUs
+        :param prewarm: Bool, start every worker process up front
+        """
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._prewarm = prewarm
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def check(func: t.Callable):
+        """
+        Raise a TypeError if func can not be run in another process.
+
+        :param func: Callable
+        :return: None
+        """
+        qualname = getattr(func, "__qualname__", "")
+        if "<lambda>" in qualname or "<locals>" in qualname:
+            raise TypeError(
+                f"Callable {func} must be defined at module level to run in "
+                "a process pool."
+            )
+
+        if used := flask_globals_used(func):
+            raise TypeError(
+                f"Callable {func} uses Flask request globals ({', '.join(used)}), "
+                "these are not available in a process pool."
+            )
+
+    def warmup(self):
+        """
+        Start the pool, if prewarm is set every worker process is started
+        and has imported its modules before this returns.
+
+        :return: None
+        """
+        self._get_executor()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # Workers must share this process's resource tracker, else
+                # each tracks the segments it touches, and reports them as
+                # leaked at exit after this process has unlinked them.
+                resource_tracker.ensure_running()
+                context = multiprocessing.get_context()
+                executor = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    mp_context=context,
+                    initializer=_worker_init,
+                    initargs=(context.Barrier(self._max_workers),),
+                )
+
+                if self._prewarm:
+                    for future in [
+                        executor.submit(_worker_warm) for _ in range(self._max_workers)
+                    ]:
+                        future.result()
+
+                self._executor = executor
+                self._pid = os.getpid()
+
+        return self._executor
+
+    def run(self, func: t.Callable, data: t.Any) -> t.Any:
+        """
+        Run func(data) in the pool and return its result.
+
+        :param func: Callable
+        :param data: Any
+        :return: Any
+        """
+        payload, segments, handles = _dumps((func, data))
+        executor = self._get_executor()
+        try:
+            response_payload, response_segments = executor.submit(
+                _worker_call, payload, segments
+            ).result()
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+        finally:
+            _release(handles, unlink=True)
+
+        response_handles = [SharedMemory(name=name) for name, _, _ in response_segments]
+        try:
+            return _loads(
+                response_payload, response_handles, response_segments, copy=True
+            )
+        finally:
+            _release(response_handles, unlink=True)
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """
+        Drop a broken executor, the next call starts a new one. Calls that
+        were running on it have failed with it.
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+
+        executor.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=wait)
+
+        self._executor = None
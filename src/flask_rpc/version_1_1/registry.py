@@ -0,0 +1,216 @@
+import typing as t
+from itertools import groupby
+
+from flask import Blueprint, Flask, request
+
+from .notifications import status
+from .response import RPCResponse
+from .rpc import RPC, _handle_multipart
+from .utilities import snake_case
+from .versions import VERSION_1_1, VERSIONS, RPCVersion
+
+
+class RPCRegistry:
+    GROUPS: t.Dict[str, RPC]
+
+    _namespaces: t.List[str]
+
+    def __init__(
+        self,
+        app_or_blueprint: t.Union[Flask, Blueprint],
+        groups: t.Optional[t.Dict[str, RPC]] = None,
+        url_prefix: str = "/",
+    ):
+        """
+        Register a single route that serves the functions of many RPC groups.
+
+        Functions are called using the namespace the group was mounted under,
+        for example "clients.read" calls "read" on the group mounted as "clients".
+
+        The session_auth and host_auth of each group, and of each function,
+        are checked in the same way as the group's own route.
+
+        A batch is run as the groups' own routes run it: consecutive calls to
+        the same group run together, in the group's transaction if it has
+        one. A batch that spans groups runs one transaction for each run of
+        consecutive calls to a group, not one for the whole batch.
+
+        :param app_or_blueprint: Flask / Blueprint
+        :param groups: Optional Dict[str, RPC]
+        :param url_prefix: Str
+        """
+        self.GROUPS = {}
+        self._namespaces = []
+
+        if not hasattr(app_or_blueprint, "add_url_rule"):
+            raise TypeError(
+                f"Looks like {app_or_blueprint}, type({type(app_or_blueprint)}) might "
+                f"not be an instance of Flask, Flask Blueprint or be compatible with "
+                "setting Flask routes."
+            )
+
+        self._register_route(app_or_blueprint, url_prefix)
+
+        if groups:
+            for namespace, rpc in groups.items():
+                self.mount(namespace, rpc)
+
+    def mount(self, namespace: str, rpc: RPC):
+        """
+        Mount an RPC group under a namespace.
+
+        .mount("clients", clients_rpc)
+
+        :param namespace: Str, may be dotted, e.g. "auth.login"
+        :param rpc: RPC
+        :return: None
+        """
+        if not isinstance(rpc, RPC):
+            raise TypeError(f"Expected an RPC instance, got {type(rpc)}.")
+
+        if not namespace or namespace.startswith(".") or namespace.endswith("."):
+            raise ValueError(f"Invalid namespace {namespace!r}.")
+
+        if namespace in self.GROUPS:
+            raise ValueError(f"Namespace {namespace} already exists.")
+
+        self.GROUPS[namespace] = rpc
+        # Longest first, so "auth.login.x" matches "auth.login" before "auth"
+        self._namespaces = sorted(self.GROUPS, key=len, reverse=True)
+
+    def _find(self, function: str) -> t.Optional[t.Tuple[RPC, str]]:
+        for namespace in self._namespaces:
+            if function.startswith(f"{namespace}."):
+                rpc = self.GROUPS[namespace]
+                name = function[len(namespace) + 1 :]
+
+                if name in rpc.LOOKUP:
+                    return rpc, name
+
+        return None
+
+    def _register_route(
+        self, route_compatible: t.Union[Flask, Blueprint], url_prefix: str
+    ):
+        if not url_prefix.startswith("/"):
+            url_prefix = f"/{url_prefix}"
+
+        _blueprint_name = ""
+        if isinstance(route_compatible, Blueprint):
+            _blueprint_name = f"_{route_compatible.name}"
+
+        route_compatible.add_url_rule(
+            url_prefix,
+            view_func=self._rpc_route,
+            endpoint=f"_rpc_registry{_blueprint_name}_{snake_case(url_prefix)}",
+            provide_automatic_options=True,
+            methods=["POST"],
+        )
+
+    def _version(self, envelope: t.Any = None) -> RPCVersion:
+        """
+        The version of a request envelope, or the newest version the groups
+        accept, for failures that aren't about one envelope.
+        """
+        if isinstance(envelope, dict):
+            for version in VERSIONS.values():
+                if envelope.get(version.key) == version.version:
+                    return version
+
+        if not self.GROUPS:
+            return VERSION_1_1
+
+        return max(
+            (rpc._version for rpc in self.GROUPS.values()), key=lambda v: v.version
+        )
+
+    def _rpc_route(self):
+        if not self.GROUPS:
+            return self._version().encode(RPCResponse.fail("No functions registered."))
+
+        if request.mimetype == "multipart/form-data":
+            return _handle_multipart(self._handle_body)
+
+        if not request.is_json:
+            return self._version().encode(RPCResponse.fail("Request must be JSON."))
+
+        body = request.get_json()
+        response = RPC._respond(self._handle_body(body))
+
+        if (code := status(body, response)) != 200:
+            return response, code
+
+        return response
+
+    def _handle_body(
+        self, body: t.Any
+    ) -> t.Union[t.Dict[str, t.Any], t.List[t.Dict[str, t.Any]]]:
+        if not body:
+            return self._version(body).encode(
+                RPCResponse.fail("Request must not be empty.")
+            )
+
+        if not isinstance(body, list):
+            return self._run(self._resolve(body), [body], batch=False)[0]
+
+        responses = []
+        resolved = [(self._resolve(envelope), envelope) for envelope in body]
+
+        # Consecutive calls to the same group run together, through the
+        # group's own batch handling, in its transaction.
+        for _, run in groupby(resolved, key=lambda r: r[0] and r[0][0]):
+            run = list(run)
+            responses.extend(
+                self._run(run[0][0], [envelope for _, envelope in run], batch=True)
+            )
+
+        return responses
+
+    def _resolve(self, envelope: t.Any) -> t.Optional[t.Tuple[RPC, str]]:
+        if not isinstance(envelope, dict) or not isinstance(
+            envelope.get("function"), str
+        ):
+            return None
+
+        return self._find(envelope["function"])
+
+    def _run(
+        self,
+        found: t.Optional[t.Tuple[RPC, str]],
+        envelopes: t.List[t.Any],
+        batch: bool,
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """
+        Run envelopes that all call the same group, found is the group of
+        the first one.
+        """
+        if found is None:
+            return [
+                self._version(envelope).encode(
+                    RPCResponse.fail(
+                        "Invalid function."
+                        if isinstance(envelope, dict)
+                        and isinstance(envelope.get("function"), str)
+                        else "Invalid request."
+                    )
+                )
+                for envelope in envelopes
+            ]
+
+        rpc = found[0]
+
+        if unauthorized_response := rpc._check_auth():
+            return [
+                self._version(envelope).encode(unauthorized_response)
+                for envelope in envelopes
+            ]
+
+        renamed = [
+            {**envelope, "function": self._find(envelope["function"])[1]}
+            for envelope in envelopes
+        ]
+
+        if not batch:
+            return [rpc._handle_body(renamed[0])]
+
+        return rpc._handle_body(renamed)
@@ -1,4 +1,6 @@
+import json
 import typing as t
+from urllib.parse import urlencode
 
 
 class RPCRequest:
@@ -9,14 +11,69 @@ class RPCRequest:
         data: t.Union[
             str, int, float, bool, t.List[t.Any], t.Dict[str, t.Any], None
         ] = None,
+        fields: t.Optional[t.List[str]] = None,
+        idempotency_key: t.Optional[str] = None,
+        notify: bool = False,
     ) -> t.Dict[str, t.Any]:
         """
         Build a request.
 
+        fields narrows the response data to the listed fields, use dotted
+        paths for nested fields, e.g. ["client_id", "client.name"].
+
+        idempotency_key makes retries safe, a request that repeats the key
+        gets the first response, without the function running again.
+
+        notify sends the request as a notification, the server acknowledges
+        it straight away and runs the function in the background, the
+        response doesn't carry its result.
+
         Version 1.1.
 
         :param function: Str
         :param data: Any (JSON serializable)
+        :param fields: Optional List[str]
+        :param idempotency_key: Optional Str, e.g. a uuid4
+        :param notify: Bool
         :return:
         """
-        return {"weerpc": 1.1, "function": function, "data": data}
+        request = {"weerpc": 1.1, "function": function, "data": data}
+
+        if fields is not None:
+            request["fields"] = fields
+
+        if idempotency_key is not None:
+            request["idempotency_key"] = idempotency_key
+
+        if notify:
+            request["notify"] = True
+
+        return request
+
+    @classmethod
+    def query(
+        cls,
+        function: str,
+        data: t.Union[
+            str, int, float, bool, t.List[t.Any], t.Dict[str, t.Any], None
+        ] = None,
+    ) -> str:
+        """
+        Build the query string of a GET request, for functions registered
+        with get__, e.g. "/rpc?" + RPCRequest.query("clients.read", {"client_id": 1})
+
+        data is encoded as compact JSON with sorted keys, so the same data
+        always gives the same URL, and caches see it as the same request.
+
+        :param function: Str
+        :param data: Any (JSON serializable)
+        :return: Str
+        """
+        query = {"function": function}
+
+        if data is not None:
+            query["data"] = json.dumps(
+                data, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+            )
+
+        return urlencode(query)
@@ -1,5 +1,7 @@
 import typing as t
 
+from .columnar import encode_table
+
 
 class RPCResponse:
     @classmethod
@@ -35,14 +37,27 @@ class RPCResponse:
             str, int, float, bool, t.List[t.Any], t.Dict[str, t.Any], None
         ] = None,
         message: str = None,
+        attachments: t.Optional[t.Dict[str, t.Any]] = None,
+        columnar: bool = False,
     ):
         """
         Return a successful response.
 
+        attachments are sent as binary parts of a multipart response,
+        instead of in the JSON. Only the RPC route can send attachments.
+
+        columnar sends a list of dicts that all have the same keys as
+        {"columns": [...], "rows": [[...], ...]}, so the keys aren't repeated
+        in every row. RPCClient turns it back into dicts. Other data is sent
+        as it is.
+
         Version 1.1.
 
         :param data: Any (JSON serializable)
         :param message: Str
+        :param attachments: Optional Dict[str, bytes, memoryview, binary file
+            or RPCAttachment]
+        :param columnar: Bool
         :return:
         """
         r = {
@@ -52,4 +67,46 @@ class RPCResponse:
             "data": data if data else None,
         }
 
+        if columnar and (table := encode_table(data)) is not None:
+            r["data"] = table
+            r["columnar"] = True
+
+        if attachments:
+            r["attachments"] = attachments
+
+        return r
+
+    @classmethod
+    def page(
+        cls,
+        items: t.List[t.Any],
+        cursor: t.Optional[str] = None,
+        message: str = None,
+        columnar: bool = False,
+    ):
+        """
+        Return a successful response holding one page of a list.
+
+        cursor is passed back in the request data to fetch the next page,
+        it is None on the last page.
+
+        Version 1.1.
+
+        :param items: List (JSON serializable)
+        :param cursor: Optional Str, opaque cursor for the next page
+        :param message: Str
+        :param columnar: Bool, send the items in the columnar shape, see .success
+        :return:
+        """
+        r = {
+            "weerpc": 1.0,
+            "ok": True,
+            "message": message if message else None,
+            "data": {"items": items, "cursor": cursor},
+        }
+
+        if columnar and (table := encode_table(items)) is not None:
+            r["data"]["items"] = table
+            r["columnar"] = True
+
         return r
@@ -1,31 +1,92 @@
+import hashlib
+import inspect
+import json
+import time
 import typing as t
+from functools import partial
 
-from flask import Blueprint, Flask, request, session
-from pydantic import ValidationError
+from flask import (
+    Blueprint,
+    Flask,
+    Response,
+    current_app,
+    has_app_context,
+    has_request_context,
+    request,
+    session,
+)
+from werkzeug.exceptions import MethodNotAllowed
+from werkzeug.utils import import_string
 
 from ._protocols import RPCAuthSessionKey
-from .model import RPCModel
+from .attachments import _current as _current_attachments
+from .attachments import encode_multipart, read_multipart, split_attachments
+from .auth_context import RPCAuthContext
+from .auth_token import RPCAuthToken
+from .fields import RPCFields
+from .fields import _current as _current_fields
+from .notifications import RPCNotifications, acknowledge, is_notification, status
 from .response import RPCResponse
 from .utilities import snake_case
+from .versions import VERSIONS, RPCVersion
+
+if t.TYPE_CHECKING:
+    from ..transaction import RPCTransaction
+    from .cache import RPCCacheBackend
+    from .events import RPCEvents
+    from .idempotency import RPCIdempotency
+    from .jobs import RPCJobs
+    from .metrics import RPCMetrics
+    from .process_pool import RPCProcessPool
+
+# The built-in functions registered by RPC.jobs
+JOB_FUNCTIONS = ("job.status", "job.result", "job.cancel")
 
 
 class RPC:
-    LOOKUP: t.Dict[str, t.Callable]
+    LOOKUP: t.Dict[str, t.Union[t.Callable, str]]
 
     _host_auth: t.List[str]
     _session_auth: t.Union[RPCAuthSessionKey, t.List[RPCAuthSessionKey]]
     _funcs_host_auth_lookup: t.Dict[str, t.List[str]]
     _funcs_session_auth_lookup: t.Dict[str, t.List[RPCAuthSessionKey]]
+    _token_auth: t.List[RPCAuthToken]
+    _funcs_token_auth_lookup: t.Dict[str, t.List[RPCAuthToken]]
+    _funcs_job_lookup: t.Set[str]
+    _funcs_async_lookup: t.Dict[str, t.Callable[[t.Any], t.Awaitable[t.Any]]]
+    _jobs: t.Optional["RPCJobs"]
+    _funcs_process_lookup: t.Set[str]
+    _process_pool: t.Optional["RPCProcessPool"]
+    _transaction: t.Optional["RPCTransaction"]
+    _idempotency: t.Optional["RPCIdempotency"]
+    _events: t.Optional["RPCEvents"]
+    _cache: t.Optional["RPCCacheBackend"]
+    _funcs_cache_lookup: t.Dict[str, float]
+    _funcs_get_lookup: t.Dict[str, t.Tuple[str, t.List[str]]]
+    _metrics: t.Optional["RPCMetrics"]
+    _notifications: t.Optional[RPCNotifications]
+    _version: RPCVersion
+    _versions: t.Dict[str, RPCVersion]
 
     def __init__(
         self,
-        app_or_blueprint: t.Union[Flask, Blueprint],
+        app_or_blueprint: t.Optional[t.Union[Flask, Blueprint]],
         functions: t.Optional[t.Dict[str, t.Callable]] = None,
         url_prefix: str = "/",
         session_auth: t.Optional[
             t.Union[RPCAuthSessionKey, t.List[RPCAuthSessionKey]]
         ] = None,
         host_auth: t.Optional[t.List[str]] = None,
+        token_auth: t.Optional[t.Union[RPCAuthToken, t.List[RPCAuthToken]]] = None,
+        jobs: t.Optional["RPCJobs"] = None,
+        process_pool: t.Optional["RPCProcessPool"] = None,
+        versions: t.Iterable[float] = (1.0, 1.1),
+        transaction: t.Optional["RPCTransaction"] = None,
+        idempotency: t.Optional["RPCIdempotency"] = None,
+        events: t.Optional["RPCEvents"] = None,
+        cache: t.Optional["RPCCacheBackend"] = None,
+        metrics: t.Optional["RPCMetrics"] = None,
+        notifications: t.Optional[RPCNotifications] = None,
     ):
         """
         Register the RPC route.
@@ -36,24 +97,103 @@ class RPC:
         session_auth will check the session, setting this will mean
         that only requests with the specified session key, and value will be allowed.
 
-        :param app_or_blueprint: Flask / Blueprint
+        token_auth will check the bearer token in the Authorization header,
+        setting this will mean that only requests with a valid token, and the
+        specified claims will be allowed.
+
+        versions sets the weeRPC versions accepted by the route, the version
+        of each request is read from its envelope, and the response is sent
+        back in the same version. Requests that can't be read are answered
+        using the highest version.
+
+        transaction runs every call of a batch request inside one database
+        transaction, with a single commit at the end.
+
+        idempotency stores the first response for each idempotency_key sent
+        in a request envelope, requests that repeat the key get the stored
+        response without running the function again.
+
+        events registers the built-in subscribe function, which waits for
+        topics published to the event bus.
+
+        cache is the backend that keeps the results of functions registered
+        with cache__, e.g. RPCCacheStore in memory, or RPCCacheStoreSQLite
+        to share results between workers.
+
+        metrics records the call count, failures and latency of every
+        function, shared by the worker processes on the host.
+
+        notifications runs the requests sent with "notify": true, which are
+        acknowledged with a 202 without waiting for the function, on a
+        bounded pool of background threads. A default pool is created on
+        the first notification.
+
+        Passing None as app_or_blueprint will skip registering the route,
+        use this for RPC groups that are only served through an RPCRegistry.
+
+        :param app_or_blueprint: Optional Flask / Blueprint
         :param functions: Optional Dict[str, Callable]
         :param url_prefix: Str
         :param host_auth: Optional List[str]
         :param session_auth: Optional Union[RPCAuthSessionKey, List[RPCAuthSessionKey]]
+        :param token_auth: Optional Union[RPCAuthToken, List[RPCAuthToken]]
+        :param jobs: Optional RPCJobs, the worker pool used by job functions
+        :param process_pool: Optional RPCProcessPool, used by functions
+            registered with executor__="process"
+        :param versions: Iterable[float], defaults to (1.0, 1.1)
+        :param transaction: Optional RPCTransaction, used by batch requests
+        :param idempotency: Optional RPCIdempotency
+        :param events: Optional RPCEvents
+        :param cache: Optional RPCCacheStore, RPCCacheStoreSQLite, or another
+            RPCCacheBackend
+        :param metrics: Optional RPCMetrics
+        :param notifications: Optional RPCNotifications
         """
         self.LOOKUP = {}
         self._funcs_host_auth_lookup = {}
         self._funcs_session_auth_lookup = {}
+        self._token_auth = []
+        self._funcs_token_auth_lookup = {}
+        self._funcs_job_lookup = set()
+        self._funcs_async_lookup = {}
+        self._jobs = None
+        self._funcs_process_lookup = set()
+        self._process_pool = process_pool
+        self._transaction = transaction
+        self._idempotency = idempotency
+        self._events = None
+        self._cache = cache
+        self._funcs_cache_lookup = {}
+        self._funcs_get_lookup = {}
+        self._metrics = metrics
+        self._notifications = notifications
 
-        if not hasattr(app_or_blueprint, "add_url_rule"):
-            raise TypeError(
-                f"Looks like {app_or_blueprint}, type({type(app_or_blueprint)}) might "
-                f"not be an instance of Flask, Flask Blueprint or be compatible with "
-                "setting Flask routes."
-            )
+        try:
+            accepted = [VERSIONS[v] for v in versions]
+        except KeyError as e:
+            raise ValueError(f"Unsupported weeRPC version {e.args[0]}.") from None
+
+        if not accepted:
+            raise ValueError("At least one weeRPC version must be accepted.")
+
+        self._version = max(accepted, key=lambda v: v.version)
+        self._versions = {v.key: v for v in accepted}
+
+        if app_or_blueprint is not None:
+            if not hasattr(app_or_blueprint, "add_url_rule"):
+                raise TypeError(
+                    f"Looks like {app_or_blueprint}, type({type(app_or_blueprint)}) "
+                    f"might not be an instance of Flask, Flask Blueprint or be "
+                    "compatible with setting Flask routes."
+                )
+
+            self._register_route(app_or_blueprint, url_prefix)
 
-        self._register_route(app_or_blueprint, url_prefix)
+        if jobs:
+            self.jobs(jobs)
+
+        if events:
+            self.events(events)
 
         if functions:
             self.functions(**functions)
@@ -68,6 +208,9 @@ class RPC:
         else:
             self.session_auth([])
 
+        if token_auth:
+            self.token_auth(token_auth)
+
     def host_auth(self, hosts: t.List[str]):
         self._host_auth = hosts
 
@@ -76,19 +219,62 @@ class RPC:
     ):
         self._session_auth = auth_session_keys
 
+    def token_auth(self, auth_tokens: t.Union[RPCAuthToken, t.List[RPCAuthToken]]):
+        self._token_auth = (
+            [auth_tokens] if isinstance(auth_tokens, RPCAuthToken) else auth_tokens
+        )
+
+    def jobs(self, jobs: "RPCJobs"):
+        """
+        Set the worker pool used by job functions, and register the
+        built-in job.status, job.result and job.cancel functions.
+
+        :param jobs: RPCJobs
+        :return: None
+        """
+        self._jobs = jobs
+
+        for name, func in zip(JOB_FUNCTIONS, (jobs.status, jobs.result, jobs.cancel)):
+            self.LOOKUP[name] = func
+
+    def events(self, events: "RPCEvents"):
+        """
+        Set the event bus, and register the built-in subscribe function.
+
+        Under RPCASGI, subscribe waits on the event loop instead of holding
+        a thread.
+
+        :param events: RPCEvents
+        :return: None
+        """
+        self._events = events
+        self.LOOKUP["subscribe"] = events.subscribe
+        self._funcs_async_lookup["subscribe"] = events.subscribe_async
+
     def functions(
         self,
         session_auth__: t.Optional[
             t.Union[RPCAuthSessionKey, t.List[RPCAuthSessionKey]]
         ] = None,
         host_auth__: t.Optional[t.List[str]] = None,
-        **kwargs: t.Callable,
+        token_auth__: t.Optional[t.Union[RPCAuthToken, t.List[RPCAuthToken]]] = None,
+        job__: bool = False,
+        executor__: t.Optional[str] = None,
+        cache__: t.Optional[float] = None,
+        get__: t.Optional[str] = None,
+        vary__: t.Optional[t.List[str]] = None,
+        **kwargs: t.Union[t.Callable, str],
     ):
         """
         Register RPC functions.
 
         .functions(lookup_name_here=callable_function_here)
 
+        .functions(lookup_name_here="import.path.to:function")
+
+        Functions passed as import strings are imported on their first call,
+        or when .warmup() is called.
+
         host_auth will check the request.host only for the functions being
         added here. Setting this will mean that only requests from the
         specified hosts will be allowed.
@@ -97,67 +283,78 @@ class RPC:
         added here. setting this will mean that only requests with the specified
         session key, and value will be allowed.
 
+        token_auth will check the bearer token only for the functions being
+        added here.
+
+        job will run the functions being added here on the job worker pool,
+        the caller receives a job_id straight away and collects the result
+        using job.status / job.result.
+
+        executor "process" will run the functions being added here in the
+        process pool, use this for CPU-bound functions. These functions must
+        be defined at module level and must not use Flask request globals.
+
+        cache keeps the successful responses of the functions being added
+        here for that many seconds, in the cache backend passed to RPC.
+        Results are cached per data, fields, host, bearer token and session
+        auth values, only use this for read-only functions.
+
+        get also serves the functions being added here on a GET route, at
+        the same url_prefix, with the response's Cache-Control set to get,
+        e.g. "public, max-age=60", so caches in front of the app can answer
+        repeat reads. vary adds headers to the response's Vary, Authorization
+        and Cookie are added when token or session auth applies. Only use
+        this for read-only functions.
+
         :param host_auth__: Optional List[str]
         :param session_auth__: Optional RPCAuthSessionKey or List[RPCAuthSessionKey]
+        :param token_auth__: Optional RPCAuthToken or List[RPCAuthToken]
+        :param job__: Bool
+        :param executor__: Optional Str, "process"
+        :param cache__: Optional Float seconds
+        :param get__: Optional Str, the Cache-Control of GET responses
+        :param vary__: Optional List[str], request headers GET responses vary by
         :param kwargs:
         :return: None
         """
         for k, v in kwargs.items():
-            if not callable(v):
-                raise TypeError(f"Expected a callable, got {type(v)}.")
-
-            if not v.__name__:
-                raise ValueError(f"Callable {v} must have a name.")
-
-            if k in self.LOOKUP:
-                raise ValueError(f"Function {k} already exists.")
+            if not callable(v) and not isinstance(v, str):
+                raise TypeError(f"Expected a callable or import string, got {type(v)}.")
 
-            self.LOOKUP[k] = v
-
-            if session_auth__:
-                if isinstance(session_auth__, RPCAuthSessionKey):
-                    if k not in self._funcs_session_auth_lookup:
-                        self._funcs_session_auth_lookup[k] = [session_auth__]
-                    else:
-                        if session_auth__ not in self._funcs_session_auth_lookup[k]:
-                            self._funcs_session_auth_lookup[k].append(session_auth__)
-
-                elif isinstance(session_auth__, list):
-                    for auth_session_key in session_auth__:
-                        if isinstance(auth_session_key, RPCAuthSessionKey):
-                            if k not in self._funcs_session_auth_lookup:
-                                self._funcs_session_auth_lookup[k] = [auth_session_key]
-                            else:
-                                if (
-                                    auth_session_key
-                                    not in self._funcs_session_auth_lookup[k]
-                                ):
-                                    self._funcs_session_auth_lookup[k].append(
-                                        auth_session_key
-                                    )
-
-            if host_auth__:
-                if k not in self._funcs_host_auth_lookup:
-                    self._funcs_host_auth_lookup[k] = host_auth__
-                else:
-                    if host_auth__ not in self._funcs_host_auth_lookup[k]:
-                        self._funcs_host_auth_lookup[k] = (
-                            self._funcs_host_auth_lookup[k] + host_auth__
-                        )
+            self._register_function(
+                k,
+                v,
+                session_auth__=session_auth__,
+                host_auth__=host_auth__,
+                token_auth__=token_auth__,
+                job__=job__,
+                executor__=executor__,
+                cache__=cache__,
+                get__=get__,
+                vary__=vary__,
+            )
 
     def functions_auto_name(
         self,
-        functions: t.Iterable[t.Callable],
+        functions: t.Iterable[t.Union[t.Callable, str]],
         session_auth__: t.Optional[
             t.Union[RPCAuthSessionKey, t.List[RPCAuthSessionKey]]
         ] = None,
         host_auth__: t.Optional[t.List[str]] = None,
+        token_auth__: t.Optional[t.Union[RPCAuthToken, t.List[RPCAuthToken]]] = None,
+        job__: bool = False,
+        executor__: t.Optional[str] = None,
+        cache__: t.Optional[float] = None,
+        get__: t.Optional[str] = None,
+        vary__: t.Optional[t.List[str]] = None,
     ):
         """
         Register RPC functions with their local names.
 
         .functions_auto_name([callable_function_here])
 
+        .functions_auto_name(["import.path.to:function"])
+
         host_auth will check the request.host only for the functions being
         added here. Setting this will mean that only requests from the
         specified hosts will be allowed.
@@ -166,60 +363,192 @@ class RPC:
         added here. setting this will mean that only requests with the specified
         session key, and value will be allowed.
 
-        :param functions: Iterable of functions
+        token_auth will check the bearer token only for the functions being
+        added here.
+
+        job will run the functions being added here on the job worker pool.
+
+        executor "process" will run the functions being added here in the
+        process pool.
+
+        cache keeps the successful responses of the functions being added
+        here for that many seconds.
+
+        get also serves the functions being added here on a GET route, with
+        that Cache-Control.
+
+        :param functions: Iterable of functions or import strings
         :param host_auth__: Optional List[str]
         :param session_auth__: Optional RPCAuthSessionKey or List[RPCAuthSessionKey]
+        :param token_auth__: Optional RPCAuthToken or List[RPCAuthToken]
+        :param job__: Bool
+        :param executor__: Optional Str, "process"
+        :param cache__: Optional Float seconds
+        :param get__: Optional Str, the Cache-Control of GET responses
+        :param vary__: Optional List[str], request headers GET responses vary by
         :return: None
         """
         for f in functions:
-            if not callable(f):
-                raise TypeError(f"Expected a callable, got {type(f)}.")
+            if not callable(f) and not isinstance(f, str):
+                raise TypeError(f"Expected a callable or import string, got {type(f)}.")
+
+            self._register_function(
+                f.rsplit(":", 1)[-1].rsplit(".", 1)[-1]
+                if isinstance(f, str)
+                else f.__name__,
+                f,
+                session_auth__=session_auth__,
+                host_auth__=host_auth__,
+                token_auth__=token_auth__,
+                job__=job__,
+                executor__=executor__,
+                cache__=cache__,
+                get__=get__,
+                vary__=vary__,
+            )
+
+    def _register_function(
+        self,
+        name: str,
+        func: t.Union[t.Callable, str],
+        session_auth__: t.Optional[
+            t.Union[RPCAuthSessionKey, t.List[RPCAuthSessionKey]]
+        ] = None,
+        host_auth__: t.Optional[t.List[str]] = None,
+        token_auth__: t.Optional[t.Union[RPCAuthToken, t.List[RPCAuthToken]]] = None,
+        job__: bool = False,
+        executor__: t.Optional[str] = None,
+        cache__: t.Optional[float] = None,
+        get__: t.Optional[str] = None,
+        vary__: t.Optional[t.List[str]] = None,
+    ):
+        if isinstance(func, str):
+            if not func or func.startswith((".", ":")):
+                raise ValueError(f"Invalid import string {func!r}.")
 
-            if not f.__name__:
-                raise ValueError(f"Callable {f} must have a name.")
+        elif not func.__name__:
+            raise ValueError(f"Callable {func} must have a name.")
 
-            if f.__name__ in self.LOOKUP:
-                raise ValueError(f"Function {f.__name__} already exists.")
+        if executor__ not in (None, "process"):
+            raise ValueError(f"Unknown executor {executor__}, use 'process'.")
 
-            self.LOOKUP[f.__name__] = f
+        if cache__ is not None:
+            if self._cache is None:
+                raise ValueError(f"Function {name} uses cache__, but RPC has no cache.")
 
-            if session_auth__:
-                if isinstance(session_auth__, RPCAuthSessionKey):
-                    if f.__name__ not in self._funcs_session_auth_lookup:
-                        self._funcs_session_auth_lookup[f.__name__] = [session_auth__]
-                    else:
-                        if (
-                            session_auth__
-                            not in self._funcs_session_auth_lookup[f.__name__]
-                        ):
-                            self._funcs_session_auth_lookup[f.__name__].append(
-                                session_auth__
-                            )
-
-                elif isinstance(session_auth__, list):
-                    for auth_session_key in session_auth__:
-                        if isinstance(auth_session_key, RPCAuthSessionKey):
-                            if f.__name__ not in self._funcs_session_auth_lookup:
-                                self._funcs_session_auth_lookup[f.__name__] = [
-                                    auth_session_key
-                                ]
-                            else:
-                                if (
+            if job__:
+                raise ValueError(f"Job function {name} can't use cache__.")
+
+            if not cache__ > 0:
+                raise ValueError(f"Invalid cache__ {cache__!r}, use seconds.")
+
+        if get__ is not None:
+            if not isinstance(get__, str) or not get__:
+                raise ValueError(f"Invalid get__ {get__!r}, use a Cache-Control value.")
+
+            if job__:
+                raise ValueError(f"Job function {name} can't use get__.")
+
+        elif vary__:
+            raise ValueError(f"Function {name} uses vary__ without get__.")
+
+        if executor__ == "process" and not isinstance(func, str):
+            from .process_pool import RPCProcessPool
+
+            RPCProcessPool.check(func)
+
+        if name in self.LOOKUP:
+            raise ValueError(f"Function {name} already exists.")
+
+        self.LOOKUP[name] = func
+
+        if session_auth__:
+            if isinstance(session_auth__, RPCAuthSessionKey):
+                session_auth__ = [session_auth__]
+
+            if isinstance(session_auth__, list):
+                for auth_session_key in session_auth__:
+                    if isinstance(auth_session_key, RPCAuthSessionKey):
+                        if name not in self._funcs_session_auth_lookup:
+                            self._funcs_session_auth_lookup[name] = [auth_session_key]
+                        else:
+                            if (
+                                auth_session_key
+                                not in self._funcs_session_auth_lookup[name]
+                            ):
+                                self._funcs_session_auth_lookup[name].append(
                                     auth_session_key
-                                    not in self._funcs_session_auth_lookup[f.__name__]
-                                ):
-                                    self._funcs_session_auth_lookup[f.__name__].append(
-                                        auth_session_key
-                                    )
-
-            if host_auth__:
-                if f.__name__ not in self._funcs_host_auth_lookup:
-                    self._funcs_host_auth_lookup[f.__name__] = host_auth__
-                else:
-                    if host_auth__ not in self._funcs_host_auth_lookup[f.__name__]:
-                        self._funcs_host_auth_lookup[f.__name__] = (
-                            self._funcs_host_auth_lookup[f.__name__] + host_auth__
-                        )
+                                )
+
+        if host_auth__:
+            if name not in self._funcs_host_auth_lookup:
+                self._funcs_host_auth_lookup[name] = host_auth__
+            else:
+                if host_auth__ not in self._funcs_host_auth_lookup[name]:
+                    self._funcs_host_auth_lookup[name] = (
+                        self._funcs_host_auth_lookup[name] + host_auth__
+                    )
+
+        if token_auth__:
+            if isinstance(token_auth__, RPCAuthToken):
+                token_auth__ = [token_auth__]
+
+            for auth_token in token_auth__:
+                if auth_token not in self._funcs_token_auth_lookup.setdefault(name, []):
+                    self._funcs_token_auth_lookup[name].append(auth_token)
+
+        if job__:
+            if self._jobs is None:
+                from .jobs import RPCJobs
+
+                self.jobs(RPCJobs())
+
+            self._funcs_job_lookup.add(name)
+
+        if executor__ == "process":
+            if self._process_pool is None:
+                from .process_pool import RPCProcessPool
+
+                self._process_pool = RPCProcessPool()
+
+            self._funcs_process_lookup.add(name)
+
+        if cache__ is not None:
+            self._funcs_cache_lookup[name] = cache__
+
+        if get__ is not None:
+            self._funcs_get_lookup[name] = (get__, list(vary__ or []))
+
+    def warmup(self):
+        """
+        Import every function that was registered as an import string.
+
+        Call this in gunicorn's preload phase (or at app creation) to pay
+        the import cost once, before the workers are forked.
+
+        :return: None
+        """
+        for name in list(self.LOOKUP):
+            self._resolve(name)
+
+    def _resolve(self, name: str) -> t.Callable:
+        func = self.LOOKUP[name]
+
+        if not isinstance(func, str):
+            return func
+
+        func = import_string(func)
+
+        if not callable(func):
+            raise TypeError(f"Expected {self.LOOKUP[name]} to be a callable.")
+
+        if name in self._funcs_process_lookup:
+            from .process_pool import RPCProcessPool
+
+            RPCProcessPool.check(func)
+
+        self.LOOKUP[name] = func
+        return func
 
     def _register_route(
         self, route_compatible: t.Union[Flask, Blueprint], url_prefix: str
@@ -232,68 +561,862 @@ class RPC:
         if isinstance(route_compatible, Blueprint):
             _blueprint_name = f"_{route_compatible.name}"
 
+        endpoint = (
+            "_rpc"
+            if url_prefix in _default
+            else f"_rpc{_blueprint_name}_{snake_case(url_prefix)}"
+        )
+
         route_compatible.add_url_rule(
             url_prefix,
             view_func=self._rpc_route,
-            endpoint="_rpc"
-            if url_prefix in _default
-            else f"_rpc{_blueprint_name}_{snake_case(url_prefix)}",
+            endpoint=endpoint,
             provide_automatic_options=True,
             methods=["POST"],
         )
+        route_compatible.add_url_rule(
+            url_prefix,
+            view_func=self._get_route,
+            endpoint=f"{endpoint}_get",
+            provide_automatic_options=False,
+            methods=["GET"],
+        )
 
     def _rpc_route(self):
         if not self.LOOKUP:
-            return RPCResponse.fail("No functions registered.")
+            return self._version.encode(RPCResponse.fail("No functions registered."))
+
+        if unauthorized_response := self._check_auth():
+            return self._version.encode(unauthorized_response)
+
+        if request.mimetype == "multipart/form-data":
+            return self._multipart_route()
+
+        if not request.is_json:
+            return self._version.encode(RPCResponse.fail("Request must be JSON."))
+
+        body = request.get_json()
+        response = self._respond(self._handle_body(body))
+
+        if (code := status(body, response)) != 200:
+            return response, code
+
+        return response
+
+    def _get_route(self):
+        """
+        Serves the functions registered with get__, the request is
+        ?function=name&data=JSON, see RPCRequest.query
+        """
+        function = request.args.get("function")
+
+        if function not in self._funcs_get_lookup:
+            raise MethodNotAllowed(valid_methods=["POST"])
+
+        cache_control, vary = self._funcs_get_lookup[function]
+
+        if unauthorized_response := self._check_auth():
+            response = unauthorized_response
+        else:
+            try:
+                data = json.loads(request.args.get("data", "null"))
+            except ValueError:
+                response = RPCResponse.fail("Invalid data.")
+            else:
+                response = self._call(function, data)
+
+        ok = _ok(response)
+        response = current_app.make_response(
+            self._respond(self._version.encode(response))
+        )
+        response.headers["Cache-Control"] = cache_control if ok else "no-store"
+
+        for header in self._get_vary(function, vary):
+            response.vary.add(header)
+
+        if response.direct_passthrough or response.is_streamed:
+            # Attachments are streamed, the body isn't read to hash it
+            return response
+
+        response.add_etag()
+        return response.make_conditional(request)
+
+    def _get_vary(self, function: str, vary: t.List[str]) -> t.List[str]:
+        """
+        The request headers a GET response depends on, the bearer token and
+        session cookie if auth checks them.
+        """
+        vary = list(vary)
+
+        if self._token_auth or self._funcs_token_auth_lookup.get(function):
+            vary.append("Authorization")
+
+        if self._session_auth or self._funcs_session_auth_lookup.get(function):
+            vary.append("Cookie")
+
+        return vary
+
+    def _multipart_route(self):
+        return _handle_multipart(self._handle_body)
+
+    @staticmethod
+    def _respond(
+        response: t.Union[t.Dict[str, t.Any], t.List[t.Dict[str, t.Any]]],
+    ) -> t.Union[t.Dict[str, t.Any], t.List[t.Dict[str, t.Any]], Response]:
+        """
+        Responses that carry attachments are sent as multipart/mixed.
+        """
+        responses = response if isinstance(response, list) else [response]
+
+        if not any(isinstance(r, dict) and r.get("attachments") for r in responses):
+            return response
+
+        envelope, parts = split_attachments(response)
+        body, content_type, length = encode_multipart(
+            envelope, parts, current_app.json.dumps
+        )
+
+        return Response(
+            body,
+            content_type=content_type,
+            headers={"Content-Length": str(length)},
+            direct_passthrough=True,
+        )
+
+    def _handle(
+        self, body: t.Any, auth_context: t.Optional[RPCAuthContext] = None
+    ) -> t.Union[t.Dict[str, t.Any], t.List[t.Dict[str, t.Any]]]:
+        """
+        Handle a decoded request body that arrived by a transport other
+        than the Flask route, checking auth against auth_context.
+
+        :param body: Any, a request envelope or a list of them
+        :param auth_context: Optional RPCAuthContext
+        :return: RPCResponse or List of RPCResponse
+        """
+        if not self.LOOKUP:
+            return self._version.encode(RPCResponse.fail("No functions registered."))
+
+        if unauthorized_response := self._check_auth(auth_context):
+            return self._version.encode(unauthorized_response)
+
+        return self._handle_body(body, auth_context)
+
+    def _handle_body(
+        self, body: t.Any, auth_context: t.Optional[RPCAuthContext] = None
+    ) -> t.Union[t.Dict[str, t.Any], t.List[t.Dict[str, t.Any]]]:
+        if not body:
+            return self._version.encode(RPCResponse.fail("Request must not be empty."))
+
+        if isinstance(body, list):
+            if self._transaction is not None:
+                return self._run_transaction(
+                    [
+                        partial(self._dispatch, envelope, auth_context)
+                        for envelope in body
+                    ]
+                )
+
+            return [self._dispatch(envelope, auth_context) for envelope in body]
+
+        return self._dispatch(body, auth_context)
+
+    def call(
+        self,
+        function: str,
+        data: t.Any = None,
+        *,
+        auth_context: t.Optional[RPCAuthContext] = None,
+        trusted: bool = False,
+        fields: t.Optional[t.Union[t.List[str], RPCFields]] = None,
+    ) -> t.Dict[str, t.Any]:
+        """
+        Call a registered function in-process, without going through HTTP.
+
+        The same lookup and auth checks as the route are used, auth is checked
+        against auth_context, or the current request if auth_context is not set.
+        Outside a request, and without an auth_context, functions that have
+        session_auth or host_auth set will be unauthorized.
+
+        trusted skips all auth checks, only use this for internal callers.
+
+        :param function: Str
+        :param data: Any
+        :param auth_context: Optional RPCAuthContext
+        :param trusted: Bool
+        :param fields: Optional List[str] or RPCFields, projects the response data
+        :return: RPCResponse
+        """
+        if fields is not None and not isinstance(fields, RPCFields):
+            fields = RPCFields(fields)
+
+        if auth_context is None and not has_request_context():
+            auth_context = RPCAuthContext()
+
+        if not trusted:
+            if unauthorized_response := self._check_auth(auth_context):
+                return unauthorized_response
+
+        return self._call(function, data, auth_context, trusted, fields)
+
+    def call_many(
+        self,
+        calls: t.Iterable[t.Tuple[str, t.Any]],
+        *,
+        auth_context: t.Optional[RPCAuthContext] = None,
+        trusted: bool = False,
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """
+        Call many registered functions in-process, see .call
+
+        .call_many([("read", {"client_id": 1}), ("read", {"client_id": 2})])
+
+        :param calls: Iterable of (function, data)
+        :param auth_context: Optional RPCAuthContext
+        :param trusted: Bool
+        :return: List of RPCResponse
+        """
+        calls = list(calls)
+
+        if auth_context is None and not has_request_context():
+            auth_context = RPCAuthContext()
+
+        if not trusted:
+            if unauthorized_response := self._check_auth(auth_context):
+                return [unauthorized_response for _ in calls]
+
+        if self._transaction is not None:
+            return self._run_transaction(
+                [
+                    partial(self._call, function, data, auth_context, trusted)
+                    for function, data in calls
+                ]
+            )
+
+        return [
+            self._call(function, data, auth_context, trusted)
+            for function, data in calls
+        ]
+
+    def _run_transaction(
+        self, calls: t.List[t.Callable[[], t.Dict[str, t.Any]]]
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """
+        Run the calls of a batch in the transaction. Responses for
+        idempotency keys are only stored once their work has committed,
+        the keys of calls that were rolled back are released, so a retry
+        runs them again.
+        """
+        if self._idempotency is None:
+            return self._transaction.run(calls)
+
+        owners = {}
+
+        def run(index: int, call: t.Callable[[], t.Dict[str, t.Any]]):
+            start = len(held)
+            try:
+                return call()
+            finally:
+                owners.update((key, index) for key, _ in held[start:])
 
+        with self._idempotency.hold() as held:
+            responses = self._transaction.run(
+                [partial(run, index, call) for index, call in enumerate(calls)]
+            )
+
+        for key, response in held:
+            if _ok(response) and not _ok(responses[owners[key]]):
+                self._idempotency.release(key)
+            else:
+                self._idempotency.finish(key, response)
+
+        return responses
+
+    def _check_auth(
+        self, auth_context: t.Optional[RPCAuthContext] = None
+    ) -> t.Optional[t.Dict[str, t.Any]]:
+        """
+        Check the session_auth and host_auth set for every function.
+
+        :param auth_context: Optional RPCAuthContext, defaults to the current request
+        :return: A failed RPCResponse if unauthorized, otherwise None
+        """
         if self._session_auth:
+            _session = session if auth_context is None else auth_context.session
+
             if isinstance(self._session_auth, RPCAuthSessionKey):
-                if not self._session_auth.check(session):
+                if not self._session_auth.check(_session):
                     return RPCResponse.fail("Unauthorized.")
 
             if isinstance(self._session_auth, list):
                 for auth_session_key in self._session_auth:
                     if isinstance(auth_session_key, RPCAuthSessionKey):
-                        if not auth_session_key.check(session):
+                        if not auth_session_key.check(_session):
                             return RPCResponse.fail("Unauthorized.")
                     else:
                         raise ValueError("Invalid session_auth type.")
 
         if self._host_auth:
-            if request.host not in self._host_auth:
-                return RPCResponse.fail(f"Unauthorized ({request.host})")
+            _host = request.host if auth_context is None else auth_context.host
 
-        if not request.is_json:
-            return RPCResponse.fail("Request must be JSON.")
+            if _host not in self._host_auth:
+                return RPCResponse.fail(f"Unauthorized ({_host})")
 
-        _json = request.get_json()
+        if self._token_auth:
+            _token = _bearer_token() if auth_context is None else auth_context.token
 
-        if not _json:
-            return RPCResponse.fail("Request must not be empty.")
+            for auth_token in self._token_auth:
+                if not auth_token.check(_token):
+                    return RPCResponse.fail("Unauthorized.")
 
-        if not _json.get("weerpc") == 1.1:
-            return RPCResponse.fail("Invalid weerpc version.")
+        return None
 
-        try:
-            rpcm = RPCModel(**_json)
-        except ValidationError:
-            return RPCResponse.fail("Invalid request.")
+    def _sniff(self, envelope: t.Dict[str, t.Any]) -> t.Optional[RPCVersion]:
+        for key, version in self._versions.items():
+            if key in envelope:
+                return version if envelope[key] == version.version else None
 
-        try:
-            assert rpcm.function in self.LOOKUP
-        except AssertionError:
+        return None
+
+    def _decode(
+        self, envelope: t.Any
+    ) -> t.Tuple[
+        RPCVersion,
+        t.Union[t.Tuple[str, t.Any, t.Optional[RPCFields]], t.Dict[str, t.Any]],
+    ]:
+        """
+        Read the version, function, data and fields of a single request envelope.
+
+        :param envelope: Any, the decoded JSON request
+        :return: The version, and either (function, data, fields) or a failed
+            RPCResponse
+        """
+        if not isinstance(envelope, dict) or not envelope:
+            return self._version, RPCResponse.fail("Invalid request.")
+
+        if not (version := self._sniff(envelope)):
+            return self._version, RPCResponse.fail(
+                f"Invalid {self._version.key} version."
+            )
+
+        if not (decoded := version.decode(envelope)):
+            return version, RPCResponse.fail("Invalid request.")
+
+        fields = None
+        if envelope.get("fields") is not None:
+            if (fields := RPCFields.parse(envelope["fields"])) is None:
+                return version, RPCResponse.fail("Invalid fields.")
+
+        return version, (*decoded, fields)
+
+    def _dispatch(
+        self, envelope: t.Any, auth_context: t.Optional[RPCAuthContext] = None
+    ) -> t.Dict[str, t.Any]:
+        """
+        Read the version of a single request envelope, run it, and
+        encode the response in the same version.
+
+        :param envelope: Any, the decoded JSON request
+        :param auth_context: Optional RPCAuthContext, defaults to the current request
+        :return: RPCResponse
+        """
+        version, decoded = self._decode(envelope)
+
+        if isinstance(decoded, dict):
+            return version.encode(decoded)
+
+        function, data, fields = decoded
+
+        if is_notification(envelope):
+            return version.encode(self._notify(envelope, function, auth_context))
+
+        if (key := self._idempotency_key(envelope, function, auth_context)) is not None:
+            if isinstance(key, dict):
+                return version.encode(key)
+
+            return version.encode(
+                self._idempotency.run(
+                    key,
+                    partial(self._call, function, data, auth_context, fields=fields),
+                )
+            )
+
+        return version.encode(self._call(function, data, auth_context, fields=fields))
+
+    def _notify(
+        self,
+        envelope: t.Dict[str, t.Any],
+        function: str,
+        auth_context: t.Optional[RPCAuthContext] = None,
+    ) -> t.Dict[str, t.Any]:
+        """
+        Check a notification can run, and queue it without waiting for it.
+
+        The function and its auth are checked now, so the client hears about
+        those failures. The request's session, host and token are copied
+        for the call, which runs after the request has ended.
+
+        :return: RPCResponse, accepted, rejected or failed
+        """
+        if not isinstance(function, str) or function not in self.LOOKUP:
             return RPCResponse.fail("Invalid function.")
 
-        if self._funcs_session_auth_lookup.get(rpcm.function):
-            for auth_session_key in self._funcs_session_auth_lookup[rpcm.function]:
-                if not auth_session_key.check(session):
+        if unauthorized_response := self._check_function_auth(function, auth_context):
+            return unauthorized_response
+
+        if _current_attachments.get():
+            return RPCResponse.fail("Notifications can't carry attachments.")
+
+        if auth_context is None:
+            auth_context = RPCAuthContext(
+                session=dict(session), host=request.host, token=_bearer_token()
+            )
+
+        if self._notifications is None:
+            self._notifications = RPCNotifications()
+
+        app = current_app._get_current_object() if has_app_context() else None
+        envelope = {k: v for k, v in envelope.items() if k != "notify"}
+
+        def run():
+            if app is None:
+                return self._dispatch(envelope, auth_context)
+
+            with app.app_context():
+                try:
+                    return self._dispatch(envelope, auth_context)
+                except Exception:
+                    app.logger.exception(f"Notification {function} failed.")
+                    raise
+
+        return acknowledge(self._notifications.submit(run))
+
+    def _idempotency_key(
+        self,
+        envelope: t.Dict[str, t.Any],
+        function: str,
+        auth_context: t.Optional[RPCAuthContext] = None,
+    ) -> t.Optional[t.Union[str, t.Dict[str, t.Any]]]:
+        """
+        The store key for the envelope's idempotency_key, scoped to the
+        function and the caller's host, bearer token and session auth values.
+
+        :return: None if idempotency isn't used, the key, or a failed RPCResponse
+        """
+        if self._idempotency is None or envelope.get("idempotency_key") is None:
+            return None
+
+        key = envelope["idempotency_key"]
+
+        if not isinstance(key, str) or not 0 < len(key) <= 255:
+            return RPCResponse.fail("Invalid idempotency_key.")
+
+        return _digest([function, key, *self._auth_scope(function, auth_context)])
+
+    def _cache_key(
+        self,
+        function: str,
+        data: t.Any,
+        fields: t.Optional[RPCFields],
+        auth_context: t.Optional[RPCAuthContext] = None,
+    ) -> t.Optional[str]:
+        """
+        The cache key for a call, scoped to the function and the caller's
+        host, bearer token and session auth values.
+
+        :return: None if the function isn't cached
+        """
+        if function not in self._funcs_cache_lookup:
+            return None
+
+        return _digest(
+            [
+                function,
+                data,
+                fields.paths if fields is not None else None,
+                *self._auth_scope(function, auth_context),
+            ]
+        )
+
+    def _auth_scope(
+        self, function: str, auth_context: t.Optional[RPCAuthContext] = None
+    ) -> t.List[t.Any]:
+        """
+        The caller's host, bearer token and the session values checked by
+        session auth, results stored for one caller are never sent to another.
+        """
+        session_keys = (
+            [self._session_auth]
+            if isinstance(self._session_auth, RPCAuthSessionKey)
+            else list(self._session_auth)
+        ) + self._funcs_session_auth_lookup.get(function, [])
+
+        if auth_context is None:
+            _session = session if session_keys else {}
+            _host = request.host
+            _token = _bearer_token()
+        else:
+            _session = auth_context.session
+            _host = auth_context.host
+            _token = auth_context.token
+
+        return [_host, _token, {k._key: _session.get(k._key) for k in session_keys}]
+
+    def _check_function_auth(
+        self, function: str, auth_context: t.Optional[RPCAuthContext] = None
+    ) -> t.Optional[t.Dict[str, t.Any]]:
+        """
+        Check the auth set for the function itself.
+
+        :return: None if authorized, otherwise a failed RPCResponse
+        """
+        if self._funcs_session_auth_lookup.get(function):
+            _session = session if auth_context is None else auth_context.session
+
+            for auth_session_key in self._funcs_session_auth_lookup[function]:
+                if not auth_session_key.check(_session):
+                    return RPCResponse.fail("Unauthorized.")
+
+        if self._funcs_host_auth_lookup.get(function):
+            _host = request.host if auth_context is None else auth_context.host
+
+            if _host not in self._funcs_host_auth_lookup[function]:
+                return RPCResponse.fail(f"Unauthorized ({_host})")
+
+        if self._funcs_token_auth_lookup.get(function):
+            _token = _bearer_token() if auth_context is None else auth_context.token
+
+            for auth_token in self._funcs_token_auth_lookup[function]:
+                if not auth_token.check(_token):
                     return RPCResponse.fail("Unauthorized.")
 
-        if self._funcs_host_auth_lookup.get(rpcm.function):
-            if request.host not in self._funcs_host_auth_lookup[rpcm.function]:
-                return RPCResponse.fail(f"Unauthorized ({request.host})")
+        return None
 
-        if successful_response := self.LOOKUP[rpcm.function](rpcm.data):
-            return successful_response
+    def _prepare(
+        self,
+        function: str,
+        data: t.Any,
+        auth_context: t.Optional[RPCAuthContext] = None,
+        trusted: bool = False,
+    ) -> t.Union[t.Callable, t.Dict[str, t.Any]]:
+        """
+        Check the function's own auth, and queue it if it's a job function.
+
+        :return: The callable to run, or an RPCResponse to send back instead
+        """
+        if not isinstance(function, str) or function not in self.LOOKUP:
+            return RPCResponse.fail("Invalid function.")
+
+        if not trusted:
+            if unauthorized_response := self._check_function_auth(
+                function, auth_context
+            ):
+                return unauthorized_response
+
+            if function in JOB_FUNCTIONS and self._jobs is not None:
+                # Reading or cancelling a job needs the auth of the
+                # function that queued it
+                if (queued_by := self._jobs.function(data)) is not None:
+                    if unauthorized_response := self._check_function_auth(
+                        queued_by, auth_context
+                    ):
+                        return unauthorized_response
+
+        func = self._resolve(function)
+
+        if function in self._funcs_process_lookup:
+            func = partial(self._process_pool.run, func)
+
+        if function in self._funcs_job_lookup:
+            return RPCResponse.success(
+                {"job_id": self._jobs.submit(function, func, data)},
+                f"Function '{function}' queued.",
+            )
+
+        return func
+
+    def _call(
+        self,
+        function: str,
+        data: t.Any,
+        auth_context: t.Optional[RPCAuthContext] = None,
+        trusted: bool = False,
+        fields: t.Optional[RPCFields] = None,
+    ) -> t.Dict[str, t.Any]:
+        """
+        Check the function's own auth and run it.
+
+        :param function: Str
+        :param data: Any
+        :param auth_context: Optional RPCAuthContext, defaults to the current request
+        :param trusted: Bool, skip the function's own auth
+        :param fields: Optional RPCFields, projects the response data
+        :return: RPCResponse
+        """
+        func = self._prepare(function, data, auth_context, trusted)
+
+        if isinstance(func, dict):
+            return func
+
+        if self._metrics is None:
+            return self._execute(function, func, data, auth_context, fields)
+
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self._execute(function, func, data, auth_context, fields)
+            return response
+        finally:
+            self._metrics.observe(
+                function, time.perf_counter() - started, _ok(response)
+            )
+
+    def _execute(
+        self,
+        function: str,
+        func: t.Callable,
+        data: t.Any,
+        auth_context: t.Optional[RPCAuthContext],
+        fields: t.Optional[RPCFields],
+    ) -> t.Dict[str, t.Any]:
+        """
+        Run a prepared function, or send back its cached response.
+        """
+        cache_key = self._cache_key(function, data, fields, auth_context)
+
+        if cache_key is not None and (cached := self._cache.get(cache_key)):
+            return json.loads(cached)
+
+        token = _current_fields.set(fields)
+        try:
+            successful_response = func(data)
+
+            if inspect.isawaitable(successful_response):
+                import asyncio
+
+                successful_response = asyncio.run(_await(successful_response))
+        finally:
+            _current_fields.reset(token)
+
+        if successful_response:
+            response = _project(successful_response, fields)
+
+            if cache_key is not None and _cacheable(response):
+                self._cache.set(
+                    cache_key, _encode(response), self._funcs_cache_lookup[function]
+                )
+
+            return response
 
         return RPCResponse.fail("Unsuccessful command execution.")
+
+    async def _handle_async(
+        self,
+        body: t.Any,
+        auth_context: RPCAuthContext,
+        run_sync: t.Callable[[t.Callable, t.Any], t.Awaitable[t.Any]],
+    ) -> t.Union[t.Dict[str, t.Any], t.List[t.Dict[str, t.Any]]]:
+        """
+        The async version of ._handle, async functions are awaited and sync
+        functions are passed to run_sync, which should run them off the
+        event loop.
+
+        :param body: Any, a request envelope or a list of them
+        :param auth_context: RPCAuthContext
+        :param run_sync: Async Callable(func, data)
+        :return: RPCResponse or List of RPCResponse
+        """
+        if not self.LOOKUP:
+            return self._version.encode(RPCResponse.fail("No functions registered."))
+
+        if unauthorized_response := self._check_auth(auth_context):
+            return self._version.encode(unauthorized_response)
+
+        if not body:
+            return self._version.encode(RPCResponse.fail("Request must not be empty."))
+
+        if isinstance(body, list):
+            if self._transaction is not None:
+                # The calls share one session, so they run one after the
+                # other on a single thread.
+                return await run_sync(
+                    partial(self._handle_body, auth_context=auth_context), body
+                )
+
+            return [
+                await self._dispatch_async(envelope, auth_context, run_sync)
+                for envelope in body
+            ]
+
+        return await self._dispatch_async(body, auth_context, run_sync)
+
+    async def _dispatch_async(
+        self,
+        envelope: t.Any,
+        auth_context: RPCAuthContext,
+        run_sync: t.Callable[[t.Callable, t.Any], t.Awaitable[t.Any]],
+    ) -> t.Dict[str, t.Any]:
+        version, decoded = self._decode(envelope)
+
+        if isinstance(decoded, dict):
+            return version.encode(decoded)
+
+        function, data, fields = decoded
+
+        if is_notification(envelope):
+            return version.encode(self._notify(envelope, function, auth_context))
+
+        if self._idempotency_key(envelope, function, auth_context) is not None:
+            # Duplicates block while waiting for the first, so keep them
+            # off the event loop
+            return await run_sync(
+                lambda _: self._dispatch(envelope, auth_context), None
+            )
+
+        func = self._prepare(function, data, auth_context)
+
+        if isinstance(func, dict):
+            return version.encode(func)
+
+        func = self._funcs_async_lookup.get(function, func)
+
+        if self._metrics is None:
+            return version.encode(
+                await self._execute_async(
+                    function, func, data, auth_context, fields, run_sync
+                )
+            )
+
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self._execute_async(
+                function, func, data, auth_context, fields, run_sync
+            )
+            return version.encode(response)
+        finally:
+            self._metrics.observe(
+                function, time.perf_counter() - started, _ok(response)
+            )
+
+    async def _execute_async(
+        self,
+        function: str,
+        func: t.Callable,
+        data: t.Any,
+        auth_context: RPCAuthContext,
+        fields: t.Optional[RPCFields],
+        run_sync: t.Callable[[t.Callable, t.Any], t.Awaitable[t.Any]],
+    ) -> t.Dict[str, t.Any]:
+        """
+        The async version of ._execute
+        """
+        cache_key = self._cache_key(function, data, fields, auth_context)
+
+        if cache_key is not None and (cached := self._cache.get(cache_key)):
+            return json.loads(cached)
+
+        token = _current_fields.set(fields)
+        try:
+            if inspect.iscoroutinefunction(func):
+                successful_response = await func(data)
+            else:
+                successful_response = await run_sync(func, data)
+
+                if inspect.isawaitable(successful_response):
+                    successful_response = await successful_response
+        finally:
+            _current_fields.reset(token)
+
+        if successful_response:
+            response = _project(successful_response, fields)
+
+            if cache_key is not None and _cacheable(response):
+                self._cache.set(
+                    cache_key, _encode(response), self._funcs_cache_lookup[function]
+                )
+
+            return response
+
+        return RPCResponse.fail("Unsuccessful command execution.")
+
+
+def _project(response: t.Any, fields: t.Optional[RPCFields]) -> t.Any:
+    if fields is None or not isinstance(response, dict) or not response.get("ok"):
+        return response
+
+    return {
+        **response,
+        "data": fields.apply(response.get("data"), bool(response.get("columnar"))),
+    }
+
+
+def _digest(scope: t.List[t.Any]) -> str:
+    return hashlib.blake2b(
+        json.dumps(scope, sort_keys=True, default=str).encode(), digest_size=20
+    ).hexdigest()
+
+
+def _encode(response: t.Any) -> bytes:
+    if has_app_context():
+        return current_app.json.dumps(response).encode()
+
+    return json.dumps(response, default=str).encode()
+
+
+def _handle_multipart(
+    handle_body: t.Callable[[t.Any], t.Any],
+) -> t.Union[t.Dict[str, t.Any], t.List[t.Dict[str, t.Any]], Response]:
+    """
+    Handle a multipart/form-data request. The JSON envelope is the "envelope"
+    field, and each file part is an attachment, functions read them using
+    RPCAttachment.current().
+
+    :param handle_body: Callable, handles the decoded envelope
+    :return: The response, see RPC._respond
+    """
+    body, attachments = read_multipart(
+        request.environ,
+        max_form_memory_size=request.max_form_memory_size,
+        max_content_length=request.max_content_length,
+    )
+
+    token = _current_attachments.set(attachments)
+    try:
+        response = RPC._respond(handle_body(body))
+    finally:
+        _current_attachments.reset(token)
+
+    if isinstance(response, Response):
+        for attachment in attachments.values():
+            response.call_on_close(attachment.close)
+    else:
+        for attachment in attachments.values():
+            attachment.close()
+
+    return response
+
+
+def _ok(response: t.Any) -> bool:
+    return isinstance(response, dict) and bool(response.get("ok"))
+
+
+def _cacheable(response: t.Any) -> bool:
+    return (
+        isinstance(response, dict)
+        and bool(response.get("ok"))
+        and "attachments" not in response
+    )
+
+
+async def _await(awaitable: t.Awaitable) -> t.Any:
+    return await awaitable
+
+
+def _bearer_token() -> t.Optional[str]:
+    authorization = request.headers.get("Authorization", "")
+
+    if authorization[:7].lower() == "bearer ":
+        return authorization[7:].strip()
+
+    return None
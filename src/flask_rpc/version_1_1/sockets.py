@@ -0,0 +1,414 @@
+import asyncio
+import itertools
+import json
+import socket
+import socketserver
+import struct
+import threading
+import typing as t
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from flask import Flask
+
+from .auth_context import RPCAuthContext
+from .columnar import rehydrate
+from .request import RPCRequest
+from .response import RPCResponse
+
+if t.TYPE_CHECKING:
+    from .rpc import RPC
+
+# Frames are a 4 byte big-endian length followed by a JSON array of
+# [request_id, body] or [request_id, body, bearer_token], responses are
+# sent back as [request_id, response].
+_HEADER = struct.Struct(">I")
+
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+UNIX_HOST = "unix"
+
+Address = t.Union[str, t.Tuple[str, int]]
+
+
+def pack_frame(obj: t.Any) -> bytes:
+    payload = json.dumps(obj, separators=(",", ":"), default=str).encode()
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _recv_exact(sock: socket.socket, size: int) -> t.Optional[bytes]:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if not n:
+            return None
+        received += n
+    return bytes(buffer)
+
+
+def recv_frame(
+    sock: socket.socket, max_frame_size: int = MAX_FRAME_SIZE
+) -> t.Optional[bytes]:
+    if (header := _recv_exact(sock, _HEADER.size)) is None:
+        return None
+
+    (size,) = _HEADER.unpack(header)
+    if size > max_frame_size:
+        raise ValueError(f"Frame of {size} bytes is larger than {max_frame_size}.")
+
+    return _recv_exact(sock, size)
+
+
+def _peer_host(peer: t.Any) -> str:
+    if isinstance(peer, tuple) and peer:
+        return peer[0]
+
+    return UNIX_HOST
+
+
+class RPCSocketServer:
+    """
+    Serves the functions of an RPC instance over a TCP or Unix domain socket,
+    without going through HTTP / WSGI.
+    """
+
+    _rpc: "RPC"
+    _app: t.Optional[Flask]
+    _executor: ThreadPoolExecutor
+    _server: t.Optional[socketserver.BaseServer]
+    _stop_async: t.Optional[t.Tuple[asyncio.AbstractEventLoop, asyncio.Event]]
+
+    def __init__(
+        self,
+        rpc: "RPC",
+        app: t.Optional[Flask] = None,
+        max_workers: t.Optional[int] = None,
+        max_frame_size: int = MAX_FRAME_SIZE,
+        host: t.Optional[str] = None,
+        peers: t.Optional[t.Iterable[str]] = None,
+    ):
+        """
+        Requests are handled with the same envelope, validation and
+        RPCResponse as the RPC route. Connections are persistent, and many
+        requests can be in flight on one connection, matched by request id.
+
+        host is the name host_auth checks, as it checks the Host header on
+        HTTP, without it functions that use host_auth will be unauthorized.
+        peers limits who can connect, by IP address, or "unix" for Unix
+        domain sockets. token_auth is checked against the token sent by the
+        client. There is no session, so functions that use session_auth will
+        be unauthorized.
+
+        :param rpc: RPC
+        :param app: Optional Flask, functions run inside its app context
+        :param max_workers: Optional Int, size of the thread pool running functions
+        :param max_frame_size: Int, the largest request frame accepted in bytes
+        :param host: Optional Str, checked by host_auth
+        :param peers: Optional Iterable of Str, the peer addresses allowed to
+            connect, any peer if not set
+        """
+        self._rpc = rpc
+        self._app = app
+        self._max_frame_size = max_frame_size
+        self._host = host
+        self._peers = frozenset(peers) if peers is not None else None
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="rpc_socket"
+        )
+        self._server = None
+        self._stop_async = None
+
+    def handle_frame(self, payload: bytes) -> bytes:
+        """
+        Handle a single request frame payload, and return the response frame.
+
+        :param payload: Bytes, the JSON [request_id, body, Optional token]
+        :return: Bytes
+        """
+        try:
+            request_id, body, *token = json.loads(payload)
+        except (ValueError, TypeError):
+            return pack_frame([None, RPCResponse.fail("Invalid request.")])
+
+        auth_context = RPCAuthContext(
+            host=self._host,
+            token=token[0] if token and isinstance(token[0], str) else None,
+        )
+
+        try:
+            if self._app is None:
+                response = self._rpc._handle(body, auth_context)
+            else:
+                with self._app.app_context():
+                    response = self._rpc._handle(body, auth_context)
+        except Exception:
+            # The HTTP route would answer with a 500, the client is still
+            # waiting on this request id so it must get a response.
+            response = RPCResponse.fail("Internal server error.")
+
+        return pack_frame([request_id, response])
+
+    def _allowed(self, peer: t.Any) -> bool:
+        return self._peers is None or _peer_host(peer) in self._peers
+
+    def _serve_connection(self, sock: socket.socket, peer: t.Any):
+        if not self._allowed(peer):
+            return
+
+        write_lock = threading.Lock()
+
+        def reply(future: Future):
+            try:
+                frame = future.result()
+            except Exception:
+                return
+
+            with write_lock:
+                try:
+                    sock.sendall(frame)
+                except OSError:
+                    pass
+
+        while True:
+            try:
+                payload = recv_frame(sock, self._max_frame_size)
+            except (OSError, ValueError):
+                return
+
+            if payload is None:
+                return
+
+            self._executor.submit(self.handle_frame, payload).add_done_callback(reply)
+
+    def serve_forever(self, address: Address):
+        """
+        Serve using a thread per connection, with functions run on the
+        thread pool. Blocks until .shutdown() is called.
+
+        :param address: (host, port) for TCP, or a Str path for a Unix socket
+        :return: None
+        """
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._serve_connection(self.request, self.client_address)
+
+        if isinstance(address, str):
+            base = socketserver.ThreadingUnixStreamServer
+        else:
+            base = socketserver.ThreadingTCPServer
+
+        class Server(base):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        with Server(address, Handler) as self._server:
+            self._server.serve_forever()
+
+    async def serve_async(self, address: Address):
+        """
+        Serve using asyncio, with functions run on the thread pool.
+        Runs until cancelled, or .shutdown() is called.
+
+        :param address: (host, port) for TCP, or a Str path for a Unix socket
+        :return: None
+        """
+        if isinstance(address, str):
+            server = await asyncio.start_unix_server(self._serve_stream, path=address)
+        else:
+            server = await asyncio.start_server(self._serve_stream, *address)
+
+        stop = asyncio.Event()
+        self._stop_async = (asyncio.get_running_loop(), stop)
+
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            self._stop_async = None
+
+    async def _serve_stream(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        loop = asyncio.get_running_loop()
+        pending = set()
+
+        if not self._allowed(writer.get_extra_info("peername")):
+            writer.close()
+            return
+
+        async def reply(payload: bytes):
+            frame = await loop.run_in_executor(
+                self._executor, self.handle_frame, payload
+            )
+            writer.write(frame)
+            await writer.drain()
+
+        try:
+            while True:
+                header = await reader.readexactly(_HEADER.size)
+                (size,) = _HEADER.unpack(header)
+                if size > self._max_frame_size:
+                    break
+
+                task = asyncio.create_task(reply(await reader.readexactly(size)))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+        if self._stop_async is not None:
+            loop, stop = self._stop_async
+
+            try:
+                loop.call_soon_threadsafe(stop.set)
+            except RuntimeError:
+                # The loop has been closed
+                pass
+
+        self._executor.shutdown(wait=False)
+
+
+class RPCSocketClient:
+    """
+    A client for RPCSocketServer, one persistent connection that many
+    threads can make calls over at the same time.
+    """
+
+    _sock: socket.socket
+    _pending: t.Dict[int, Future]
+
+    def __init__(
+        self,
+        address: Address,
+        timeout: t.Optional[float] = None,
+        token: t.Optional[str] = None,
+    ):
+        """
+        :param address: (host, port) for TCP, or a Str path for a Unix socket
+        :param timeout: Optional Float seconds to wait for each response
+        :param token: Optional Str, bearer token sent with every request
+        """
+        if isinstance(address, str):
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self._sock.connect(address)
+        self._timeout = timeout
+        self._token = token
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        try:
+            while (payload := recv_frame(self._sock)) is not None:
+                request_id, response = json.loads(payload)
+                with self._lock:
+                    future = self._pending.pop(request_id, None)
+                if future is not None:
+                    future.set_result(rehydrate(response))
+        except (OSError, ValueError):
+            pass
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for future in pending.values():
+            future.set_exception(ConnectionError("Connection closed."))
+
+    def send(self, body: t.Any) -> Future:
+        """
+        Send a request envelope, or a list of them, and return a Future
+        for the response.
+
+        :param body: Dict or List of Dict
+        :return: Future
+        """
+        return self._send(body)[1]
+
+    def _send(self, body: t.Any) -> t.Tuple[int, Future]:
+        future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+
+        frame = pack_frame(
+            [request_id, body]
+            if self._token is None
+            else [request_id, body, self._token]
+        )
+        with self._write_lock:
+            self._sock.sendall(frame)
+        return request_id, future
+
+    def _wait(self, body: t.Any) -> t.Any:
+        request_id, future = self._send(body)
+
+        try:
+            return future.result(self._timeout)
+        except TimeoutError:
+            # A response that arrives later is dropped by the reader
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise
+
+    def call(
+        self,
+        function: str,
+        data: t.Any = None,
+        fields: t.Optional[t.List[str]] = None,
+        idempotency_key: t.Optional[str] = None,
+    ) -> t.Dict[str, t.Any]:
+        """
+        Call a function and wait for its RPCResponse.
+
+        :param function: Str
+        :param data: Any (JSON serializable)
+        :param fields: Optional List[str], narrows the response data
+        :param idempotency_key: Optional Str, retries with the same key get the
+            first response
+        :return: RPCResponse
+        """
+        return self._wait(RPCRequest.build(function, data, fields, idempotency_key))
+
+    def call_many(
+        self, calls: t.Iterable[t.Tuple[str, t.Any]]
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """
+        Call many functions in one batch request.
+
+        :param calls: Iterable of (function, data)
+        :return: List of RPCResponse
+        """
+        return self._wait(
+            [RPCRequest.build(function, data) for function, data in calls]
+        )
+
+    def close(self):
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,69 @@
+import typing as t
+
+
+class RPCVersion:
+    """
+    The decoder / encoder for a single version of the weeRPC envelope.
+    """
+
+    __slots__ = ("key", "version", "response_version")
+
+    key: str
+    version: float
+    response_version: float
+
+    def __init__(self, key: str, version: float, response_version: float):
+        """
+        :param key: Str, the envelope key that holds the version
+        :param version: Float, the version expected in requests
+        :param response_version: Float, the version set on responses
+        """
+        self.key = key
+        self.version = version
+        self.response_version = response_version
+
+    def decode(self, envelope: t.Dict[str, t.Any]) -> t.Optional[t.Tuple[str, t.Any]]:
+        """
+        Return the function name and data of a request, or None if
+        the request is invalid.
+
+        :param envelope: Dict, the decoded JSON request
+        :return: Optional Tuple[str, Any]
+        """
+        function = envelope.get("function")
+
+        if not isinstance(function, str) or "data" not in envelope:
+            return None
+
+        return function, envelope["data"]
+
+    def encode(self, response: t.Any) -> t.Any:
+        """
+        Make sure the response carries this version's key, responses built
+        with another version's RPCResponse are converted.
+
+        :param response: Any, usually an RPCResponse dict
+        :return: Any
+        """
+        if not isinstance(response, dict) or self.key in response:
+            return response
+
+        for key in KEYS:
+            if key in response:
+                return {
+                    self.key: self.response_version,
+                    **{k: v for k, v in response.items() if k != key},
+                }
+
+        return response
+
+
+VERSION_1_0 = RPCVersion("wrpc", 1.0, 1.0)
+VERSION_1_1 = RPCVersion("weerpc", 1.1, 1.0)
+
+VERSIONS: t.Dict[float, RPCVersion] = {
+    VERSION_1_0.version: VERSION_1_0,
+    VERSION_1_1.version: VERSION_1_1,
+}
+
+KEYS = tuple(v.key for v in VERSIONS.values())
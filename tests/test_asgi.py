@@ -0,0 +1,97 @@
+import asyncio
+import io
+import json
+import time
+
+from flask import Flask, current_app
+
+from flask_rpc.latest import RPC, RPCASGI, RPCRequest, RPCResponse
+from flask_rpc.version_1_1.attachments import attach, decode_multipart
+
+
+def _call(asgi, body, method="POST", headers=()):
+    async def run():
+        messages = [{"type": "http.request", "body": json.dumps(body).encode()}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await asgi(
+            {
+                "type": "http",
+                "method": method,
+                "headers": [(b"content-type", b"application/json"), *headers],
+            },
+            receive,
+            send,
+        )
+        return sent
+
+    sent = asyncio.run(run())
+    content = b"".join(m.get("body", b"") for m in sent[1:])
+    return sent[0]["status"], dict(sent[0]["headers"]), content
+
+
+def _rpc():
+    async def wait(data):
+        await asyncio.sleep(data)
+        return RPCResponse.success(data)
+
+    rpc = RPC(None)
+    rpc.functions(
+        wait=wait,
+        sleep=lambda data: time.sleep(data) or RPCResponse.success(current_app.name),
+        file=lambda data: RPCResponse.success(
+            data, attachments={"file": io.BytesIO(b"contents")}
+        ),
+    )
+    rpc.functions(host_auth__=["api.local"], hosted=lambda data: RPCResponse.success(1))
+    return rpc
+
+
+def test_batch_runs_async_and_sync_functions():
+    asgi = RPCASGI(_rpc(), Flask("asgi_app"))
+    started = time.monotonic()
+    status, _, content = _call(
+        asgi,
+        [
+            RPCRequest.build("wait", 0.2),
+            RPCRequest.build("sleep", 0.01),
+            RPCRequest.build("missing"),
+        ],
+    )
+
+    assert status == 200
+    assert [r["data"] for r in json.loads(content)[:2]] == [0.2, "asgi_app"]
+    assert json.loads(content)[2]["message"] == "Invalid function."
+    assert time.monotonic() - started < 2
+
+
+def test_host_auth_uses_host_header():
+    asgi = RPCASGI(_rpc())
+
+    assert not json.loads(_call(asgi, RPCRequest.build("hosted"))[2])["ok"]
+    assert json.loads(
+        _call(asgi, RPCRequest.build("hosted"), headers=[(b"host", b"api.local")])[2]
+    )["ok"]
+
+
+def test_rejects_other_methods():
+    status, headers, _ = _call(RPCASGI(_rpc()), None, method="GET")
+
+    assert status == 405
+    assert headers[b"allow"] == b"POST"
+
+
+def test_attachments_are_sent_as_multipart():
+    status, headers, content = _call(RPCASGI(_rpc()), RPCRequest.build("file", 1))
+    response = attach(*decode_multipart(content, headers[b"content-type"].decode()))
+
+    assert status == 200
+    assert int(headers[b"content-length"]) == len(content)
+    assert response["data"] == 1
+    assert bytes(response["attachments"]["file"]) == b"contents"
@@ -0,0 +1,81 @@
+import json
+import threading
+
+import pytest
+from flask import Flask
+from werkzeug.serving import make_server
+
+from flask_rpc.latest import RPC, RPCAttachment, RPCClient, RPCResponse
+from flask_rpc.version_1_1.attachments import (
+    SPOOL_SIZE,
+    decode_multipart,
+    encode_multipart,
+)
+
+views = []
+
+
+def _size(data):
+    attachment = RPCAttachment.current()[data]
+    return RPCResponse.success(len(attachment.view()))
+
+
+def _keep(data):
+    # The view outlives the request, closing the attachment mustn't fail
+    views.append(RPCAttachment.current()[data].view())
+    return RPCResponse.success(bytes(views[-1]).decode())
+
+
+@pytest.fixture
+def server():
+    app = Flask(__name__)
+    rpc = RPC(app, url_prefix="/rpc")
+    rpc.functions(
+        size=_size,
+        keep=_keep,
+        names=lambda data: RPCResponse.success(sorted(RPCAttachment.current())),
+    )
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/rpc"
+    server.shutdown()
+
+
+def test_small_and_spooled_uploads(server):
+    client = RPCClient(server)
+    small = bytearray(b"x" * 10)
+    large = memoryview(b"y" * (SPOOL_SIZE + 1))
+
+    assert client.call("size", "file", attachments={"file": small})["data"] == 10
+    response = client.call("size", "file", attachments={"file": large})
+    assert response["data"] == SPOOL_SIZE + 1
+
+
+def test_view_kept_after_the_request(server):
+    client = RPCClient(server)
+    response = client.call("keep", "file", attachments={"file": b"0123456789"})
+
+    assert response["ok"]
+    assert response["data"] == "0123456789"
+    assert bytes(views.pop()) == b"0123456789"
+
+
+def test_names_are_escaped(server):
+    client = RPCClient(server)
+    names = ['a"b', "c;d", "e f"]
+    response = client.call("names", None, attachments={n: b"1" for n in names})
+
+    assert response["data"] == sorted(names)
+
+    with pytest.raises(ValueError):
+        client.call("names", None, attachments={"a\r\nX-Injected: 1": b"1"})
+
+
+def test_response_part_names_round_trip():
+    payload, content_type, _ = encode_multipart(
+        {"attachments": ['a";b']}, [('a";b', b"1")], json.dumps
+    )
+    _, parts = decode_multipart(b"".join(payload), content_type)
+
+    assert [(name, bytes(value)) for name, value in parts] == [('a";b', b"1")]
@@ -0,0 +1,125 @@
+import hashlib
+import hmac
+import time
+
+import pytest
+
+from flask_rpc.latest import RPCAuthToken, RPCTokens
+from flask_rpc.version_1_1.auth_token import _b64encode
+
+
+def test_sign_and_verify():
+    tokens = RPCTokens("secret")
+    assert tokens.verify(tokens.sign({"sub": "a"})) == {"sub": "a"}
+
+
+def test_bad_signature():
+    token = RPCTokens("secret").sign({"sub": "a"})
+    assert RPCTokens("other").verify(token) is None
+
+    kid, body, signature = token.split(".")
+    forged = _b64encode(b'{"sub":"admin"}')
+    assert RPCTokens("secret").verify(f"{kid}.{forged}.{signature}") is None
+
+
+def test_unknown_kid():
+    token = RPCTokens({"a": "secret"}).sign({"sub": "a"})
+    assert RPCTokens({"b": "secret"}).verify(token) is None
+
+
+def test_expired():
+    tokens = RPCTokens("secret")
+
+    assert tokens.verify(tokens.sign({"sub": "a"}, expires_in=60))["sub"] == "a"
+    assert tokens.verify(tokens.sign({"sub": "a"}, expires_in=-1)) is None
+    assert tokens.verify(tokens.sign({"exp": time.time() - 1})) is None
+
+
+def test_expiry_is_checked_for_cached_tokens(monkeypatch):
+    tokens = RPCTokens("secret")
+    token = tokens.sign({"sub": "a"}, expires_in=10)
+    assert tokens.verify(token) is not None
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert tokens.verify(token) is None
+
+
+def test_rotation_keeps_then_drops_old_keys():
+    tokens = RPCTokens({"k1": "one"})
+    first = tokens.sign({"sub": "a"})
+    # Cached before the rotation
+    assert tokens.verify(first) is not None
+
+    tokens.rotate("k2", "two")
+    second = tokens.sign({"sub": "b"})
+
+    assert second.startswith("k2.")
+    assert tokens.verify(first) == {"sub": "a"}
+    assert tokens.verify(second) == {"sub": "b"}
+
+    tokens.rotate("k3", "three")
+
+    assert tokens.verify(first) is None
+    assert tokens.verify(second) == {"sub": "b"}
+
+    tokens.rotate("k4", "four", keep=0)
+    assert tokens.verify(second) is None
+
+
+def test_cached_token_of_a_dropped_kid():
+    tokens = RPCTokens({"k1": "one", "k2": "two"})
+    token = tokens.sign({"sub": "a"}, kid="k2")
+    assert tokens.verify(token) is not None
+
+    # Dropping k2 without going through rotate keeps the cache
+    del tokens._keys["k2"]
+    assert tokens.verify(token) is None
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        None,
+        "",
+        123,
+        "no-dots",
+        "a.b",
+        "0.a.b.c",
+        "0.!!!.???",
+        "0.é.é",
+        f"0.{_b64encode(b'[1, 2]')}.sig",
+    ],
+)
+def test_malformed(token):
+    assert RPCTokens("secret").verify(token) is None
+
+
+def test_signed_claims_that_arent_an_object():
+    for body in (b"[1, 2]", b"not json"):
+        encoded = _b64encode(body)
+        signature = hmac.new(b"secret", f"0.{encoded}".encode(), hashlib.sha256)
+        token = f"0.{encoded}.{_b64encode(signature.digest())}"
+
+        assert RPCTokens("secret").verify(token) is None
+
+
+def test_claims_match_lists_and_dicts():
+    tokens = RPCTokens("secret")
+    auth = RPCAuthToken(tokens, claims={"role": ["admin", "staff"]})
+
+    def check(claims):
+        return auth.check(tokens.sign(claims))
+
+    assert check({"role": "admin"})
+    assert check({"role": ["user", "staff"]})
+    assert not check({"role": ["user"]})
+    assert not check({"role": []})
+    assert not check({"sub": "a"})
+    # Nested values never match, even if they contain an allowed value
+    assert not check({"role": {"admin": True}})
+    assert not check({"role": [["admin"]]})
+    assert not check({"role": [{"admin": True}]})
+
+    assert RPCAuthToken(tokens).check(tokens.sign({}))
+    assert not RPCAuthToken(tokens).check(None)
@@ -0,0 +1,171 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+from werkzeug.serving import make_server
+
+from flask_rpc.latest import RPC, RPCBalancedClient, RPCRequest, RPCResponse
+
+# Endpoints of the hash ring tests, nothing listens on them
+URLS = [f"http://10.0.0.{i}/rpc" for i in range(1, 5)]
+KEYS = range(2000)
+
+
+class Endpoint:
+    """
+    A local Flask server, work sleeps for .delay seconds and answers with
+    the endpoint's name.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.delay = 0.0
+        self.calls = 0
+        app = Flask(name)
+        rpc = RPC(app)
+        rpc.functions(work=self.work)
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def work(self, data):
+        self.calls += 1
+        time.sleep(self.delay)
+        return RPCResponse.success(self.name)
+
+
+@pytest.fixture
+def endpoints():
+    started = [Endpoint(name) for name in ("a", "b", "c")]
+    yield started
+
+    for endpoint in started:
+        endpoint.server.shutdown()
+
+
+def test_slow_endpoint_gets_fewer_calls(endpoints):
+    slow, fast, _ = endpoints
+    slow.delay = 0.05
+    client = RPCBalancedClient([slow.url, fast.url], timeout=5)
+
+    answers = [client.call("work")["data"] for _ in range(40)]
+
+    assert answers.count("b") > 3 * answers.count("a")
+    client.close()
+
+
+def test_timed_out_endpoint_recovers(endpoints):
+    flaky, steady, _ = endpoints
+    flaky.delay = 1
+    client = RPCBalancedClient(
+        [flaky.url, steady.url],
+        timeout=0.2,
+        idempotent=["work"],
+        eject_failures=1,
+        eject_for=0.3,
+    )
+
+    # Failures on the flaky endpoint are retried on the other one
+    assert {client.call("work")["data"] for _ in range(5)} == {"b"}
+    assert [s["ejected"] for s in client.stats()] == [True, False]
+
+    flaky.delay = 0
+    time.sleep(0.35)
+
+    # It hasn't answered yet, so it costs nothing and is picked first
+    assert client.call("work")["data"] == "a"
+    assert client.stats()[0]["failures"] == 0
+    client.close()
+
+
+def test_hedge_sends_slow_calls_to_another_endpoint(endpoints):
+    slow, fast, _ = endpoints
+    slow.delay = 0.5
+    client = RPCBalancedClient(
+        [slow.url, fast.url], timeout=5, idempotent=["work"], hedge_after=0.05
+    )
+
+    for _ in range(6):
+        started = time.monotonic()
+        assert client.call("work")["data"] == "b"
+        assert time.monotonic() - started < 0.4
+
+    client.close()
+
+
+def test_routed_calls_stick_to_an_endpoint(endpoints):
+    client = RPCBalancedClient(
+        [e.url for e in endpoints], timeout=5, route_by={"work": "id"}
+    )
+
+    for key in range(10):
+        answers = {client.call("work", {"id": key})["data"] for _ in range(3)}
+        assert len(answers) == 1
+
+    client.close()
+
+
+def _client(urls):
+    return RPCBalancedClient(urls, route_by={"read": "id"}, virtual_nodes=160)
+
+
+def _placement(client):
+    return {
+        key: [
+            e.client.url for e in client._owners(RPCRequest.build("read", {"id": key}))
+        ]
+        for key in KEYS
+    }
+
+
+def test_placement_is_stable_and_balanced():
+    placement = _placement(_client(URLS[:3]))
+
+    assert placement == _placement(_client(URLS[:3]))
+    assert all(sorted(owners) == URLS[:3] for owners in placement.values())
+
+    for url in URLS[:3]:
+        share = sum(owners[0] == url for owners in placement.values()) / len(KEYS)
+        assert 0.25 < share < 0.42
+
+
+def test_only_unrouted_calls_are_balanced():
+    client = _client(URLS[:3])
+
+    assert client._owners(RPCRequest.build("write", {"id": 1})) is None
+    assert client._owners(RPCRequest.build("read", {"other": 1})) is None
+    assert client._owners(RPCRequest.build("read", 1)) is None
+    assert client._owners(RPCRequest.build("read", {"id": 1}))
+    assert (
+        RPCBalancedClient(URLS[:3])._owners(RPCRequest.build("read", {"id": 1})) is None
+    )
+
+
+def test_adding_an_endpoint_only_moves_keys_to_it():
+    client = _client(URLS[:3])
+    before = _placement(client)
+
+    client.add_endpoint(URLS[3])
+    after = _placement(client)
+    moved = [key for key in KEYS if before[key][0] != after[key][0]]
+
+    assert all(after[key][0] == URLS[3] for key in moved)
+    assert 0.15 < len(moved) / len(KEYS) < 0.35
+
+
+def test_removing_an_endpoint_only_moves_its_keys():
+    client = _client(URLS)
+    before = _placement(client)
+
+    client.remove_endpoint(URLS[0])
+    after = _placement(client)
+
+    for key in KEYS:
+        if before[key][0] == URLS[0]:
+            # Its keys go to the next owner on the ring
+            assert after[key][0] == before[key][1]
+        else:
+            assert after[key][0] == before[key][0]
+
+    assert client.urls == URLS[1:]
@@ -0,0 +1,76 @@
+import sqlite3
+
+from flask import Flask
+
+from flask_rpc.latest import (
+    RPC,
+    RPCCacheStore,
+    RPCCacheStoreSQLite,
+    RPCRequest,
+    RPCResponse,
+)
+from flask_rpc.version_1_1.cache import EVICT_EVERY
+
+
+def _count(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*), SUM(size) FROM rpc_cache").fetchone()
+
+
+def test_sqlite_store_evicts_in_batches(tmp_path):
+    path = str(tmp_path / "cache.db")
+    store = RPCCacheStoreSQLite(path, max_size=10)
+
+    for i in range(EVICT_EVERY - 1):
+        store.set(f"k{i}", b"x", 60)
+
+    assert _count(path)[0] == EVICT_EVERY - 1
+
+    store.set("last", b"x", 60)
+    assert _count(path)[0] == 10
+    assert store.get("last") == b"x"
+
+
+def test_sqlite_store_evicts_early_for_large_values(tmp_path):
+    path = str(tmp_path / "cache.db")
+    store = RPCCacheStoreSQLite(path, max_bytes=100 * EVICT_EVERY)
+
+    for i in range(30):
+        store.set(f"k{i}", b"x" * 50 * EVICT_EVERY, i + 60)
+
+    _, size = _count(path)
+    assert size <= 100 * EVICT_EVERY + 50 * EVICT_EVERY
+    assert store.get("k29") is not None
+    assert store.get("k0") is None
+
+
+def test_memory_store_is_bounded():
+    store = RPCCacheStore(max_size=2, max_bytes=10)
+    store.set("a", b"1234", 60)
+    store.set("b", b"1234", 60)
+    store.get("a")
+    store.set("c", b"1234", 60)
+
+    assert store.get("a") == b"1234"
+    assert store.get("b") is None
+
+
+def test_cached_function_runs_once_per_caller():
+    calls = []
+    app = Flask(__name__)
+    rpc = RPC(app, cache=RPCCacheStore())
+    rpc.functions(
+        read=lambda data: calls.append(data) or RPCResponse.success(data), cache__=60
+    )
+
+    with app.test_client() as client:
+        for _ in range(3):
+            client.post("/", json=RPCRequest.build("read", 1))
+
+        client.post(
+            "/",
+            json=RPCRequest.build("read", 1),
+            headers={"Authorization": "Bearer other"},
+        )
+
+    assert calls == [1, 1]
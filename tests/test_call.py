@@ -0,0 +1,103 @@
+from flask import Flask, session
+
+from flask_rpc.latest import (
+    RPC,
+    RPCAuthContext,
+    RPCAuthSessionKey,
+    RPCAuthToken,
+    RPCResponse,
+    RPCTokens,
+)
+
+TOKENS = RPCTokens("secret")
+
+
+def _rpc(app=None, **kwargs):
+    rpc = RPC(app, **kwargs)
+    rpc.functions(add=lambda data: RPCResponse.success(sum(data)))
+    rpc.functions(
+        session_auth__=RPCAuthSessionKey("user", ["admin"]),
+        admin=lambda data: RPCResponse.success("admin"),
+    )
+    rpc.functions(host_auth__=["api.local"], hosted=lambda data: RPCResponse.success(1))
+    rpc.functions(
+        token_auth__=RPCAuthToken(TOKENS, claims={"scope": ["write"]}),
+        write=lambda data: RPCResponse.success("written"),
+    )
+    return rpc
+
+
+def test_call_outside_a_request():
+    rpc = _rpc()
+
+    assert rpc.call("add", [1, 2])["data"] == 3
+    assert rpc.call("missing")["message"] == "Invalid function."
+
+    # No request and no auth_context, functions with auth are unauthorized
+    assert not rpc.call("admin")["ok"]
+    assert not rpc.call("hosted")["ok"]
+    assert not rpc.call("write")["ok"]
+
+    context = RPCAuthContext(
+        session={"user": "admin"},
+        host="api.local",
+        token=TOKENS.sign({"scope": "write"}),
+    )
+    assert rpc.call("admin", auth_context=context)["data"] == "admin"
+    assert rpc.call("hosted", auth_context=context)["data"] == 1
+    assert rpc.call("write", auth_context=context)["data"] == "written"
+
+    assert rpc.call("admin", trusted=True)["data"] == "admin"
+
+
+def test_call_inside_a_request_uses_the_request():
+    app = Flask(__name__)
+    app.secret_key = "test"
+    rpc = _rpc()
+
+    token = TOKENS.sign({"scope": "write"})
+    with app.test_request_context(
+        base_url="http://api.local", headers={"Authorization": f"Bearer {token}"}
+    ):
+        session["user"] = "admin"
+
+        assert rpc.call("admin")["ok"]
+        assert rpc.call("hosted")["ok"]
+        assert rpc.call("write")["ok"]
+        # An explicit auth_context replaces the request
+        assert not rpc.call("admin", auth_context=RPCAuthContext())["ok"]
+
+    with app.test_request_context(base_url="http://other.local"):
+        session["user"] = "guest"
+
+        assert not rpc.call("admin")["ok"]
+        assert rpc.call("hosted")["message"] == "Unauthorized (other.local)"
+        assert not rpc.call("write")["ok"]
+
+
+def test_call_many():
+    rpc = _rpc()
+    calls = [("add", [1]), ("admin", None), ("add", [2, 3])]
+
+    assert [r["ok"] for r in rpc.call_many(calls)] == [True, False, True]
+
+    context = RPCAuthContext(session={"user": "admin"})
+    assert [r["data"] for r in rpc.call_many(calls, auth_context=context)] == [
+        1,
+        "admin",
+        5,
+    ]
+
+
+def test_group_auth_applies_to_every_call():
+    rpc = _rpc(session_auth=RPCAuthSessionKey("user", ["admin"]))
+
+    assert rpc.call("add", [1])["message"] == "Unauthorized."
+    assert [r["ok"] for r in rpc.call_many([("add", [1]), ("add", [2])])] == [
+        False,
+        False,
+    ]
+    assert rpc.call("add", [1], trusted=True)["data"] == 1
+
+    context = RPCAuthContext(session={"user": "admin"})
+    assert rpc.call("add", [1], auth_context=context)["data"] == 1
@@ -0,0 +1,113 @@
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+from flask import Flask
+from werkzeug.serving import make_server
+
+from flask_rpc.exceptions import ResponseException
+from flask_rpc.latest import RPC, RPCClient, RPCResponse
+
+RESPONSE = json.dumps({"weerpc": 1.0, "ok": True, "message": None, "data": 1}).encode()
+
+
+class DroppingServer:
+    """
+    Reads each request, and closes the connection without answering the
+    first `drops` of them, like a server closing an idle keep-alive connection.
+    """
+
+    def __init__(self, drops: int):
+        self.drops = drops
+        self.requests = []
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{self.sock.getsockname()[1]}/"
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            conn, _ = self.sock.accept()
+            with conn, conn.makefile("rb") as reader:
+                request = reader.readline().split()[0].decode()
+                length = 0
+
+                while (line := reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+
+                reader.read(length)
+                self.requests.append(request)
+
+                if len(self.requests) > self.drops:
+                    conn.sendall(
+                        b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                        b"Content-Length: %d\r\n\r\n%s" % (len(RESPONSE), RESPONSE)
+                    )
+
+
+def test_post_is_not_sent_again_after_it_was_written():
+    server = DroppingServer(drops=1)
+    client = RPCClient(server.url, timeout=5)
+
+    with pytest.raises(http.client.RemoteDisconnected):
+        client.call("create", {"name": "a"})
+
+    assert server.requests == ["POST"]
+
+
+def test_post_with_idempotency_key_is_sent_again():
+    server = DroppingServer(drops=1)
+    client = RPCClient(server.url, timeout=5)
+
+    assert client.call("create", {"name": "a"}, idempotency_key="k1")["data"] == 1
+    assert server.requests == ["POST", "POST"]
+
+
+def test_get_is_sent_again():
+    server = DroppingServer(drops=1)
+    client = RPCClient(server.url, timeout=5)
+
+    assert client.get("read", {"id": 1})["data"] == 1
+    assert server.requests == ["GET", "GET"]
+
+
+@pytest.fixture
+def flask_server():
+    app = Flask(__name__)
+    rpc = RPC(app, url_prefix="/rpc")
+    rpc.functions(
+        sleep=lambda data: time.sleep(data) or RPCResponse.success(data),
+    )
+
+    @app.route("/down", methods=["POST"])
+    def down():
+        return "<html>Bad Gateway</html>", 502
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_timeout_resets_the_connection(flask_server):
+    client = RPCClient(f"{flask_server}/rpc", timeout=0.2)
+
+    with pytest.raises(TimeoutError):
+        client.call("sleep", 0.5)
+
+    assert client.call("sleep", 0)["ok"]
+    assert client.call("sleep", 0.01)["data"] == 0.01
+
+
+def test_error_page_raises_response_exception(flask_server):
+    client = RPCClient(f"{flask_server}/down", timeout=5)
+
+    with pytest.raises(ResponseException) as raised:
+        client.call("sleep", 0)
+
+    assert raised.value.status == 502
+    assert b"Bad Gateway" in raised.value.content
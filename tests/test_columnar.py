@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from flask_rpc.latest import RPCResponse
+from flask_rpc.version_1_1.columnar import RPCTable, encode_table, rehydrate
+
+ROWS = [
+    {"id": 1, "name": "a", "tags": ["x"]},
+    # Same keys in another order
+    {"name": "b", "tags": [], "id": 2},
+    {"id": 3, "name": None, "tags": None},
+]
+
+
+def _wire(response):
+    return rehydrate(json.loads(json.dumps(response)))
+
+
+def test_success_round_trip():
+    response = RPCResponse.success(ROWS, columnar=True)
+
+    assert response["columnar"] is True
+    assert response["data"]["columns"] == ["id", "name", "tags"]
+    assert response["data"]["rows"][1] == [2, "b", []]
+
+    table = _wire(response)["data"]
+    assert isinstance(table, RPCTable)
+    assert table == ROWS
+    assert list(table) == ROWS
+    assert table[1] == ROWS[1]
+    assert table[1:] == ROWS[1:]
+    assert table.column("id") == [1, 2, 3]
+    assert table.to_columns() == {
+        "id": [1, 2, 3],
+        "name": ["a", "b", None],
+        "tags": [["x"], [], None],
+    }
+
+
+def test_page_round_trip():
+    response = _wire(RPCResponse.page(ROWS, "next", columnar=True))
+
+    assert response["data"]["cursor"] == "next"
+    assert response["data"]["items"] == ROWS
+
+
+def test_single_column():
+    assert encode_table([{"id": 1}, {"id": 2}]) == {
+        "columns": ["id"],
+        "rows": [[1], [2]],
+    }
+    assert _wire(RPCResponse.success([{"id": 1}], columnar=True))["data"] == [{"id": 1}]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [],
+        [{"a": 1}, {"b": 1}],
+        [{"a": 1}, {"a": 1, "b": 2}],
+        [{"a": 1}, [1]],
+        [1, 2],
+        {"a": 1},
+        None,
+    ],
+)
+def test_other_data_is_sent_as_is(data):
+    response = RPCResponse.success(data, columnar=True)
+
+    assert "columnar" not in response
+    # Falsy data is sent as None, as without columnar
+    assert _wire(response)["data"] == (data or None)
+
+
+def test_rehydrate_leaves_other_responses_alone():
+    responses = [
+        RPCResponse.success({"columns": [], "rows": []}),
+        RPCResponse.success(ROWS, columnar=True),
+        RPCResponse.fail("Failed."),
+    ]
+    plain, table, failed = _wire(responses)
+
+    assert plain["data"] == {"columns": [], "rows": []}
+    assert isinstance(table["data"], RPCTable)
+    assert failed["data"] is None
@@ -0,0 +1,145 @@
+import pytest
+from flask import Flask
+from sqlalchemy import Integer, String, create_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from flask_rpc.crud import RPCCrud
+from flask_rpc.latest import RPC, RPCRequest
+from flask_rpc.pagination import RPCKeyset
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Client(Base):
+    __tablename__ = "clients"
+
+    client_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(50))
+
+
+class Account(Base):
+    __tablename__ = "accounts"
+
+    # Attribute names that differ from the column names
+    id: Mapped[int] = mapped_column("account_id", Integer, primary_key=True)
+    email: Mapped[str] = mapped_column("email_address", String(50), unique=True)
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "no_returning"])
+def call(request):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    if not request.param:
+        # As on MySQL or SQLite before 3.35
+        engine.dialect.insert_returning = False
+        engine.dialect.insert_executemany_returning = False
+        engine.dialect.update_returning = False
+        engine.dialect.delete_returning = False
+
+    app = Flask(__name__)
+    rpc = RPC(app)
+    session = Session(engine)
+    RPCCrud(Client, session).register(rpc)
+    RPCCrud(Account, session, keyset=RPCKeyset("secret", page_size=2)).register(
+        rpc, "accounts_"
+    )
+    client = app.test_client()
+
+    yield (
+        lambda function, data: (
+            client.post("/", json=RPCRequest.build(function, data)).json
+        )
+    )
+
+    session.close()
+    engine.dispose()
+
+
+def test_create_update_read_back_rows(call):
+    assert call("create", {"name": "a"})["data"] == {"client_id": 1, "name": "a"}
+    assert call("create_many", [{"name": "b"}, {"name": "c"}])["data"] == [
+        {"client_id": 2, "name": "b"},
+        {"client_id": 3, "name": "c"},
+    ]
+    assert call("update", {"client_id": 3, "name": "C"})["data"] == {
+        "client_id": 3,
+        "name": "C",
+    }
+    assert call("update", {"client_id": 9, "name": "X"})["message"] == "Not found."
+
+
+def test_update_many_rows_checks_ids_exist(call):
+    call("create_many", [{"name": "a"}, {"name": "b"}])
+
+    response = call(
+        "update_many", [{"client_id": 1, "name": "A"}, {"client_id": 7, "name": "G"}]
+    )
+    assert not response["ok"]
+    assert response["data"] == {"ids": [7]}
+    assert call("read", {"client_id": 1})["data"]["name"] == "a"
+
+    response = call(
+        "update_many", [{"client_id": 1, "name": "A"}, {"client_id": 2, "name": "B"}]
+    )
+    assert response["data"] == {"updated": 2}
+    assert call("read_many", {"ids": [1, 2], "fields": ["name"]})["data"] == [
+        {"name": "A"},
+        {"name": "B"},
+    ]
+
+
+def test_attribute_names_differ_from_columns(call):
+    created = call("accounts_create_many", [{"email": "a@x"}, {"email": "b@x"}])
+    assert created["data"] == [{"id": 1, "email": "a@x"}, {"id": 2, "email": "b@x"}]
+    assert call("accounts_update", {"id": 2, "email": "B@x"})["data"]["email"] == "B@x"
+    assert call("accounts_read", {"id": 2})["data"] == {"id": 2, "email": "B@x"}
+
+    call("accounts_create", {"email": "c@x"})
+    first = call("accounts_list", {})["data"]
+    second = call("accounts_list", {"cursor": first["cursor"]})["data"]
+    assert [r["id"] for r in first["items"] + second["items"]] == [1, 2, 3]
+    assert second["cursor"] is None
+
+
+def test_constraint_violation_is_rolled_back(call):
+    call("accounts_create", {"email": "a@x"})
+
+    for function, data in (
+        ("accounts_create", {"email": "a@x"}),
+        ("accounts_create_many", [{"email": "b@x"}, {"email": "a@x"}]),
+        ("accounts_update_many", {"ids": [1], "values": {"email": None}}),
+    ):
+        response = call(function, data)
+        assert (response["ok"], response["message"]) == (False, "Constraint violated.")
+
+    # The session is usable again, and nothing of the failed writes was kept
+    assert call("accounts_create", {"email": "b@x"})["data"] == {
+        "id": 2,
+        "email": "b@x",
+    }
+    assert call("accounts_read_many", {"ids": [1, 2, 3]})["data"] == [
+        {"id": 1, "email": "a@x"},
+        {"id": 2, "email": "b@x"},
+    ]
+
+
+def test_invalid_and_mixed_ids(call):
+    call("create", {"name": "a"})
+
+    response = call("update_many", [{"client_id": [1], "name": "A"}])
+    assert response["message"] == "client_id is required."
+    assert call("read_many", {"ids": [{"id": 1}]})["message"].startswith("Expected ids")
+    assert call("read", {"client_id": None})["message"] == "client_id is required."
+
+    response = call(
+        "update_many",
+        [
+            {"client_id": 1, "name": "A"},
+            {"client_id": "x", "name": "X"},
+            {"client_id": 9, "name": "I"},
+        ],
+    )
+    assert response["data"] == {"ids": ["x", 9]}
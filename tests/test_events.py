@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from flask_rpc.latest import RPCEvents
+
+
+def _start(events, topics):
+    return events.subscribe({"topics": topics})["data"]
+
+
+def test_long_poll_wakes_on_publish():
+    events = RPCEvents()
+    position = _start(events, ["clients:*"])
+    threading.Timer(0.1, events.publish, ["orders:1", "clients:42"]).start()
+
+    started = time.monotonic()
+    response = events.subscribe(
+        {
+            "topics": ["clients:*"],
+            "after": position["seq"],
+            "stream": position["stream"],
+        }
+    )
+
+    assert time.monotonic() - started < 5
+    assert response["data"]["topics"] == ["clients:42"]
+    assert response["data"]["seq"] == 2
+    assert not response["data"]["reset"]
+
+
+def test_async_long_poll_wakes_on_publish():
+    events = RPCEvents()
+    position = _start(events, ["a"])
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.1, events.publish, "a")
+        return await events.subscribe_async(
+            {"topics": ["a"], "after": position["seq"], "stream": position["stream"]}
+        )
+
+    assert asyncio.run(run())["data"]["topics"] == ["a"]
+
+
+def test_cursor_continues_from_seq():
+    events = RPCEvents()
+    position = _start(events, ["a", "b"])
+    events.publish("a", "b", "a")
+    subscribe = {"topics": ["a", "b"], "stream": position["stream"], "timeout": 0}
+
+    first = events.subscribe({**subscribe, "after": position["seq"]})["data"]
+    assert first["topics"] == ["b", "a"]
+    assert first["seq"] == 3
+
+    # Nothing new after the last seq, the timeout returns the same position
+    again = events.subscribe({**subscribe, "after": first["seq"]})["data"]
+    assert again["topics"] == []
+    assert again["seq"] == 3
+
+    events.publish("b")
+    assert events.subscribe({**subscribe, "after": 3})["data"]["topics"] == ["b"]
+
+
+def test_reset_on_stream_mismatch_or_lost_history():
+    events = RPCEvents(history=2)
+    position = _start(events, ["a"])
+
+    other = events.subscribe({"topics": ["a"], "after": 0, "stream": "other"})["data"]
+    assert other["reset"]
+    assert other["stream"] == position["stream"]
+
+    events.publish("a", "b", "c")
+    behind = events.subscribe(
+        {"topics": ["a"], "after": 0, "stream": position["stream"], "timeout": 0}
+    )["data"]
+    assert behind["reset"]
+    assert behind["seq"] == 3
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Needs fork")
+def test_forked_worker_starts_a_new_stream():
+    events = RPCEvents()
+    events.publish("a")
+    parent = _start(events, ["a"])
+
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        child = _start(events, ["a"])
+        os.write(write, json.dumps(child).encode())
+        os._exit(0)
+
+    os.close(write)
+    os.waitpid(pid, 0)
+    with os.fdopen(read) as file:
+        child = json.loads(file.read())
+
+    assert child["stream"] != parent["stream"]
+    assert child["seq"] == 0
@@ -0,0 +1,46 @@
+import pytest
+from flask import Flask
+
+from flask_rpc.latest import RPC, RPCFields, RPCRequest, RPCResponse
+
+ITEMS = [{"id": 1, "name": "a", "tag": "x"}, {"id": 2, "name": "b", "tag": "y"}]
+
+
+@pytest.mark.parametrize("fields", [["name"], ["items.name"]])
+@pytest.mark.parametrize("columnar", [False, True])
+def test_page_projects_items_and_keeps_cursor(fields, columnar):
+    app = Flask(__name__)
+    rpc = RPC(app)
+    rpc.functions(
+        clients=lambda data: RPCResponse.page(ITEMS, "next", columnar=columnar)
+    )
+
+    with app.test_client() as client:
+        response = client.post(
+            "/", json=RPCRequest.build("clients", None, fields=fields)
+        ).json
+
+    assert response["data"]["cursor"] == "next"
+
+    if columnar:
+        assert response["data"]["items"] == {
+            "columns": ["name"],
+            "rows": [["a"], ["b"]],
+        }
+    else:
+        assert response["data"]["items"] == [{"name": "a"}, {"name": "b"}]
+
+
+def test_page_keeps_whole_items():
+    page = RPCResponse.page(ITEMS, None)["data"]
+
+    assert RPCFields(["items"]).apply(page) == {"items": ITEMS, "cursor": None}
+
+
+def test_nested_paths():
+    data = {"client": {"name": "a", "age": 3}, "tags": [{"label": "x", "id": 1}]}
+
+    assert RPCFields(["client.name", "tags.label"]).apply(data) == {
+        "client": {"name": "a"},
+        "tags": [{"label": "x"}],
+    }
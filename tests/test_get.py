@@ -0,0 +1,88 @@
+import io
+
+from flask import Flask
+
+from flask_rpc.latest import (
+    RPC,
+    RPCAuthToken,
+    RPCRequest,
+    RPCResponse,
+    RPCTokens,
+)
+
+TOKENS = RPCTokens("secret")
+
+
+def _client():
+    app = Flask(__name__)
+    rpc = RPC(app, url_prefix="/rpc")
+    rpc.functions(
+        get__="public, max-age=60",
+        vary__=["Accept-Language"],
+        read=lambda data: (
+            RPCResponse.success(data) if data else RPCResponse.fail("Missing.")
+        ),
+        file=lambda data: RPCResponse.success(
+            data, attachments={"file": io.BytesIO(b"contents")}
+        ),
+    )
+    rpc.functions(
+        get__="private, max-age=5",
+        token_auth__=RPCAuthToken(TOKENS),
+        mine=lambda data: RPCResponse.success(data),
+    )
+    rpc.functions(write=lambda data: RPCResponse.success(data))
+    return app.test_client()
+
+
+def _get(client, function, data=None, **kwargs):
+    return client.get(f"/rpc?{RPCRequest.query(function, data)}", **kwargs)
+
+
+def test_cache_control_and_vary():
+    client = _client()
+    response = _get(client, "read", {"id": 1})
+
+    assert response.json["data"] == {"id": 1}
+    assert response.headers["Cache-Control"] == "public, max-age=60"
+    assert response.headers["Vary"] == "Accept-Language"
+
+    failed = _get(client, "read", None)
+    assert not failed.json["ok"]
+    assert failed.headers["Cache-Control"] == "no-store"
+
+
+def test_token_auth_varies_on_authorization():
+    client = _client()
+    token = TOKENS.sign({"sub": "a"})
+    response = _get(client, "mine", 1, headers={"Authorization": f"Bearer {token}"})
+
+    assert response.json["ok"]
+    assert "Authorization" in response.headers["Vary"]
+    assert not _get(client, "mine", 1).json["ok"]
+
+
+def test_etag_round_trip():
+    client = _client()
+    first = _get(client, "read", {"id": 1})
+    etag = first.headers["ETag"]
+
+    again = _get(client, "read", {"id": 1}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    other = _get(client, "read", {"id": 2}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_attachments_are_streamed_without_etag():
+    response = _get(_client(), "file", 1)
+
+    assert response.status_code == 200
+    assert response.mimetype == "multipart/mixed"
+    assert "ETag" not in response.headers
+    assert b"contents" in response.data
+
+
+def test_functions_without_get_are_not_allowed():
+    assert _get(_client(), "write", 1).status_code == 405
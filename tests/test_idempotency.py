@@ -0,0 +1,117 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask
+from sqlalchemy import Integer, String, create_engine, func, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from flask_rpc.latest import RPC, RPCIdempotency, RPCRequest, RPCResponse
+from flask_rpc.transaction import RPCTransaction
+from flask_rpc.version_1_1.idempotency import RPCIdempotencyStoreSQLite
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Client(Base):
+    __tablename__ = "clients"
+
+    client_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(50))
+
+
+@pytest.fixture
+def batch(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    calls = []
+
+    def create(data):
+        calls.append(data)
+        session.add(Client(name=data))
+        session.commit()
+        return RPCResponse.success(data)
+
+    def boom(data):
+        raise RuntimeError("boom")
+
+    app = Flask(__name__)
+    app.testing = True
+    rpc = RPC(app, transaction=RPCTransaction(session), idempotency=RPCIdempotency())
+    rpc.functions(
+        create=create,
+        fail=lambda data: RPCResponse.fail("Failed."),
+        boom=boom,
+    )
+    client = app.test_client()
+
+    def send(*envelopes):
+        return client.post("/", json=list(envelopes)).json
+
+    send.calls = calls
+    send.count = lambda: session.scalar(select(func.count()).select_from(Client))
+    yield send
+
+    session.close()
+    engine.dispose()
+
+
+def test_rolled_back_call_runs_again_on_retry(batch):
+    create = RPCRequest.build("create", "a", idempotency_key="k1")
+
+    responses = batch(create, RPCRequest.build("fail"))
+    assert responses[0]["message"] == "Transaction rolled back."
+    assert batch.count() == 0
+
+    assert batch(create)[0]["ok"]
+    assert batch.calls == ["a", "a"]
+    assert batch.count() == 1
+
+
+def test_committed_call_is_not_run_again(batch):
+    create = RPCRequest.build("create", "a", idempotency_key="k1")
+
+    assert batch(create, RPCRequest.build("create", "b"))[0]["ok"]
+    assert batch(create)[0]["data"] == "a"
+    assert batch.calls == ["a", "b"]
+    assert batch.count() == 2
+
+
+def test_raising_batch_releases_keys(batch):
+    create = RPCRequest.build("create", "a", idempotency_key="k1")
+
+    with pytest.raises(RuntimeError):
+        batch(create, RPCRequest.build("boom"))
+
+    assert batch(create)[0]["ok"]
+    assert batch.calls == ["a", "a"]
+
+
+def test_key_repeated_in_one_batch_runs_once(batch):
+    create = RPCRequest.build("create", "a", idempotency_key="k1")
+
+    assert [r["data"] for r in batch(create, create)] == ["a", "a"]
+    assert batch.calls == ["a"]
+
+
+@pytest.mark.parametrize("sqlite", [False, True])
+def test_concurrent_duplicates_run_once(tmp_path, sqlite):
+    store = RPCIdempotencyStoreSQLite(str(tmp_path / "keys.db")) if sqlite else None
+    idempotency = RPCIdempotency(store)
+    calls = []
+
+    def create():
+        calls.append(1)
+        time.sleep(0.1)
+        return RPCResponse.success(len(calls))
+
+    with ThreadPoolExecutor(4) as executor:
+        responses = list(
+            executor.map(lambda _: idempotency.run("k1", create), range(4))
+        )
+
+    assert calls == [1]
+    assert [r["data"] for r in responses] == [1, 1, 1, 1]
@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+
+# Modules that importing flask_rpc.latest must not load, they're imported
+# on first use of the features that need them.
+LAZY_MODULES = ("pydantic", "asyncio", "multiprocessing", "sqlite3")
+
+
+def _loaded_after(code: str) -> list:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import json, sys\n{code}\n"
+            f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))",
+        ],
+        # The subprocess finds flask_rpc where pytest does
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def test_import_does_not_load_lazy_modules():
+    assert _loaded_after("import flask_rpc.latest") == []
+
+
+def test_lazy_names_import_on_use():
+    loaded = _loaded_after(
+        "from flask_rpc.latest import RPCEvents, RPCJobStoreSQLite, RPCModel"
+    )
+    assert {"pydantic", "asyncio", "sqlite3"} <= set(loaded)
@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+from flask import Flask
+
+from flask_rpc.latest import RPC, RPCAuthSessionKey, RPCRequest, RPCResponse
+from flask_rpc.version_1_1 import jobs
+from flask_rpc.version_1_1.jobs import (
+    FAILED,
+    PRUNE_EVERY,
+    RUNNING,
+    RPCJobs,
+    RPCJobStoreSQLite,
+)
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _wait_done(client, job_id):
+    for _ in range(100):
+        response = client.post("/", json=RPCRequest.build("job.status", job_id)).json
+
+        if response["ok"] and response["data"]["status"] not in ("pending", "running"):
+            return response
+
+        time.sleep(0.01)
+
+    raise AssertionError("Job didn't finish.")
+
+
+def test_sqlite_store_prunes_in_batches(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = RPCJobStoreSQLite(path, max_size=10)
+
+    for i in range(2 * PRUNE_EVERY + 5):
+        store.set(f"job{i}", {"job_id": f"job{i}", "status": "done"})
+
+    with sqlite3.connect(path) as conn:
+        (count,) = conn.execute("SELECT COUNT(*) FROM rpc_jobs").fetchone()
+
+    assert count == 10 + 5
+    assert store.get(f"job{2 * PRUNE_EVERY + 4}") is not None
+    assert store.get("job0") is None
+
+
+def test_sqlite_store_fails_jobs_of_exited_workers(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.db")
+    store = RPCJobStoreSQLite(path)
+    dead = _dead_pid()
+
+    for job_id, pid in (("dead", dead), ("mine", os.getpid()), ("live", os.getppid())):
+        store.set(
+            job_id,
+            {"job_id": job_id, "function": "f", "status": RUNNING, "pid": pid},
+        )
+
+    # A new worker process, checking the database for the first time
+    monkeypatch.setattr(jobs, "_started", set())
+    restarted = RPCJobStoreSQLite(path)
+
+    assert restarted.get("dead")["status"] == FAILED
+    assert restarted.get("dead")["response"]["ok"] is False
+    assert restarted.get("mine")["status"] == RUNNING
+    assert restarted.get("live")["status"] == RUNNING
+
+
+def test_second_sqlite_store_keeps_live_jobs(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = RPCJobStoreSQLite(path)
+    store.set("mine", {"job_id": "mine", "status": RUNNING, "pid": os.getpid()})
+
+    other = RPCJobStoreSQLite(path)
+    other.set("dead", {"job_id": "dead", "status": RUNNING, "pid": _dead_pid()})
+
+    assert store.get("mine")["status"] == RUNNING
+    # Already checked in this process, only a new worker fails it
+    assert other.get("dead")["status"] == RUNNING
+
+
+@pytest.fixture
+def jobs_app():
+    app = Flask(__name__)
+    app.secret_key = "test"
+    rpc = RPC(app, jobs=RPCJobs())
+
+    def report(data):
+        return RPCResponse.success(data * 2)
+
+    def broken(data):
+        raise KeyError(data)
+
+    rpc.functions(
+        job__=True, session_auth__=RPCAuthSessionKey("user", [1]), report=report
+    )
+    rpc.functions(job__=True, broken=broken)
+    yield app
+    rpc._jobs.shutdown()
+
+
+def test_job_functions_check_the_auth_of_the_queuing_function(jobs_app):
+    owner = jobs_app.test_client()
+
+    with owner.session_transaction() as session:
+        session["user"] = 1
+
+    job_id = owner.post("/", json=RPCRequest.build("report", 21)).json["data"]["job_id"]
+    assert _wait_done(owner, job_id)["data"]["status"] == "done"
+
+    other = jobs_app.test_client()
+
+    for function in ("job.status", "job.result", "job.cancel"):
+        response = other.post("/", json=RPCRequest.build(function, job_id)).json
+        assert response == {**response, "ok": False, "message": "Unauthorized."}
+
+    result = owner.post("/", json=RPCRequest.build("job.result", job_id)).json
+    assert result["ok"] and result["data"] == 42
+
+
+def test_unknown_job_is_not_found(jobs_app):
+    response = (
+        jobs_app.test_client()
+        .post("/", json=RPCRequest.build("job.status", "nope"))
+        .json
+    )
+
+    assert response["ok"] is False
+    assert response["message"] == "Job not found."
+
+
+def test_job_exceptions_are_logged(jobs_app, caplog):
+    client = jobs_app.test_client()
+    job_id = client.post("/", json=RPCRequest.build("broken", 1)).json["data"]["job_id"]
+
+    assert _wait_done(client, job_id)["data"]["status"] == FAILED
+    result = client.post("/", json=RPCRequest.build("job.result", job_id)).json
+    assert result["message"] == "Job raised KeyError."
+
+    (log,) = [r for r in caplog.records if r.name == jobs.__name__]
+    assert job_id in log.getMessage()
+    assert log.exc_info[0] is KeyError
@@ -0,0 +1,79 @@
+import sys
+
+import pytest
+from flask import Flask
+from werkzeug.utils import ImportStringError
+
+from flask_rpc.latest import RPC, RPCRequest
+
+MODULE = """
+from flask_rpc.latest import RPCResponse
+
+def double(data):
+    return RPCResponse.success(data * 2)
+
+def triple(data):
+    return RPCResponse.success(data * 3)
+
+not_callable = 1
+
+inline = lambda data: RPCResponse.success(data)
+"""
+
+
+@pytest.fixture
+def module(tmp_path, monkeypatch):
+    (tmp_path / "lazy_functions.py").write_text(MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "lazy_functions"
+    sys.modules.pop("lazy_functions", None)
+
+
+def test_imported_on_first_call(module):
+    app = Flask(__name__)
+    rpc = RPC(app)
+    rpc.functions(double=f"{module}:double")
+    rpc.functions_auto_name([f"{module}:triple"])
+
+    assert module not in sys.modules
+
+    client = app.test_client()
+    assert client.post("/", json=RPCRequest.build("double", 2)).json["data"] == 4
+    assert module in sys.modules
+    assert callable(rpc.LOOKUP["double"])
+    assert isinstance(rpc.LOOKUP["triple"], str)
+
+    assert client.post("/", json=RPCRequest.build("triple", 2)).json["data"] == 6
+
+
+def test_warmup_imports_everything(module):
+    rpc = RPC(None)
+    rpc.functions(double=f"{module}:double", triple=f"{module}.triple")
+    rpc.warmup()
+
+    assert all(callable(func) for func in rpc.LOOKUP.values())
+    assert rpc.call("triple", 1)["data"] == 3
+
+
+@pytest.mark.parametrize(
+    "path, error",
+    [
+        ("lazy_functions:not_callable", TypeError),
+        ("lazy_functions:missing", ImportStringError),
+        ("lazy_missing_module:double", ImportStringError),
+    ],
+)
+def test_warmup_raises_for_bad_imports(module, path, error):
+    rpc = RPC(None)
+    rpc.functions(bad=path)
+
+    with pytest.raises(error):
+        rpc.warmup()
+
+
+def test_process_functions_are_checked_when_imported(module):
+    rpc = RPC(None)
+    rpc.functions(executor__="process", inline=f"{module}:inline")
+
+    with pytest.raises(TypeError, match="module level"):
+        rpc.warmup()
@@ -0,0 +1,55 @@
+import multiprocessing
+
+import pytest
+
+from flask_rpc.version_1_1.metrics import RPCMetrics
+
+WORKERS = 16
+NAMES = 100
+
+
+def _record(metrics: RPCMetrics, worker: int, start):
+    start.wait()
+
+    for i in range(NAMES):
+        metrics.observe(f"w{worker}_f{i}", 0.002, True)
+        metrics.observe("shared", 0.002, i % 2 == 0)
+
+
+def test_forked_workers_register_names_and_slots(tmp_path):
+    context = multiprocessing.get_context("fork")
+    metrics = RPCMetrics(str(tmp_path / "metrics"), slots=32, max_functions=2048)
+    start = context.Event()
+    processes = [
+        context.Process(target=_record, args=(metrics, worker, start))
+        for worker in range(WORKERS)
+    ]
+
+    for process in processes:
+        process.start()
+
+    start.set()
+
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    snapshot = metrics.snapshot()
+
+    assert len(snapshot) == WORKERS * NAMES + 1
+    assert all(
+        snapshot[f"w{w}_f{i}"]["calls"] == 1
+        for w in range(WORKERS)
+        for i in range(NAMES)
+    )
+    assert snapshot["shared"]["calls"] == WORKERS * NAMES
+    assert snapshot["shared"]["failures"] == WORKERS * (NAMES // 2)
+    metrics.close()
+
+
+def test_file_with_other_settings_is_rejected(tmp_path):
+    path = str(tmp_path / "metrics")
+    RPCMetrics(path, slots=4).close()
+
+    with pytest.raises(ValueError):
+        RPCMetrics(path, slots=8)
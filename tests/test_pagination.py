@@ -0,0 +1,130 @@
+import pytest
+from sqlalchemy import Integer, String, create_engine, func, insert, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from flask_rpc.pagination import RPCKeyset
+
+KEYSET = RPCKeyset("secret")
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Event(Base):
+    __tablename__ = "events"
+
+    # Attribute names that differ from the column names
+    id: Mapped[int] = mapped_column("event_id", Integer, primary_key=True)
+    day: Mapped[int] = mapped_column("event_day", Integer)
+    name: Mapped[str] = mapped_column(String(50))
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        # Days tie, the id breaks the ties
+        session.execute(
+            insert(Event),
+            [
+                {"id": i, "day": day, "name": f"e{i}"}
+                for i, day in enumerate([3, 1, 2, 1, 3, 2, 1], start=1)
+            ],
+        )
+        yield session
+
+    engine.dispose()
+
+
+def _all(session, stmt, *order_by, read, limit=2, descending=False):
+    items, cursor, pages = [], None, 0
+
+    while True:
+        rows, cursor = KEYSET.paginate(
+            session,
+            stmt,
+            *order_by,
+            data={"cursor": cursor, "limit": limit},
+            descending=descending,
+        )
+        items.extend(read(row) for row in rows)
+        pages += 1
+
+        if cursor is None:
+            return items, pages
+
+
+def test_multi_column_order_with_ties(session):
+    expected = [2, 4, 7, 3, 6, 1, 5]
+    items, pages = _all(
+        session, select(Event), Event.day, Event.id, read=lambda row: row.id
+    )
+
+    assert items == expected
+    assert pages == 4
+
+    items, _ = _all(
+        session,
+        select(Event),
+        Event.day,
+        Event.id,
+        read=lambda row: row.id,
+        descending=True,
+    )
+    assert items == expected[::-1]
+
+
+def test_last_page_has_no_cursor(session):
+    rows, cursor = KEYSET.paginate(session, select(Event), Event.id, data={"limit": 7})
+    assert len(rows) == 7
+    assert cursor is None
+
+    # A full last page, the extra row fetched shows there's nothing after it
+    items, pages = _all(
+        session, select(Event), Event.id, read=lambda row: row.id, limit=7
+    )
+    assert (items, pages) == ([1, 2, 3, 4, 5, 6, 7], 1)
+
+
+def test_labelled_columns(session):
+    stmt = select(Event.name, Event.day.label("when"), Event.id.label("key"))
+    items, _ = _all(
+        session, stmt, Event.day, Event.id, read=lambda row: row.key, limit=3
+    )
+
+    assert items == [2, 4, 7, 3, 6, 1, 5]
+
+
+def test_order_by_must_be_selected(session):
+    with pytest.raises(ValueError, match="selected columns"):
+        KEYSET.paginate(session, select(Event.name), Event.id)
+
+    with pytest.raises(ValueError, match="column of Event"):
+        KEYSET.paginate(session, select(Event), func.lower(Event.name), Event.id)
+
+
+def test_cursor_is_bound_to_the_query(session):
+    _, cursor = KEYSET.paginate(session, select(Event), Event.id, data={"limit": 2})
+
+    for stmt, order_by in (
+        (select(Event).where(Event.day == 1), (Event.id,)),
+        (select(Event), (Event.day,)),
+    ):
+        response = KEYSET.paginate(
+            session, stmt, *order_by, data={"cursor": cursor, "limit": 2}
+        )
+        assert response["message"] == "Invalid cursor."
+
+    rows, _ = KEYSET.paginate(
+        session, select(Event), Event.id, data={"cursor": cursor, "limit": 2}
+    )
+    assert [row.id for row in rows] == [3, 4]
+
+    # Other columns of the same list
+    rows, _ = KEYSET.paginate(
+        session, select(Event.id, Event.name), Event.id, data={"cursor": cursor}
+    )
+    assert [row.name for row in rows] == ["e3", "e4", "e5", "e6", "e7"]
@@ -0,0 +1,82 @@
+import os
+import pickle
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from flask_rpc.version_1_1.process_pool import (
+    OUT_OF_BAND_THRESHOLD,
+    RPCProcessPool,
+    _dumps,
+    _release,
+)
+
+
+def checksum(data):
+    return {"size": len(data["blob"]), "type": type(data["blob"]).__name__}
+
+
+def echo(data):
+    return data
+
+
+def crash(data):
+    os._exit(1)
+
+
+@pytest.mark.parametrize(
+    "blob", [b"x" * OUT_OF_BAND_THRESHOLD, bytearray(OUT_OF_BAND_THRESHOLD)]
+)
+def test_large_buffers_go_out_of_band(blob):
+    payload, segments, handles = _dumps({"blob": blob})
+
+    try:
+        assert len(segments) == 1
+        assert segments[0][1] == len(blob)
+        assert len(payload) < 1024
+    finally:
+        _release(handles, unlink=True)
+
+
+def test_small_bytes_stay_in_band():
+    payload, segments, handles = _dumps({"blob": b"x" * 100})
+
+    assert not segments and not handles
+    assert pickle.loads(payload) == {"blob": b"x" * 100}
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = RPCProcessPool(max_workers=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_run_round_trips_large_bytes(pool):
+    blob = bytes(range(256)) * (OUT_OF_BAND_THRESHOLD // 256 + 1)
+
+    assert pool.run(checksum, {"blob": blob}) == {"size": len(blob), "type": "bytes"}
+
+    result = pool.run(echo, {"blob": blob, "small": b"abc"})
+    assert result == {"blob": blob, "small": b"abc"}
+    assert type(result["blob"]) is bytes
+
+
+def test_prewarm_starts_every_worker():
+    pool = RPCProcessPool(max_workers=3)
+    try:
+        pool.warmup()
+        assert len(pool._executor._processes) == 3
+    finally:
+        pool.shutdown()
+
+
+def test_broken_pool_is_replaced():
+    pool = RPCProcessPool(max_workers=1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            pool.run(crash, None)
+
+        assert pool.run(echo, {"a": 1}) == {"a": 1}
+    finally:
+        pool.shutdown()
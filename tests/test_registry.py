@@ -0,0 +1,205 @@
+import io
+import json
+import threading
+
+import pytest
+from flask import Flask
+from sqlalchemy import Integer, String, create_engine, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from flask_rpc.latest import (
+    RPC,
+    RPCAttachment,
+    RPCAuthSessionKey,
+    RPCIdempotency,
+    RPCNotifications,
+    RPCRegistry,
+    RPCRequest,
+    RPCResponse,
+)
+from flask_rpc.transaction import RPCTransaction
+from flask_rpc.version_1_1.attachments import attach, decode_multipart
+
+
+def _app():
+    app = Flask(__name__)
+    files = RPC(None)
+    files.functions(
+        read=lambda data: RPCResponse.success(
+            {"name": data}, attachments={"file": io.BytesIO(b"contents")}
+        ),
+        size=lambda data: RPCResponse.success(len(data)),
+    )
+    RPCRegistry(app, {"files": files}, url_prefix="/rpc")
+    return app
+
+
+def test_attachments_are_sent_as_multipart():
+    with _app().test_client() as client:
+        response = client.post(
+            "/rpc",
+            json=[
+                RPCRequest.build("files.read", "a"),
+                RPCRequest.build("files.size", "ab"),
+            ],
+        )
+
+    assert response.status_code == 200
+    assert response.mimetype == "multipart/mixed"
+
+    responses = attach(*decode_multipart(response.data, response.content_type))
+    assert [r["data"] for r in responses] == [{"name": "a"}, 2]
+    assert bytes(responses[0]["attachments"]["file"]) == b"contents"
+
+
+def test_plain_responses_stay_json():
+    with _app().test_client() as client:
+        response = client.post("/rpc", json=RPCRequest.build("files.size", "abc"))
+
+    assert response.json["data"] == 3
+
+
+def test_notification_is_accepted_with_202():
+    app = Flask(__name__)
+    done = threading.Event()
+    jobs = RPC(None, notifications=RPCNotifications(max_workers=1))
+    jobs.functions(run=lambda data: done.set() or RPCResponse.success(data))
+    RPCRegistry(app, {"jobs": jobs})
+
+    with app.test_client() as client:
+        response = client.post("/", json=RPCRequest.build("jobs.run", 1, notify=True))
+
+    assert response.status_code == 202
+    assert response.json["ok"]
+    assert done.wait(5)
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Client(Base):
+    __tablename__ = "clients"
+
+    client_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(50))
+
+
+@pytest.fixture
+def groups(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    calls = []
+
+    def create(data):
+        calls.append(data)
+        session.add(Client(name=data))
+        session.commit()
+        return RPCResponse.success(data)
+
+    def group(**kwargs):
+        rpc = RPC(None, transaction=RPCTransaction(session), **kwargs)
+        rpc.functions(create=create, fail=lambda data: RPCResponse.fail("Failed."))
+        return rpc
+
+    app = Flask(__name__)
+    app.secret_key = "test"
+    RPCRegistry(
+        app,
+        {
+            "a": group(idempotency=RPCIdempotency()),
+            "b": group(),
+            "b.admin": group(session_auth=RPCAuthSessionKey("user", ["admin"])),
+        },
+    )
+    client = app.test_client()
+
+    def send(body):
+        return client.post("/", json=body).json
+
+    send.calls = calls
+    send.names = lambda: set(session.scalars(select(Client.name)))
+    yield send
+
+    session.close()
+    engine.dispose()
+
+
+def test_namespaces(groups):
+    assert groups(RPCRequest.build("b.create", "x"))["data"] == "x"
+    assert groups(RPCRequest.build("create", "x"))["message"] == "Invalid function."
+    assert groups(RPCRequest.build("c.create", "x"))["message"] == "Invalid function."
+    # The longest namespace matches, and its auth is checked
+    assert groups(RPCRequest.build("b.admin.create", "y"))["message"] == "Unauthorized."
+    assert groups.names() == {"x"}
+
+
+def test_batch_runs_in_each_groups_transaction(groups):
+    responses = groups(
+        [
+            RPCRequest.build("a.create", "x"),
+            RPCRequest.build("a.fail"),
+            RPCRequest.build("b.create", "y"),
+            RPCRequest.build("nope.create", "z"),
+            RPCRequest.build("b.admin.create", "z"),
+        ]
+    )
+
+    assert [r["message"] for r in responses] == [
+        "Transaction rolled back.",
+        "Failed.",
+        None,
+        "Invalid function.",
+        "Unauthorized.",
+    ]
+    assert groups.names() == {"y"}
+
+
+def test_batch_holds_idempotency_keys_until_commit(groups):
+    create = RPCRequest.build("a.create", "x", idempotency_key="k1")
+
+    assert not groups([create, RPCRequest.build("a.fail")])[0]["ok"]
+    # Rolled back, so the retry runs it again instead of replaying it
+    assert groups([create, RPCRequest.build("b.create", "y")])[0]["ok"]
+    assert groups.calls == ["x", "x", "y"]
+    assert groups.names() == {"x", "y"}
+
+
+def test_failures_use_the_request_version(groups):
+    for envelope in (
+        {"wrpc": 1.0, "function": "nope.create", "data": 1},
+        {"wrpc": 1.0, "data": 1},
+    ):
+        response = groups(envelope)
+        assert response["wrpc"] == 1.0
+        assert "weerpc" not in response
+
+    assert groups([{"wrpc": 1.0, "function": "b.create", "data": "x"}])[0]["wrpc"]
+
+    response = groups([])
+    assert response["message"] == "Request must not be empty."
+
+
+def test_multipart_request():
+    app = Flask(__name__)
+    files = RPC(None)
+    files.functions(
+        size=lambda data: RPCResponse.success(len(RPCAttachment.current()[data].view()))
+    )
+    RPCRegistry(app, {"files": files})
+
+    response = app.test_client().post(
+        "/",
+        data={
+            "envelope": (
+                io.BytesIO(json.dumps(RPCRequest.build("files.size", "f")).encode()),
+                "envelope",
+                "application/json",
+            ),
+            "f": (io.BytesIO(b"12345"), "f.bin"),
+        },
+        content_type="multipart/form-data",
+    )
+
+    assert response.json["data"] == 5
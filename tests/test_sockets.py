@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from flask_rpc.latest import RPC, RPCResponse, RPCSocketClient, RPCSocketServer
+
+
+def _rpc() -> RPC:
+    rpc = RPC(None)
+    rpc.functions(
+        add=lambda data: RPCResponse.success(sum(data)),
+        slow=lambda data: time.sleep(data) or RPCResponse.success(data),
+    )
+    rpc.functions(
+        host_auth__=["api.local"], hosted=lambda data: RPCResponse.success(True)
+    )
+    return rpc
+
+
+def _serve(server: RPCSocketServer, address):
+    server.thread = threading.Thread(
+        target=lambda: asyncio.run(server.serve_async(address)), daemon=True
+    )
+    server.thread.start()
+
+    for _ in range(100):
+        try:
+            return RPCSocketClient(address, timeout=5)
+        except (ConnectionError, FileNotFoundError):
+            time.sleep(0.01)
+
+    raise AssertionError("Server didn't start.")
+
+
+def test_call_over_unix_socket(tmp_path):
+    server = RPCSocketServer(_rpc(), host="api.local")
+
+    with _serve(server, str(tmp_path / "rpc.sock")) as client:
+        assert client.call("add", [1, 2])["data"] == 3
+        assert client.call("hosted")["ok"]
+        assert [r["data"] for r in client.call_many([("add", [1]), ("add", [2])])] == [
+            1,
+            2,
+        ]
+
+    server.shutdown()
+
+
+def test_host_auth_checks_server_host_not_peer(tmp_path):
+    server = RPCSocketServer(_rpc())
+
+    with _serve(server, str(tmp_path / "rpc.sock")) as client:
+        assert not client.call("hosted")["ok"]
+
+    server.shutdown()
+
+
+def test_timeout_releases_pending_request(tmp_path):
+    server = RPCSocketServer(_rpc())
+
+    with _serve(server, str(tmp_path / "rpc.sock")) as client:
+        client._timeout = 0.05
+
+        with pytest.raises(TimeoutError):
+            client.call("slow", 0.3)
+
+        assert client._pending == {}
+        time.sleep(0.4)
+        client._timeout = 5
+        assert client.call("add", [2, 2])["data"] == 4
+
+    server.shutdown()
+
+
+def test_peers_rejects_other_connections(tmp_path):
+    server = RPCSocketServer(_rpc(), peers=["127.0.0.1"])
+
+    with _serve(server, str(tmp_path / "rpc.sock")) as client:
+        with pytest.raises((ConnectionError, TimeoutError, OSError)):
+            client.call("add", [1])
+
+    server.shutdown()
+
+
+def test_shutdown_stops_serve_async(tmp_path):
+    server = RPCSocketServer(_rpc())
+    address = str(tmp_path / "rpc.sock")
+
+    with _serve(server, address) as client:
+        assert client.call("add", [1])["ok"]
+
+    server.shutdown()
+    server.thread.join(timeout=5)
+
+    assert not server.thread.is_alive()
+    with pytest.raises((ConnectionError, FileNotFoundError)):
+        RPCSocketClient(address, timeout=1)
@@ -0,0 +1,117 @@
+import pytest
+from sqlalchemy import Integer, String, create_engine, event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from flask_rpc.latest import RPCResponse
+from flask_rpc.transaction import RPCTransaction
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Client(Base):
+    __tablename__ = "clients"
+
+    client_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(50), unique=True)
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+
+    # Savepoints with pysqlite, see the SQLAlchemy SQLite docs
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, _):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        yield session
+
+    engine.dispose()
+
+
+def _create(session, name):
+    def call():
+        session.add(Client(name=name))
+
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            return RPCResponse.fail("Exists.")
+
+        return RPCResponse.success(name)
+
+    return call
+
+
+def _names(session):
+    session.rollback()
+    return set(session.scalars(select(Client.name)))
+
+
+def _restored(session):
+    return "commit" not in vars(session) and "rollback" not in vars(session)
+
+
+def test_rollback_undoes_the_whole_batch(session):
+    transaction = RPCTransaction(session)
+    responses = transaction.run(
+        [_create(session, "a"), _create(session, "a"), _create(session, "b")]
+    )
+
+    assert [r["message"] for r in responses] == [
+        "Transaction rolled back.",
+        "Exists.",
+        "Transaction rolled back.",
+    ]
+    assert _restored(session)
+    assert _names(session) == set()
+
+
+def test_partial_keeps_the_calls_that_succeeded(session):
+    transaction = RPCTransaction(session, on_failure="partial")
+    responses = transaction.run(
+        [_create(session, "a"), _create(session, "a"), _create(session, "b")]
+    )
+
+    assert [r["ok"] for r in responses] == [True, False, True]
+    assert _restored(session)
+    assert _names(session) == {"a", "b"}
+
+
+def test_raising_call_restores_the_session(session):
+    def boom():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        RPCTransaction(session).run([_create(session, "a"), boom])
+
+    assert _restored(session)
+    assert _names(session) == set()
+
+    session.add(Client(name="c"))
+    session.commit()
+    assert _names(session) == {"c"}
+
+
+def test_nested_batch_joins_the_transaction(session):
+    transaction = RPCTransaction(session)
+
+    def nested():
+        transaction.run([_create(session, "b")])
+        return RPCResponse.fail("Nope.")
+
+    transaction.run([_create(session, "a"), nested])
+
+    assert _restored(session)
+    assert session.scalar(select(func.count()).select_from(Client)) == 0
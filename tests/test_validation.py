@@ -0,0 +1,66 @@
+import math
+
+import pytest
+
+from flask_rpc.exceptions import SchemaException
+from flask_rpc.validation import (
+    AnyValue,
+    DictOf,
+    Float,
+    Int,
+    ListOf,
+    Schema,
+    Str,
+)
+
+
+def test_reports_every_error():
+    schema = Schema(
+        {
+            "client_id": Int(min=1),
+            "name": Str(max_length=3),
+            "tags": ListOf(Str(), required=False),
+            "owner": DictOf({"id": Int(), "extra": AnyValue()}),
+        },
+        extra="forbid",
+    )
+
+    assert schema.errors(
+        {"client_id": 0, "name": "long", "tags": ["a", 1], "owner": {"id": 1}, "x": 1}
+    ) == [
+        {"path": "client_id", "message": "must be at least 1"},
+        {"path": "name", "message": "must be at most 3 characters"},
+        {"path": "tags[1]", "message": "must be a str"},
+        {"path": "owner.extra", "message": "is required"},
+        {"path": "x", "message": "is not allowed"},
+    ]
+
+    with pytest.raises(SchemaException):
+        schema.validate({})
+
+
+def test_infinite_limits():
+    schema = Schema(Float(min=-math.inf, max=math.inf))
+
+    assert schema.errors(1.5) == []
+    assert Schema(Float(max=math.inf)).errors(math.inf) == []
+    assert Schema(Float(min=0, max=1)).errors(math.inf) == [
+        {"path": "", "message": "must be at most 1"}
+    ]
+    assert Schema(ListOf(Float(max=math.inf))).errors([1.0, 2.0]) == []
+    assert Schema(ListOf(Float(min=-math.inf), max_length=math.inf)).errors([1.0]) == []
+
+
+def test_nan_limits_are_rejected():
+    with pytest.raises(ValueError):
+        Float(max=math.nan)
+
+
+def test_list_fast_path_matches_item_checks():
+    schema = Schema(ListOf(Int(min=0)))
+
+    assert schema.errors(list(range(1000))) == []
+    assert schema.errors([1, -1, True]) == [
+        {"path": "[1]", "message": "must be at least 0"},
+        {"path": "[2]", "message": "must be an int"},
+    ]
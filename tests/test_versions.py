@@ -0,0 +1,78 @@
+import pytest
+from flask import Flask
+
+from flask_rpc.latest import RPC, RPCRequest, RPCResponse
+from flask_rpc.version_1_0 import RPCRequest as RPCRequest10
+from flask_rpc.version_1_0 import RPCResponse as RPCResponse10
+
+
+def _client(**kwargs):
+    app = Flask(__name__)
+    rpc = RPC(app, **kwargs)
+    rpc.functions(
+        echo=lambda data: RPCResponse.success(data),
+        old=lambda data: RPCResponse10.success(data),
+    )
+    return app.test_client()
+
+
+def test_each_version_is_answered_in_kind():
+    client = _client()
+
+    old = client.post("/", json=RPCRequest10.build("echo", 1)).json
+    assert old == {"wrpc": 1.0, "ok": True, "message": None, "data": 1}
+
+    new = client.post("/", json=RPCRequest.build("echo", 1)).json
+    assert new["weerpc"] == 1.0
+    assert "wrpc" not in new
+
+    # A 1.0 response from the function is converted for a 1.1 request
+    converted = client.post("/", json=RPCRequest.build("old", 2)).json
+    assert converted == {"weerpc": 1.0, "ok": True, "message": None, "data": 2}
+
+
+def test_batch_mixes_versions():
+    responses = (
+        _client()
+        .post("/", json=[RPCRequest10.build("echo", 1), RPCRequest.build("echo", 2)])
+        .json
+    )
+
+    assert [("wrpc" in r, "weerpc" in r, r["data"]) for r in responses] == [
+        (True, False, 1),
+        (False, True, 2),
+    ]
+
+
+@pytest.mark.parametrize(
+    "envelope",
+    [
+        {"weerpc": 2.0, "function": "echo", "data": 1},
+        {"wrpc": 1.1, "function": "echo", "data": 1},
+        {"function": "echo", "data": 1},
+    ],
+)
+def test_unknown_versions_fail_in_the_highest_version(envelope):
+    response = _client().post("/", json=envelope).json
+
+    assert response["message"] == "Invalid weerpc version."
+    assert response["weerpc"] == 1.0
+
+
+def test_only_accepted_versions():
+    client = _client(versions=[1.1])
+
+    assert not client.post("/", json=RPCRequest10.build("echo", 1)).json["ok"]
+    assert client.post("/", json=RPCRequest.build("echo", 1)).json["ok"]
+
+    response = _client(versions=[1.0]).post("/", json=RPCRequest.build("echo", 1)).json
+    assert response["message"] == "Invalid wrpc version."
+    assert response["wrpc"] == 1.0
+
+
+def test_unsupported_versions_are_rejected():
+    with pytest.raises(ValueError):
+        RPC(None, versions=[2.0])
+
+    with pytest.raises(ValueError):
+        RPC(None, versions=[])